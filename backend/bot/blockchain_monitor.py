@@ -1,14 +1,25 @@
 import asyncio
 import logging
-from typing import Dict, List
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
-from web3 import Web3
-from web3.exceptions import BlockNotFound
+from web3 import AsyncWeb3
 import aiohttp
+import numpy as np
+from .write_behind import InsertBatcher
+from .signal_lease import shard_bucket
+from .tracing import Tracer
+from .filter_rules import compile_rules, pair_columns, signal_columns, threshold_rules
+from .dex_logs import (
+    DECIMALS_SELECTOR, GET_RESERVES_SELECTOR, MINT_TOPIC, NATIVE_REFERENCE_PAIRS, PAIR_CREATED_TOPIC,
+    QUOTE_TOKENS, SWAP_TOPIC, SYMBOL_SELECTOR, decode_log, decode_string, words
+)
 
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
@@ -18,10 +29,19 @@ logger = logging.getLogger(__name__)
 class BlockchainMonitor:
     """Monitor blockchain events from ETH, BSC, and Solana"""
     
-    def __init__(self, db, dex_client=None, telegram=None):
+    def __init__(self, db, dex_client=None, telegram=None, signal_bus=None, tracer: Optional[Tracer] = None,
+                 filter_rules: Optional[Dict] = None):
         self.db = db
         self.dex_client = dex_client
         self.telegram = telegram
+        # In-process hand-off to the trading engine; the database stays the source of truth
+        self.signal_bus = signal_bus
+        # Latency of each stage from a DEXScreener response to the signal being published
+        self.tracer = tracer or Tracer()
+        # Minimum requirements for a pair to become a signal, evaluated over whole batches of pairs
+        self.pair_filter = compile_rules(filter_rules or threshold_rules(5000, 10000))
+        # Signals created within a short window are inserted with one insert_many
+        self.signal_inserts = InsertBatcher(db.signals, linger=float(os.getenv('SIGNAL_INSERT_LINGER', '0.05')))
         self.running = False
         
         # Web3 connections
@@ -29,24 +49,36 @@ class BlockchainMonitor:
         self.bsc_rpc = os.getenv('BSC_RPC_URL', 'https://bsc-dataseed.binance.org/')
         self.sol_rpc = os.getenv('SOL_RPC_URL', 'https://api.mainnet-beta.solana.com')
         
-        # Initialize Web3
-        try:
-            self.w3_eth = Web3(Web3.HTTPProvider(self.eth_rpc))
-            self.w3_bsc = Web3(Web3.HTTPProvider(self.bsc_rpc))
-            logger.info(f"Web3 ETH connected: {self.w3_eth.is_connected()}")
-            logger.info(f"Web3 BSC connected: {self.w3_bsc.is_connected()}")
-        except Exception as e:
-            logger.error(f"Error initializing Web3: {e}")
-            self.w3_eth = None
-            self.w3_bsc = None
+        # Async Web3 clients, so a slow RPC node never blocks the event loop the trading engine shares
+        self.rpc_timeout = float(os.getenv('RPC_TIMEOUT', '10'))
+        self.rpc_concurrency = int(os.getenv('RPC_CONCURRENCY', '4'))
+        self.max_blocks_per_poll = int(os.getenv('RPC_MAX_BLOCKS_PER_POLL', '100'))
+        # Block range of one eth_getLogs request; many nodes reject wide ranges
+        self.log_chunk_blocks = int(os.getenv('LOG_CHUNK_BLOCKS', '20'))
+        self.rpc_sessions: List[aiohttp.ClientSession] = []
+        self.w3_eth = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(self.eth_rpc))
+        self.w3_bsc = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(self.bsc_rpc))
         
         # Uniswap V2 Factory address (for new pair detection)
         self.uniswap_factory = "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
         self.pancakeswap_factory = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+        self.factories = {'ethereum': self.uniswap_factory, 'bsc': self.pancakeswap_factory}
         
-        # Last processed block numbers
-        self.last_eth_block = None
-        self.last_bsc_block = None
+        # Pairs created since start whose Mint and Swap logs are followed; the oldest are dropped first
+        self.max_watched_pairs = int(os.getenv('WATCHED_PAIRS_MAX', '500'))
+        self.watched_pairs: Dict[str, OrderedDict] = {chain: OrderedDict() for chain in self.factories}
+        # Size from which a swap is an event at all; whether it becomes a signal is up to pair_filter
+        self.large_swap_usd = float(os.getenv('LARGE_SWAP_USD', '10000'))
+        # Swap volume of each watched pair is kept in hourly buckets so volume_24h is a rolling window
+        self.volume_bucket_seconds = 3600
+        # USD price of each chain's native token and when it was read
+        self.native_usd: Dict[str, Tuple[float, float]] = {}
+        # (chain, token, event type) of signals already created from logs; the oldest are forgotten first
+        self.emitted: OrderedDict = OrderedDict()
+        self.max_emitted = 10000
+        
+        # Last processed block number per chain
+        self.last_blocks: Dict[str, int] = {}
         
         # DEXScreener monitoring mode
         self.use_dexscreener = True  # Простіший режим через DEXScreener API
@@ -78,6 +110,12 @@ class BlockchainMonitor:
         """Stop monitoring"""
         self.running = False
         logger.info("Stopping blockchain monitor...")
+        
+        await self.signal_inserts.stop()
+        
+        for session in self.rpc_sessions:
+            await session.close()
+        self.rpc_sessions.clear()
     
     async def monitor_dexscreener_trending(self):
         """Monitor trending tokens from DEXScreener"""
@@ -97,8 +135,7 @@ class BlockchainMonitor:
                                     data = await resp.json()
                                     pairs = data.get('pairs', [])[:5]  # Топ 5 пар
                                     
-                                    for pair in pairs:
-                                        await self.process_dexscreener_pair(pair, chain)
+                                    await self.process_dexscreener_pairs(pairs, chain)
                             
                             await asyncio.sleep(2)  # Затримка між запитами
                             
@@ -127,6 +164,7 @@ class BlockchainMonitor:
                             pairs = data.get('pairs', [])
                             
                             # Фільтруємо нові пари (створені менше 24 годин тому)
+                            new_pairs = []
                             for pair in pairs[:10]:  # Обробляємо топ 10
                                 pair_created_at = pair.get('pairCreatedAt', 0)
                                 if pair_created_at > 0:
@@ -134,7 +172,9 @@ class BlockchainMonitor:
                                     age_hours = (datetime.now(timezone.utc) - created_timestamp).total_seconds() / 3600
                                     
                                     if age_hours < 24:  # Пара створена менше 24 годин тому
-                                        await self.process_dexscreener_pair(pair, pair.get('chainId', 'unknown'))
+                                        new_pairs.append(pair)
+                            
+                            await self.process_dexscreener_pairs(new_pairs)
                 
                 await asyncio.sleep(120)  # Перевірка кожні 2 хвилини
                 
@@ -142,7 +182,18 @@ class BlockchainMonitor:
                 logger.error(f"Error in DEXScreener new pairs monitor: {e}")
                 await asyncio.sleep(30)
     
-    async def process_dexscreener_pair(self, pair: Dict, chain: str):
+    async def process_dexscreener_pairs(self, pairs: List[Dict], chain: Optional[str] = None):
+        """Filter a burst of pairs in one pass, then process the survivors concurrently so their signals share one insert"""
+        # One pair per token, or concurrent duplicates could slip past the existing-signal check
+        unique = list({pair.get('baseToken', {}).get('address', ''): pair for pair in pairs}.values())
+        traces = [self.tracer.start() for _ in unique]
+        selected = self.pair_filter.mask(pair_columns(unique, chain, self.pair_filter.fields))
+        await asyncio.gather(*(
+            self.process_dexscreener_pair(unique[i], chain or unique[i].get('chainId', 'unknown'), traces[i])
+            for i in np.flatnonzero(selected)
+        ))
+    
+    async def process_dexscreener_pair(self, pair: Dict, chain: str, trace=None):
         """Process pair data from DEXScreener and create signal"""
         try:
             # Витягуємо дані
@@ -153,10 +204,6 @@ class BlockchainMonitor:
             volume_24h = float(pair.get('volume', {}).get('h24', 0) or 0)
             price_change_24h = float(pair.get('priceChange', {}).get('h24', 0) or 0)
             
-            # Фільтр за мінімальними вимогами
-            if liquidity_usd < 5000 or volume_24h < 10000:
-                return
-            
             # Перевіряємо чи сигнал вже існує
             existing = await self.db.signals.find_one({'token_address': token_address})
             if existing:
@@ -170,6 +217,9 @@ class BlockchainMonitor:
             if liquidity_usd > 0:
                 spread = min((volume_24h / liquidity_usd) * 0.1, 5.0)  # Максимум 5%
             
+            if trace is not None:
+                trace.mark('detect')
+            
             # Створюємо сигнал
             signal = await self.create_signal(
                 blockchain=chain,
@@ -179,7 +229,8 @@ class BlockchainMonitor:
                 price=price_usd,
                 liquidity=liquidity_usd,
                 volume_24h=volume_24h,
-                spread=spread
+                spread=spread,
+                trace=trace
             )
             
             if signal and self.telegram:
@@ -192,62 +243,228 @@ class BlockchainMonitor:
     async def monitor_ethereum(self):
         """Monitor Ethereum blockchain via Web3"""
         logger.info("⛓️ Monitoring Ethereum via Web3...")
-        
-        if not self.w3_eth or not self.w3_eth.is_connected():
-            logger.error("Ethereum Web3 not connected")
-            return
-        
-        while self.running:
-            try:
-                latest_block = self.w3_eth.eth.block_number
-                
-                if self.last_eth_block is None:
-                    self.last_eth_block = latest_block - 1
-                
-                # Process new blocks
-                for block_num in range(self.last_eth_block + 1, latest_block + 1):
-                    try:
-                        block = self.w3_eth.eth.get_block(block_num, full_transactions=True)
-                        await self.process_block_transactions(block, 'ethereum')
-                    except BlockNotFound:
-                        continue
-                
-                self.last_eth_block = latest_block
-                await asyncio.sleep(12)  # Ethereum block time ~12s
-                
-            except Exception as e:
-                logger.error(f"Error monitoring Ethereum: {e}")
-                await asyncio.sleep(5)
+        await self.follow_chain(self.w3_eth, 'ethereum', 12)  # Ethereum block time ~12s
     
     async def monitor_bsc(self):
         """Monitor BSC blockchain via Web3"""
         logger.info("⛓️ Monitoring BSC via Web3...")
-        
-        if not self.w3_bsc or not self.w3_bsc.is_connected():
-            logger.error("BSC Web3 not connected")
+        await self.follow_chain(self.w3_bsc, 'bsc', 3)  # BSC block time ~3s
+    
+    async def connect_rpc(self, w3) -> bool:
+        """Give a provider its own pooled keep-alive session and check that the node answers"""
+        connector = aiohttp.TCPConnector(limit_per_host=self.rpc_concurrency, keepalive_timeout=60)
+        session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.rpc_timeout))
+        self.rpc_sessions.append(session)
+        await w3.provider.cache_async_session(session)
+        try:
+            return await w3.is_connected()
+        except Exception as e:
+            logger.error(f"Error connecting to {w3.provider.endpoint_uri}: {e}")
+            return False
+    
+    async def follow_chain(self, w3, chain: str, block_time: float):
+        """Follow factory and pair logs with chunked eth_getLogs calls instead of downloading full blocks"""
+        if not await self.connect_rpc(w3):
+            logger.error(f"{chain} Web3 not connected")
             return
         
+        slots = asyncio.Semaphore(self.rpc_concurrency)
+        factory = AsyncWeb3.to_checksum_address(self.factories[chain])
+        
+        async def fetch(params: Dict) -> List:
+            async with slots:
+                return await w3.eth.get_logs(params)
+        
+        async def fetch_range(start: int, end: int, address, topics: List) -> Tuple[List, int]:
+            # Chunks are fetched concurrently; logs stop at the first failed chunk, which the next pass retries
+            chunks = [(first, min(first + self.log_chunk_blocks - 1, end)) for first in range(start, end + 1, self.log_chunk_blocks)]
+            results = await asyncio.gather(*(
+                fetch({'fromBlock': first, 'toBlock': last, 'address': address, 'topics': topics})
+                for first, last in chunks
+            ), return_exceptions=True)
+            logs = []
+            for (first, last), result in zip(chunks, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error fetching {chain} logs for blocks {first}-{last}: {result}")
+                    return logs, first - 1
+                logs.extend(result)
+            return logs, end
+        
         while self.running:
             try:
-                latest_block = self.w3_bsc.eth.block_number
+                latest_block = await w3.eth.block_number
+                last_block = self.last_blocks.get(chain)
+                if last_block is None:
+                    last_block = latest_block - 1
                 
-                if self.last_bsc_block is None:
-                    self.last_bsc_block = latest_block - 1
-                
-                for block_num in range(self.last_bsc_block + 1, latest_block + 1):
-                    try:
-                        block = self.w3_bsc.eth.get_block(block_num, full_transactions=True)
-                        await self.process_block_transactions(block, 'bsc')
-                    except BlockNotFound:
-                        continue
+                # After an outage, catch up a bounded number of blocks per pass
+                upto = min(latest_block, last_block + self.max_blocks_per_poll)
+                if upto > last_block:
+                    created, upto = await fetch_range(last_block + 1, upto, factory, [PAIR_CREATED_TOPIC])
+                    for log in created:
+                        await self.watch_pair(w3, chain, decode_log(log))
+                    
+                    # Pairs created in this range are already watched, so a Mint in their creation block is seen
+                    watched = [AsyncWeb3.to_checksum_address(pair) for pair in self.watched_pairs[chain]]
+                    if watched and upto > last_block:
+                        activity, upto = await fetch_range(last_block + 1, upto, watched, [[MINT_TOPIC, SWAP_TOPIC]])
+                        await self.process_pair_logs(w3, chain, [decode_log(log) for log in activity])
+                    self.last_blocks[chain] = upto
                 
-                self.last_bsc_block = latest_block
-                await asyncio.sleep(3)  # BSC block time ~3s
+                if upto >= latest_block:
+                    await asyncio.sleep(block_time)
                 
             except Exception as e:
-                logger.error(f"Error monitoring BSC: {e}")
+                logger.error(f"Error monitoring {chain}: {e}")
                 await asyncio.sleep(5)
     
+    async def watch_pair(self, w3, chain: str, event: Optional[Dict]):
+        """Start following a new pair of one quote token and one new token; other pairs cannot be priced"""
+        watched = self.watched_pairs[chain]
+        if event is None or event['pair'] in watched:
+            return
+        quotes = QUOTE_TOKENS[chain]
+        tokens = (event['token0'], event['token1'])
+        if (tokens[0] in quotes) == (tokens[1] in quotes):
+            return
+        
+        index = 1 if tokens[0] in quotes else 0
+        symbol, decimals = await self.token_metadata(w3, chain, tokens[index])
+        watched[event['pair']] = {
+            'token': tokens[index],
+            'token_index': index,
+            'quote': tokens[1 - index],
+            'symbol': symbol,
+            'decimals': decimals,
+            # Reserves estimated from the logs followed since creation
+            'reserves': [0, 0],
+            # [bucket start, swapped USD], oldest first
+            'volume_buckets': deque(),
+            'minted': False
+        }
+        while len(watched) > self.max_watched_pairs:
+            watched.popitem(last=False)
+    
+    async def token_metadata(self, w3, chain: str, token: str) -> Tuple[Optional[str], int]:
+        """Symbol and decimals of a token, read once when its pair is created"""
+        address = AsyncWeb3.to_checksum_address(token)
+        try:
+            decimals = words(await w3.eth.call({'to': address, 'data': DECIMALS_SELECTOR}))[0]
+            symbol = decode_string(await w3.eth.call({'to': address, 'data': SYMBOL_SELECTOR}))
+            return symbol, decimals
+        except Exception as e:
+            logger.error(f"Error reading {chain} token {token}: {e}")
+            return None, 18
+    
+    async def native_price(self, w3, chain: str) -> float:
+        """USD price of the chain's native token from a reference pair's reserves, read at most once a minute"""
+        price, read_at = self.native_usd.get(chain, (0.0, 0.0))
+        if time.monotonic() - read_at < 60:
+            return price
+        
+        pair, native, stable, stable_decimals = NATIVE_REFERENCE_PAIRS[chain]
+        try:
+            reserves = words(await w3.eth.call({'to': AsyncWeb3.to_checksum_address(pair), 'data': GET_RESERVES_SELECTOR}))
+            # token0 is the lower address
+            native_reserve, stable_reserve = (reserves[0], reserves[1]) if native < stable else (reserves[1], reserves[0])
+            price = (stable_reserve / 10 ** stable_decimals) / (native_reserve / 1e18)
+            self.native_usd[chain] = (price, time.monotonic())
+        except Exception as e:
+            logger.error(f"Error reading {chain} native token price: {e}")
+        return price
+    
+    def add_volume(self, pair: Dict, usd: float, now: float):
+        bucket = now - now % self.volume_bucket_seconds
+        buckets = pair['volume_buckets']
+        if buckets and buckets[-1][0] == bucket:
+            buckets[-1][1] += usd
+        else:
+            buckets.append([bucket, usd])
+    
+    def volume_24h(self, pair: Dict, now: float) -> float:
+        """Swap volume of a pair over the last 24 hours, to bucket resolution"""
+        buckets = pair['volume_buckets']
+        while buckets and buckets[0][0] <= now - 86400:
+            buckets.popleft()
+        return sum(usd for _, usd in buckets)
+    
+    async def process_pair_logs(self, w3, chain: str, events: List[Optional[Dict]]):
+        """Apply Mint and Swap logs to the watched pairs and create liquidity and large swap signals"""
+        watched = self.watched_pairs[chain]
+        events = [event for event in events if event is not None and event['pair'] in watched]
+        if not events:
+            return
+        native_usd = await self.native_price(w3, chain)
+        now = time.time()
+        
+        # Latest state per (token, event type) across this batch of logs
+        candidates = {}
+        for event in events:
+            pair = watched[event['pair']]
+            _, quote_decimals, is_native = QUOTE_TOKENS[chain][pair['quote']]
+            # USD value of one raw unit of the quote token
+            unit_usd = (native_usd if is_native else 1.0) / 10 ** quote_decimals
+            token_side, quote_side = pair['token_index'], 1 - pair['token_index']
+            reserves = pair['reserves']
+            
+            if event['event'] == 'Mint':
+                reserves[0] += event['amount0']
+                reserves[1] += event['amount1']
+                event_type = 'liquidity_add' if pair['minted'] else 'pool_creation'
+                pair['minted'] = True
+            else:
+                amounts_in = (event['amount0_in'], event['amount1_in'])
+                amounts_out = (event['amount0_out'], event['amount1_out'])
+                reserves[0] = max(reserves[0] + amounts_in[0] - amounts_out[0], 0)
+                reserves[1] = max(reserves[1] + amounts_in[1] - amounts_out[1], 0)
+                swapped_usd = (amounts_in[quote_side] + amounts_out[quote_side]) * unit_usd
+                self.add_volume(pair, swapped_usd, now)
+                if swapped_usd < self.large_swap_usd:
+                    continue
+                event_type = 'large_swap'
+            
+            liquidity = 2 * reserves[quote_side] * unit_usd
+            volume_24h = self.volume_24h(pair, now)
+            price = 0.0
+            if reserves[token_side] > 0:
+                price = reserves[quote_side] * unit_usd / (reserves[token_side] / 10 ** pair['decimals'])
+            candidates[(pair['token'], event_type)] = {
+                'blockchain': chain,
+                'token_address': pair['token'],
+                'token_symbol': pair['symbol'],
+                'event_type': event_type,
+                'price': price,
+                'liquidity': liquidity,
+                'volume_24h': volume_24h,
+                'spread': min((volume_24h / liquidity) * 0.1, 5.0) if liquidity > 0 else 0,
+                'trace': self.tracer.start()
+            }
+        
+        # The same rules as DEXScreener pairs, over the candidates as one batch; a pool that was just
+        # created or funded has no trading history yet, so volume rules only judge large swaps
+        rows = list(candidates.values())
+        no_volume = np.array([row['event_type'] != 'large_swap' for row in rows], dtype=bool)
+        selected = self.pair_filter.mask(signal_columns(rows, self.pair_filter.fields), exempt={'volume_24h': no_volume})
+        signals = []
+        for i in np.flatnonzero(selected):
+            row = rows[i]
+            key = (chain, row['token_address'], row['event_type'])
+            if key in self.emitted:
+                continue
+            self.emitted[key] = True
+            while len(self.emitted) > self.max_emitted:
+                self.emitted.popitem(last=False)
+            
+            if row['trace'] is not None:
+                row['trace'].mark('detect')
+            signals.append(self.create_signal(**row))
+        
+        # Created together so they share one insert
+        for signal in await asyncio.gather(*signals):
+            if signal and self.telegram:
+                await self.telegram.send_signal_notification(signal)
+                logger.info(f"📢 Signal created and sent: {signal['token_symbol']} on {chain}")
+    
     async def monitor_solana(self):
         """Monitor Solana blockchain"""
         logger.info("⛓️ Monitoring Solana...")
@@ -262,38 +479,34 @@ class BlockchainMonitor:
                 logger.error(f"Error monitoring Solana: {e}")
                 await asyncio.sleep(30)
     
-    async def process_block_transactions(self, block, chain: str):
-        """Process transactions in a block to detect DEX events"""
-        try:
-            # Тут можна аналізувати транзакції на предмет:
-            # - PairCreated events від Uniswap/PancakeSwap factory
-            # - Великі Swap події
-            # - Додавання ліквідності
-            
-            # Це потребує декодування event logs
-            # Для простоти зараз пропускаємо
-            pass
-            
-        except Exception as e:
-            logger.error(f"Error processing block transactions: {e}")
-    
     async def create_signal(self, blockchain: str, token_address: str, event_type: str, 
-                           price: float, liquidity: float, volume_24h: float = 0):
+                           price: float, liquidity: float, volume_24h: float = 0,
+                           token_symbol: str = None, spread: float = None, trace=None):
         """Create a new signal in the database"""
         try:
             signal = {
-                'id': str(datetime.now(timezone.utc).timestamp()),
+                'id': str(uuid.uuid4()),
                 'blockchain': blockchain,
                 'token_address': token_address,
+                'shard_bucket': shard_bucket(token_address),
+                'token_symbol': token_symbol,
                 'event_type': event_type,
                 'price': price,
                 'liquidity': liquidity,
                 'volume_24h': volume_24h,
+                'spread': spread,
                 'timestamp': datetime.now(timezone.utc).isoformat(),
                 'status': 'pending'
             }
             
-            await self.db.signals.insert_one(signal)
+            await self.signal_inserts.insert(signal)
+            signal.pop('_id', None)
+            # The trace rides along in memory only; it is attached after the insert
+            if trace is not None:
+                trace.mark('signal_insert')
+                signal['trace'] = trace
+            if self.signal_bus is not None:
+                self.signal_bus.publish(signal)
             logger.info(f"Created signal: {blockchain} - {token_address}")
             return signal
             
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Settings the dashboard may change at runtime (the fields of BotConfig in server.py)
+LIVE_KEYS = (
+    'min_spread', 'max_spread', 'min_liquidity', 'min_volume_24h', 'trade_amount',
+    'auto_trading', 'active_blockchains', 'active_exchanges'
+)
+
+class ConfigProvider:
+    """In-memory bot settings, kept in sync with the db.bot_config document.
+
+    `current` is a plain dict that is replaced, never mutated, when a new
+    version arrives, so readers always see one consistent set of values and
+    never touch the database. Changes arrive through a change stream, or
+    through a poll of the version stamp where change streams are unavailable.
+    """
+
+    def __init__(self, collection, base: Dict, poll_interval: float = 5.0):
+        self.collection = collection
+        # Local settings; live keys from the database are layered over them
+        self.base = base
+        self.current = base
+        self.poll_interval = poll_interval
+        self.stamp: Optional[Tuple] = None
+        self.listeners: List[Callable[[Dict], None]] = []
+
+    def get(self, key: str, default=None):
+        return self.current.get(key, default)
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Call listener(config) after every applied change"""
+        self.listeners.append(listener)
+
+    async def load(self):
+        """Read the stored settings once; an unreachable or empty collection leaves the local ones"""
+        try:
+            doc = await self.collection.find_one({}, {'_id': 0})
+        except Exception as e:
+            logger.error(f"Error loading bot config: {e}")
+            return
+        if doc:
+            self.apply(doc)
+
+    def apply(self, doc: Dict) -> bool:
+        """Swap in the live values of a bot_config document; invalid documents are ignored"""
+        stamp = (doc.get('version'), doc.get('updated_at'))
+        if stamp == self.stamp:
+            return False
+
+        # A rejected version is not fetched again; the next valid one replaces it
+        self.stamp = stamp
+        overrides = {}
+        try:
+            for key in LIVE_KEYS:
+                if key in doc:
+                    overrides[key] = self._coerce(key, doc[key])
+        except (TypeError, ValueError) as e:
+            logger.error(f"Ignoring invalid bot config version {stamp[0]}: {e}")
+            return False
+
+        config = {**self.base, **overrides}
+        # Live trading stays off unless it is also enabled locally
+        config['auto_trading'] = bool(config.get('auto_trading')) and bool(self.base.get('auto_trading', False))
+        if config.get('min_spread', 0) > config.get('max_spread', float('inf')):
+            logger.error(f"Ignoring bot config version {stamp[0]}: min_spread above max_spread")
+            return False
+
+        changed = {key: value for key, value in config.items() if self.current.get(key) != value}
+        self.current = config
+        if changed:
+            logger.info(f"Bot config version {stamp[0]} applied: {changed}")
+        for listener in self.listeners:
+            try:
+                listener(config)
+            except Exception as e:
+                logger.error(f"Error in config listener: {e}")
+        return True
+
+    def _coerce(self, key: str, value):
+        local = self.base.get(key)
+        if isinstance(local, bool):
+            return bool(value)
+        if isinstance(local, (int, float)):
+            value = float(value)
+            if value < 0:
+                raise ValueError(f"{key} is negative")
+            return value
+        if isinstance(local, list):
+            if not isinstance(value, list):
+                raise TypeError(f"{key} is not a list")
+            return list(value)
+        return value
+
+    async def run(self):
+        """Follow changes; poll the version stamp if change streams are unavailable"""
+        try:
+            async with self.collection.watch(full_document='updateLookup') as stream:
+                logger.info("Watching bot config change stream")
+                async for change in stream:
+                    doc = change.get('fullDocument')
+                    if doc:
+                        doc.pop('_id', None)
+                        self.apply(doc)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Bot config change stream unavailable, polling instead: {e}")
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Error polling bot config: {e}")
+
+    async def poll(self):
+        """Fetch only the version stamp, and the full document when it moved"""
+        head = await self.collection.find_one({}, {'_id': 0, 'version': 1, 'updated_at': 1})
+        if head and (head.get('version'), head.get('updated_at')) != self.stamp:
+            await self.load()
@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional, Union
+from eth_utils import keccak
+
+def event_topic(signature: str) -> str:
+    return '0x' + keccak(text=signature).hex()
+
+# Uniswap V2 style events, shared by PancakeSwap V2; hashed once at import
+PAIR_CREATED_TOPIC = event_topic('PairCreated(address,address,address,uint256)')
+MINT_TOPIC = event_topic('Mint(address,uint256,uint256)')
+SWAP_TOPIC = event_topic('Swap(address,uint256,uint256,uint256,uint256,address)')
+
+# Tokens new pairs are quoted against, per chain: address (lowercase) -> (symbol, decimals, is native)
+QUOTE_TOKENS: Dict[str, Dict[str, tuple]] = {
+    'ethereum': {
+        '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2': ('WETH', 18, True),
+        '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48': ('USDC', 6, False),
+        '0xdac17f958d2ee523a2206206994597c13d831ec7': ('USDT', 6, False),
+        '0x6b175474e89094c44da98b954eedeac495271d0f': ('DAI', 18, False)
+    },
+    'bsc': {
+        '0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c': ('WBNB', 18, True),
+        '0xe9e7cea3dedca5984780bafc599bd69add087d56': ('BUSD', 18, False),
+        '0x55d398326f99059ff775485246999027b3197955': ('USDT', 18, False),
+        '0x8ac76a51cc950d9822d68b83fe1ad97b32cd580d': ('USDC', 18, False)
+    }
+}
+
+# Pair priced in USD for each chain's native token: (pair, native token, stable token, stable decimals)
+NATIVE_REFERENCE_PAIRS: Dict[str, tuple] = {
+    'ethereum': ('0xb4e16d0168e52d35cacd2c6185b44281ec28c9dc', '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2',
+                 '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48', 6),
+    'bsc': ('0x58f876857a02d6762e0101bb5c46a8c1ed44dc16', '0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c',
+            '0xe9e7cea3dedca5984780bafc599bd69add087d56', 18)
+}
+
+# Function selectors for eth_call
+GET_RESERVES_SELECTOR = '0x0902f1ac'
+DECIMALS_SELECTOR = '0x313ce567'
+SYMBOL_SELECTOR = '0x95d89b41'
+
+def _hex(value: Union[bytes, str]) -> str:
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    return value[2:] if value.startswith('0x') else value
+
+def words(data: Union[bytes, str]) -> List[int]:
+    """ABI-encoded static data split into 32-byte unsigned integers"""
+    raw = _hex(data)
+    return [int(raw[i:i + 64], 16) for i in range(0, len(raw) - 63, 64)]
+
+def decode_string(data: Union[bytes, str]) -> Optional[str]:
+    """An ABI string return value, or the bytes32 some older tokens return instead"""
+    raw = bytes.fromhex(_hex(data))
+    try:
+        if len(raw) >= 64:
+            offset = int.from_bytes(raw[:32], 'big')
+            length = int.from_bytes(raw[offset:offset + 32], 'big')
+            text = raw[offset + 32:offset + 32 + length]
+        else:
+            text = raw[:32].rstrip(b'\x00')
+        return text.decode('utf-8').strip() or None
+    except (ValueError, OverflowError, UnicodeDecodeError):
+        return None
+
+def topic_address(topic: Union[bytes, str]) -> str:
+    return '0x' + _hex(topic)[-40:].lower()
+
+def word_address(word: int) -> str:
+    return '0x' + format(word, '040x')[-40:]
+
+def decode_log(log: Dict) -> Optional[Dict]:
+    """Decode a PairCreated, Mint or Swap log into a plain dict; None for anything else"""
+    topics = log.get('topics') or []
+    if not topics:
+        return None
+    topic = '0x' + _hex(topics[0]).lower()
+    values = words(log.get('data') or b'')
+    address = str(log['address']).lower()
+    block = log.get('blockNumber')
+
+    if topic == PAIR_CREATED_TOPIC and len(topics) >= 3 and values:
+        return {
+            'event': 'PairCreated', 'factory': address, 'block': block,
+            'token0': topic_address(topics[1]), 'token1': topic_address(topics[2]), 'pair': word_address(values[0])
+        }
+    if topic == MINT_TOPIC and len(values) >= 2:
+        return {'event': 'Mint', 'pair': address, 'block': block, 'amount0': values[0], 'amount1': values[1]}
+    if topic == SWAP_TOPIC and len(values) >= 4:
+        return {
+            'event': 'Swap', 'pair': address, 'block': block,
+            'amount0_in': values[0], 'amount1_in': values[1], 'amount0_out': values[2], 'amount1_out': values[3]
+        }
+    return None
@@ -0,0 +1,179 @@
+import logging
+import operator
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns every batch carries; missing values are 0
+NUMERIC_FIELDS = ('liquidity', 'volume_24h', 'price', 'price_change_24h', 'spread')
+
+OPERATORS = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+# "<field> <op> <number>" or "<field> / <field> <op> <number>"
+RULE_PATTERN = re.compile(r'^\s*(\w+)\s*(?:/\s*(\w+)\s*)?(>=|<=|==|!=|>|<)\s*(-?[\d.]+(?:e-?\d+)?)\s*$')
+
+class RuleError(ValueError):
+    pass
+
+def parse_rule(rule: str) -> Tuple[Tuple[str, Optional[str]], str, float]:
+    """Split a rule into ((field, divisor field or None), operator, threshold)"""
+    match = RULE_PATTERN.match(rule)
+    if not match:
+        raise RuleError(f"Cannot parse filter rule: {rule!r}")
+    field, divisor, op, value = match.groups()
+    for name in (field, divisor):
+        if name is not None and name not in NUMERIC_FIELDS:
+            raise RuleError(f"Unknown field {name!r} in filter rule {rule!r}")
+    return (field, divisor), op, float(value)
+
+class CompiledFilter:
+    """Filter rules compiled into array operations over a columnar batch.
+
+    Each distinct (operand, operator) becomes one comparison against a
+    per-row threshold column, so a chain override only changes which
+    threshold a row is compared with. Evaluating a batch costs a fixed
+    number of NumPy operations, however many rows it has.
+    """
+
+    def __init__(self, terms: List[Tuple], blacklist: Dict[str, frozenset]):
+        # (field, divisor, compare, base threshold or nan, {chain: threshold})
+        self.terms = terms
+        self.blacklist = blacklist
+        # Columns the rules read; batches only need to extract these
+        self.fields = frozenset(
+            [field for field, divisor, *_ in terms] + [divisor for _, divisor, *_ in terms if divisor] +
+            (['chain'] if any(overrides for *_, overrides in terms) else []) +
+            [field for field, values in blacklist.items() if values]
+        )
+
+    def mask(self, columns: Dict[str, np.ndarray], exempt: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """Boolean array marking the rows that pass every rule.
+
+        `exempt` maps a field to a boolean array of rows that rules reading
+        that field do not apply to, e.g. volume rules for events that carry no volume.
+        """
+        size = columns['size']
+        passed = np.ones(size, dtype=bool)
+        if not size:
+            return passed
+
+        for field, divisor, compare, base, overrides in self.terms:
+            values = columns[field]
+            if divisor is not None:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    values = np.where(columns[divisor] > 0, values / columns[divisor], np.inf)
+            thresholds = np.full(size, base)
+            for chain, threshold in overrides.items():
+                thresholds[columns['chain'] == chain] = threshold
+            for name in (field, divisor):
+                if exempt and name in exempt:
+                    thresholds[exempt[name]] = np.nan
+            # A nan threshold means the rule does not apply to that row
+            passed &= compare(values, thresholds) | np.isnan(thresholds)
+
+        for field, values in self.blacklist.items():
+            if values:
+                passed &= ~np.isin(columns[field], list(values))
+        return passed
+
+    def select(self, records: Sequence[Dict], columns: Dict[str, np.ndarray]) -> List[Dict]:
+        return [records[i] for i in np.flatnonzero(self.mask(columns))]
+
+def compile_rules(spec: Dict) -> CompiledFilter:
+    """Compile a rule spec once.
+
+    spec = {
+        'rules': ["liquidity >= 5000", "volume_24h / liquidity <= 50"],
+        'chains': {'solana': ["liquidity >= 20000"]},
+        'blacklist': {'token_address': [...], 'token_symbol': [...]}
+    }
+
+    A chain rule with the same operand and operator as a base rule replaces
+    its threshold for that chain; any other chain rule applies to that chain only.
+    """
+    terms: Dict[Tuple, List] = {}
+    for rule in spec.get('rules', []):
+        operand, op, value = parse_rule(rule)
+        terms.setdefault((operand, op), [np.nan, {}])[0] = value
+    for chain, rules in (spec.get('chains') or {}).items():
+        for rule in rules:
+            operand, op, value = parse_rule(rule)
+            terms.setdefault((operand, op), [np.nan, {}])[1][chain.lower()] = value
+
+    blacklist = spec.get('blacklist') or {}
+    return CompiledFilter(
+        [(field, divisor, OPERATORS[op], base, overrides) for ((field, divisor), op), (base, overrides) in terms.items()],
+        {
+            'token_address': frozenset(address.lower() for address in blacklist.get('token_address', [])),
+            'token_symbol': frozenset(symbol.upper() for symbol in blacklist.get('token_symbol', []))
+        }
+    )
+
+def threshold_rules(min_liquidity: float, min_volume_24h: float) -> Dict:
+    """Spec for the plain minimum liquidity and volume checks"""
+    return {'rules': [f"liquidity >= {float(min_liquidity)}", f"volume_24h >= {float(min_volume_24h)}"]}
+
+def _numeric(values: List) -> np.ndarray:
+    try:
+        return np.asarray([value or 0 for value in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        # Rare malformed values; fall back to converting one by one
+        return np.array([_number(value) for value in values], dtype=np.float64)
+
+def _number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _text(values: List, upper: bool = False) -> np.ndarray:
+    return np.array([(value or '').upper() if upper else (value or '').lower() for value in values], dtype=object)
+
+# Where each column comes from in a signal document and in a raw DEXScreener pair
+SIGNAL_FIELDS = {
+    'chain': lambda signal: signal.get('blockchain'),
+    'token_address': lambda signal: signal.get('token_address'),
+    'token_symbol': lambda signal: signal.get('token_symbol'),
+    **{name: (lambda signal, name=name: signal.get(name)) for name in NUMERIC_FIELDS}
+}
+
+PAIR_FIELDS = {
+    'chain': lambda pair: pair.get('chainId'),
+    'token_address': lambda pair: (pair.get('baseToken') or {}).get('address'),
+    'token_symbol': lambda pair: (pair.get('baseToken') or {}).get('symbol'),
+    'liquidity': lambda pair: (pair.get('liquidity') or {}).get('usd'),
+    'volume_24h': lambda pair: (pair.get('volume') or {}).get('h24'),
+    'price': lambda pair: pair.get('priceUsd'),
+    'price_change_24h': lambda pair: (pair.get('priceChange') or {}).get('h24'),
+    'spread': lambda pair: 0.0
+}
+
+def _extract(records: Sequence[Dict], getters: Dict, fields: Optional[frozenset]) -> Dict[str, np.ndarray]:
+    columns = {'size': len(records)}
+    for name, get in getters.items():
+        if fields is not None and name not in fields:
+            continue
+        values = [get(record) for record in records]
+        if name in NUMERIC_FIELDS:
+            columns[name] = _numeric(values)
+        else:
+            columns[name] = _text(values, upper=name == 'token_symbol')
+    return columns
+
+def signal_columns(signals: Sequence[Dict], fields: Optional[frozenset] = None) -> Dict[str, np.ndarray]:
+    """Columnar batch from signal documents, limited to `fields` when given"""
+    return _extract(signals, SIGNAL_FIELDS, fields)
+
+def pair_columns(pairs: Sequence[Dict], chain: Optional[str] = None, fields: Optional[frozenset] = None) -> Dict[str, np.ndarray]:
+    """Columnar batch from raw DEXScreener pairs, limited to `fields` when given"""
+    getters = PAIR_FIELDS if chain is None else {**PAIR_FIELDS, 'chain': lambda pair: chain}
+    return _extract(pairs, getters, fields)
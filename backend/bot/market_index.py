@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import math
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+def round_step(value: float, step: float, up: bool = False) -> float:
+    """Round a price or quantity to an exchange tick/lot step"""
+    if step <= 0:
+        return value
+    steps = value / step
+    # Tolerate float noise such as 2.9999999 steps
+    steps = math.ceil(steps - 1e-9) if up else math.floor(steps + 1e-9)
+    return round(steps * step, 12)
+
+class MarketIndex:
+    """In-memory index of spot instruments across exchanges, keyed by base asset and contract address"""
+
+    def __init__(self, exchanges: Dict, quote: str = 'USDT', refresh_interval: float = 300.0):
+        self.exchanges = exchanges
+        self.quote = quote
+        self.refresh_interval = refresh_interval
+        self.running = False
+
+        # base asset -> {exchange name: instrument}
+        self.by_base: Dict[str, Dict[str, Dict]] = {}
+        # contract address (lowercase) -> base asset
+        self.by_address: Dict[str, str] = {}
+        # exchange name -> {symbol: instrument}
+        self.by_exchange: Dict[str, Dict[str, Dict]] = {}
+
+    async def load(self):
+        """Load instruments from every exchange in parallel"""
+        names = list(self.exchanges)
+        results = await asyncio.gather(*(self.refresh_exchange(name) for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                # refresh_exchange changes nothing until the venue's listings are parsed, so its old entries stay
+                logger.error(f"Market index refresh of {name} failed, keeping its previous listings: {result!r}")
+        logger.info(f"Market index loaded: {len(self.by_base)} assets on {len(self.by_exchange)} exchanges")
+
+    async def run(self):
+        """Refresh the index in the background"""
+        self.running = True
+        while self.running:
+            await asyncio.sleep(self.refresh_interval)
+            await self.load()
+
+    async def refresh_exchange(self, name: str):
+        """Reload one exchange and apply only the listings that changed"""
+        client = self.exchanges[name]
+        markets, addresses = await asyncio.gather(client.get_markets(), client.get_token_addresses())
+        if not markets:
+            # Keep the previous listings if the venue failed to answer
+            return
+
+        # Parsed in full before the index is touched, so a malformed listing leaves the previous entries in place
+        new = {m['symbol']: m for m in markets if m['quote'] == self.quote and m['base']}
+        old = self.by_exchange.get(name, {})
+
+        for symbol in old.keys() - new.keys():
+            listings = self.by_base.get(old[symbol]['base'], {})
+            listings.pop(name, None)
+            if not listings:
+                self.by_base.pop(old[symbol]['base'], None)
+
+        added = new.keys() - old.keys()
+        for instrument in new.values():
+            self.by_base.setdefault(instrument['base'], {})[name] = instrument
+        self.by_exchange[name] = new
+
+        for address, base in addresses.items():
+            self.by_address[address] = base
+
+        if old and added:
+            logger.info(f"New listings on {name}: {', '.join(sorted(added))}")
+
+    def get_instrument(self, exchange: str, symbol: str) -> Optional[Dict]:
+        """Instrument metadata (tick and lot size) for an exchange symbol"""
+        return self.by_exchange.get(exchange, {}).get(symbol)
+
+    def resolve(self, signal: Dict) -> Dict[str, Dict]:
+        """Exchanges listing the signal's token, preferring a contract address match over the ticker"""
+        base = self.by_address.get((signal.get('token_address') or '').lower())
+        if base is None and signal.get('token_symbol'):
+            base = signal['token_symbol'].upper()
+        return self.by_base.get(base, {}) if base else {}
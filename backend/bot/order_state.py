@@ -0,0 +1,44 @@
+from typing import Optional
+
+# Order states, as normalized by the exchange user-data streams plus the local cancel-pending state
+NEW = 'new'
+PARTIALLY_FILLED = 'partially_filled'
+FILLED = 'filled'
+CANCEL_PENDING = 'cancel_pending'
+CANCELLED = 'cancelled'
+REJECTED = 'rejected'
+
+TERMINAL = frozenset((FILLED, CANCELLED, REJECTED))
+
+# Reported status -> resulting status, per current status. Anything missing is stale or out of order
+TRANSITIONS = {
+    NEW: {
+        NEW: NEW,
+        PARTIALLY_FILLED: PARTIALLY_FILLED,
+        FILLED: FILLED,
+        CANCEL_PENDING: CANCEL_PENDING,
+        CANCELLED: CANCELLED,
+        REJECTED: REJECTED
+    },
+    PARTIALLY_FILLED: {
+        PARTIALLY_FILLED: PARTIALLY_FILLED,
+        FILLED: FILLED,
+        CANCEL_PENDING: CANCEL_PENDING,
+        CANCELLED: CANCELLED
+    },
+    # A cancel was sent; fills that race it are still recorded, but only a final status ends it
+    CANCEL_PENDING: {
+        NEW: CANCEL_PENDING,
+        PARTIALLY_FILLED: CANCEL_PENDING,
+        FILLED: FILLED,
+        CANCELLED: CANCELLED,
+        REJECTED: CANCELLED
+    }
+}
+
+def transition(current: Optional[str], reported: str) -> Optional[str]:
+    """Status an order moves to when the exchange reports `reported`, or None to ignore the report"""
+    return TRANSITIONS.get(current or NEW, {}).get(reported)
+
+def is_terminal(status: Optional[str]) -> bool:
+    return status in TERMINAL
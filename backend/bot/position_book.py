@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+from . import order_state
+
+logger = logging.getLogger(__name__)
+
+# Trade statuses: pending (entry working) -> open (held) -> closing (exit working) -> closed, or cancelled
+ACTIVE_STATUSES = ('pending', 'open', 'closing')
+
+class Position:
+    """One trade, as stored in db.trades"""
+
+    __slots__ = (
+        'id', 'signal_id', 'exchange', 'symbol', 'side', 'entry_price', 'amount',
+        'spread', 'slippage', 'status', 'order_id', 'order_status', 'filled_amount',
+        'exit_order_id', 'exit_order_status', 'exit_filled_amount', 'exit_price',
+        'profit', 'chain', 'owner', 'created_at', 'closed_at', 'order_placed_at', 'exit_placed_at'
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, doc: Dict) -> 'Position':
+        return cls(**doc)
+
+    def to_dict(self) -> Dict:
+        """Document form; unset fields are left out"""
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+class PositionBook:
+    """Authoritative in-memory view of active positions, indexed by id, market and order id"""
+
+    def __init__(self):
+        self.by_id: Dict[str, Position] = {}
+        # (exchange, symbol) -> {position id: position}
+        self.by_market: Dict[Tuple[str, str], Dict[str, Position]] = {}
+        # (exchange, order id) -> position, for entry and exit orders still expecting updates
+        self.by_order: Dict[Tuple[str, str], Position] = {}
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    async def load(self, collection, query: Optional[Dict] = None):
+        """Load active positions once at startup"""
+        docs = await collection.find(query or {"status": {"$in": list(ACTIVE_STATUSES)}}, {"_id": 0}).to_list(None)
+        for doc in docs:
+            self.add(Position.from_dict(doc))
+        logger.info(f"Position book loaded: {len(self.by_id)} active positions")
+
+    def add(self, position: Position):
+        self.by_id[position.id] = position
+        self.by_market.setdefault((position.exchange, position.symbol), {})[position.id] = position
+        # Orders already in a final state expect no more updates
+        if position.order_id and not order_state.is_terminal(position.order_status):
+            self.by_order[(position.exchange, position.order_id)] = position
+        if position.exit_order_id and not order_state.is_terminal(position.exit_order_status):
+            self.by_order[(position.exchange, position.exit_order_id)] = position
+
+    def get(self, position_id: str) -> Optional[Position]:
+        return self.by_id.get(position_id)
+
+    def open_in(self, exchange: str, symbol: str) -> bool:
+        """Whether a position is active in the market, whatever its order state"""
+        return bool(self.by_market.get((exchange, symbol)))
+
+    def markets(self) -> Dict[Tuple[str, str], List[Position]]:
+        """Held positions with no working order, grouped by (exchange, symbol)"""
+        groups = {}
+        for key, positions in self.by_market.items():
+            held = [position for position in positions.values() if position.status == 'open']
+            if held:
+                groups[key] = held
+        return groups
+
+    def find_order(self, exchange: str, order_id: str) -> Optional[Position]:
+        return self.by_order.get((exchange, order_id))
+
+    def track_order(self, position: Position, order_id: Optional[str]):
+        if order_id:
+            self.by_order[(position.exchange, order_id)] = position
+
+    def release_order(self, exchange: str, order_id: Optional[str]):
+        """Stop routing updates for an order that reached a final state"""
+        self.by_order.pop((exchange, order_id), None)
+
+    def close(self, position: Position):
+        """Remove a finished position from every index"""
+        self.by_id.pop(position.id, None)
+        market = self.by_market.get((position.exchange, position.symbol))
+        if market is not None:
+            market.pop(position.id, None)
+            if not market:
+                del self.by_market[(position.exchange, position.symbol)]
+        if position.order_id:
+            self.by_order.pop((position.exchange, position.order_id), None)
+        if position.exit_order_id:
+            self.by_order.pop((position.exchange, position.exit_order_id), None)
+
+    def working_orders(self) -> List[Tuple[Position, str]]:
+        """(position, order id) for every order still expecting updates"""
+        return [(position, order_id) for (_, order_id), position in self.by_order.items()]
+
+    def open_positions(self) -> Iterable[Position]:
+        return self.by_id.values()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Replay / backtest harness for TradingEngine.
+
+Feeds recorded signals and order book snapshots through an unmodified
+TradingEngine, backed by a simulated exchange and an in-memory database, on a
+simulated clock. Usage:
+
+    python -m bot.replay data.npz --band 2,3 --band 1.5,2.5
+"""
+
+import argparse
+import asyncio
+import copy
+import functools
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from exchanges.base_exchange import BaseExchange
+from exchanges.orderbook import OrderBook
+from .trading_engine import TradingEngine
+
+logger = logging.getLogger(__name__)
+
+class ReplayData:
+    """Recorded order book snapshots and signals in a compact .npz file.
+
+    Snapshots are stored column-wise: a time and market index per snapshot and
+    (snapshots, depth) float32 arrays of bid/ask prices and sizes, padded with
+    zeros. Markets are instrument dicts (as returned by get_markets) plus an
+    'exchange' key; signals are signal documents with a 'time' field (epoch
+    seconds).
+    """
+
+    def __init__(self, markets: List[Dict], times: np.ndarray, market_idx: np.ndarray,
+                 bid_px: np.ndarray, bid_sz: np.ndarray, ask_px: np.ndarray, ask_sz: np.ndarray,
+                 signals: List[Dict]):
+        self.markets = markets
+        self.times = np.asarray(times, dtype=np.float64)
+        self.market_idx = np.asarray(market_idx, dtype=np.int32)
+        self.bid_px, self.bid_sz = bid_px, bid_sz
+        self.ask_px, self.ask_sz = ask_px, ask_sz
+        self.signals = sorted(signals, key=lambda signal: signal['time'])
+
+        # Per market: snapshot rows and their times in time order, for binary search by time
+        self._rows: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        order = np.argsort(self.times, kind='stable')
+        for i, market in enumerate(markets):
+            rows = order[self.market_idx[order] == i]
+            self._rows[(market['exchange'], market['symbol'])] = (rows, self.times[rows])
+
+    @classmethod
+    def load(cls, path: str) -> 'ReplayData':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                json.loads(str(data['markets'])),
+                data['times'], data['market_idx'],
+                data['bid_px'], data['bid_sz'], data['ask_px'], data['ask_sz'],
+                json.loads(str(data['signals']))
+            )
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            markets=json.dumps(self.markets),
+            times=self.times,
+            market_idx=self.market_idx,
+            bid_px=self.bid_px.astype(np.float32),
+            bid_sz=self.bid_sz.astype(np.float32),
+            ask_px=self.ask_px.astype(np.float32),
+            ask_sz=self.ask_sz.astype(np.float32),
+            signals=json.dumps(self.signals)
+        )
+
+    @property
+    def start(self) -> float:
+        return float(self.times.min()) if len(self.times) else 0.0
+
+    @property
+    def end(self) -> float:
+        return float(self.times.max()) if len(self.times) else 0.0
+
+    def book_at(self, exchange: str, symbol: str, at: float) -> Optional[OrderBook]:
+        """Latest snapshot of a market at or before a time"""
+        rows, times = self._rows.get((exchange, symbol), (None, None))
+        if rows is None:
+            return None
+        i = int(times.searchsorted(at, side='right')) - 1
+        if i < 0:
+            return None
+
+        row = rows[i]
+        book = OrderBook(symbol, depth=self.bid_px.shape[1])
+        for side, px, sz in ((book.bids, self.bid_px[row], self.bid_sz[row]), (book.asks, self.ask_px[row], self.ask_sz[row])):
+            live = (px > 0) & (sz > 0)
+            levels = np.empty((int(live.sum()), 2), dtype=np.float64)
+            levels[:, 0] = px[live]
+            levels[:, 1] = sz[live]
+            side.load(levels)
+        return book
+
+class SimulatedClock:
+    """Replay time in epoch seconds; only moves when the harness advances it"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance_to(self, at: float):
+        self.now = max(self.now, at)
+
+class SimulatedExchange(BaseExchange):
+    """Exchange backed by recorded books; orders fill against the book seen after a latency"""
+
+    def __init__(self, name: str, data: ReplayData, clock: SimulatedClock,
+                 fee_rate: float = 0.001, latency: float = 0.05, balance: float = 1e9):
+        super().__init__('', '', use_websocket=False)
+        self.name = name
+        self.data = data
+        self.clock = clock
+        self.fee_rate = fee_rate
+        self.latency = latency
+        self.balances = {'USDT': balance}
+        self.on_event = None
+        self.fees = 0.0
+        self._order_seq = 0
+        # Final state of every order, as get_order reports it
+        self.orders: Dict[str, Dict] = {}
+
+    def start_user_stream(self, on_event) -> bool:
+        self.on_event = on_event
+        return True
+
+    async def get_balance(self) -> Dict[str, float]:
+        return dict(self.balances)
+
+    async def fetch_orderbook(self, symbol: str) -> OrderBook:
+        return self.data.book_at(self.name, symbol, self.clock.now) or OrderBook(symbol)
+
+    async def create_order(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
+        """Fill immediately-or-cancel against the book `latency` seconds later, capped at the limit price"""
+        fill_time = self.clock.now + self.latency
+        book = self.data.book_at(self.name, symbol, fill_time)
+        if book is None:
+            return {'error': f"no book for {symbol}"}
+
+        book_side = book.asks if side == 'buy' else book.bids
+        n = book_side.count
+        prices, sizes = book_side.prices[:n], book_side.sizes[:n]
+        if price is not None:
+            allowed = prices <= price if side == 'buy' else prices >= price
+            prices, sizes = prices[allowed], sizes[allowed]
+
+        # Walk the reachable levels for as much of the amount as they hold
+        taken = np.clip(amount - (np.cumsum(sizes) - sizes), 0.0, sizes)
+        filled = float(taken.sum())
+        notional = float((taken * prices).sum())
+        avg_price = notional / filled if filled else 0.0
+        self.fees += notional * self.fee_rate
+
+        self._order_seq += 1
+        order_id = f"{self.name}-{self._order_seq}"
+        # Immediate-or-cancel: whatever did not fill is cancelled
+        status = 'filled' if filled >= amount * (1 - 1e-9) else 'cancelled'
+
+        self.orders[order_id] = {'order_id': order_id, 'status': status, 'filled': filled, 'avg_price': avg_price}
+        if self.on_event is not None:
+            await self.on_event({
+                'type': 'order', 'order_id': order_id, 'symbol': symbol, 'side': side,
+                'status': status, 'quantity': amount, 'price': price or 0.0,
+                'filled': filled, 'avg_price': avg_price
+            })
+        return dict(self.orders[order_id])
+
+    async def get_ticker(self, symbol: str) -> Dict:
+        book = await self.fetch_orderbook(symbol)
+        return {'bid': book.best_bid, 'ask': book.best_ask}
+
+    async def get_open_orders(self, symbol: Optional[str] = None) -> List[Dict]:
+        # Orders are immediate-or-cancel, so nothing ever rests
+        return []
+
+    async def cancel_order(self, order_id: str, symbol: str) -> bool:
+        return False
+
+    async def get_order(self, order_id: str, symbol: str) -> Dict:
+        return dict(self.orders.get(order_id, {}))
+
+    async def get_markets(self) -> List[Dict]:
+        return [market for market in self.data.markets if market['exchange'] == self.name]
+
+def _matches(doc: Dict, query: Dict) -> bool:
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            for op, arg in condition.items():
+                if op == '$in' and value not in arg:
+                    return False
+                if op == '$nin' and value in arg:
+                    return False
+                if op == '$exists' and (key in doc) != arg:
+                    return False
+                if op == '$lt' and not (value is not None and value < arg):
+                    return False
+                if op == '$mod' and not (value is not None and value % arg[0] == arg[1]):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+class _Result:
+    def __init__(self, matched_count: int):
+        self.matched_count = matched_count
+        self.modified_count = matched_count
+
+class _Cursor:
+    def __init__(self, docs: List[Dict]):
+        self.docs = docs
+
+    def limit(self, n: int) -> '_Cursor':
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def sort(self, key: str, direction: int = 1) -> '_Cursor':
+        self.docs.sort(key=lambda doc: doc.get(key), reverse=direction < 0)
+        return self
+
+    async def to_list(self, n: Optional[int]) -> List[Dict]:
+        return self.docs[:n] if n else self.docs
+
+class MemoryCollection:
+    """The subset of the Motor collection API the engine uses, kept in a list"""
+
+    def __init__(self):
+        self.docs: List[Dict] = []
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> _Cursor:
+        return _Cursor([copy.deepcopy(doc) for doc in self.docs if _matches(doc, query or {})])
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        for doc in self.docs:
+            if _matches(doc, query or {}):
+                return copy.deepcopy(doc)
+        return None
+
+    async def insert_one(self, doc: Dict):
+        self.docs.append(copy.deepcopy(doc))
+
+    async def insert_many(self, docs: List[Dict], ordered: bool = True):
+        self.docs.extend(copy.deepcopy(docs))
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> _Result:
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update.get('$set', {}))
+                return _Result(1)
+        if upsert:
+            doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            doc.update(update.get('$set', {}))
+            self.docs.append(doc)
+        return _Result(0)
+
+    async def update_many(self, query: Dict, update: Dict) -> _Result:
+        matched = [doc for doc in self.docs if _matches(doc, query)]
+        for doc in matched:
+            doc.update(update.get('$set', {}))
+        return _Result(len(matched))
+
+    async def bulk_write(self, operations: List, ordered: bool = True):
+        # Operations come from WriteBehind as BufferedUpdate
+        for op in operations:
+            await self.update_one(op.filter, op.update, upsert=op.upsert)
+
+    async def count_documents(self, query: Dict) -> int:
+        return sum(1 for doc in self.docs if _matches(doc, query))
+
+class MemoryDatabase:
+    def __init__(self):
+        self.signals = MemoryCollection()
+        self.trades = MemoryCollection()
+        self.bot_config = MemoryCollection()
+
+async def run_replay(data: ReplayData, config: Dict, monitor_interval: float = 5.0,
+                     fee_rate: float = 0.001, latency: float = 0.05) -> Dict:
+    """Run recorded data through a fresh TradingEngine and return PnL and latency stats.
+
+    Signals are inserted and published on the signal bus at their recorded
+    times and reach placement through the engine's own scheduler. Monitor,
+    reconcile and recovery passes run on the simulated clock at their
+    configured intervals.
+    """
+    clock = SimulatedClock(min(data.start, data.signals[0]['time']) if data.signals else data.start)
+    db = MemoryDatabase()
+    names = sorted({market['exchange'] for market in data.markets})
+    config = {
+        'auto_trading': True,
+        'signal_change_stream': False,
+        'active_exchanges': names,
+        **config
+    }
+    engine = TradingEngine(db, config, clock=clock)
+
+    exchanges = {name: SimulatedExchange(name, data, clock, fee_rate=fee_rate, latency=latency) for name in names}
+    for name, client in exchanges.items():
+        engine.add_exchange(name, client)
+        client.start_user_stream(functools.partial(engine.on_user_event, name))
+    await engine.market_index.load()
+    batch_size = config.get('signal_batch_size', 10)
+
+    async def drain_user_events():
+        while not engine.user_events.empty():
+            await engine.apply_user_event(*engine.user_events.get_nowait())
+
+    def take_published() -> List[Dict]:
+        queue = engine.signal_bus.queue
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    async def handle_scheduled():
+        # Workers would take every scheduled batch before simulated time moves on
+        while len(engine.scheduler):
+            await engine.handle_scheduled(batch_size)
+            await drain_user_events()
+
+    async def recover_signals():
+        # Live, the writers' short flush interval has status changes stored before the poll reads them
+        await engine.signal_writer.flush()
+        await engine.process_signals()
+        await engine.schedule_batch(take_published())
+
+    # Periodic engine passes; one with nothing to act on is skipped, which is what makes replay fast
+    passes = {
+        'monitor': (monitor_interval, lambda: len(engine.positions) > 0, engine.monitor_trades),
+        'reconcile': (config.get('reconcile_interval', 15), lambda: bool(engine.positions.working_orders()), engine.reconcile_pass),
+        'recover': (config.get('signal_recovery_interval', 30), lambda: True, recover_signals)
+    }
+    next_run = {name: clock.now for name in passes}
+
+    decision_times, monitor_times = [], []
+    i = 0
+    wall_start = time.perf_counter()
+    while i < len(data.signals) or min(next_run.values()) <= data.end:
+        due = min(next_run, key=next_run.get)
+        if i < len(data.signals) and data.signals[i]['time'] <= next_run[due]:
+            at = data.signals[i]['time']
+            clock.advance_to(at)
+            batch = []
+            while i < len(data.signals) and data.signals[i]['time'] == at:
+                signal = {key: value for key, value in data.signals[i].items() if key != 'time'}
+                signal.setdefault('status', 'pending')
+                signal.setdefault('timestamp', datetime.fromtimestamp(at, timezone.utc).isoformat())
+                batch.append(signal)
+                i += 1
+            # As the monitor does: insert, then publish for the engine's intake
+            await db.signals.insert_many(batch)
+            for signal in batch:
+                engine.signal_bus.publish(signal)
+            started = time.perf_counter()
+            await engine.schedule_batch(take_published())
+            await handle_scheduled()
+            decision_times.append((time.perf_counter() - started) / len(batch))
+        else:
+            clock.advance_to(next_run[due])
+            interval, has_work, run = passes[due]
+            if has_work():
+                started = time.perf_counter()
+                await run()
+                if due == 'monitor':
+                    monitor_times.append(time.perf_counter() - started)
+                await handle_scheduled()
+            next_run[due] += interval
+        await drain_user_events()
+
+    wall_time = time.perf_counter() - wall_start
+    await engine.trade_writer.flush()
+    await engine.signal_writer.flush()
+
+    # Open positions are marked to the last recorded bid
+    unrealized = 0.0
+    for position in engine.positions.open_positions():
+        book = data.book_at(position.exchange, position.symbol, clock.now)
+        if book is not None and book.best_bid > 0:
+            unrealized += (book.best_bid - position.entry_price) * position.amount
+
+    closed = [trade for trade in db.trades.docs if trade.get('status') == 'closed']
+    profits = np.array([trade.get('profit', 0.0) for trade in closed])
+    fees = sum(client.fees for client in exchanges.values())
+
+    def percentiles(samples: List[float]) -> Dict[str, float]:
+        if not samples:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+        p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+        return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3)}
+
+    return {
+        'min_spread': config.get('min_spread', 2.0),
+        'max_spread': config.get('max_spread', 3.0),
+        'signals': len(data.signals),
+        'trades': len(db.trades.docs),
+        'closed': len(closed),
+        'open': len(engine.positions),
+        'win_rate': round(float((profits > 0).mean() * 100), 2) if len(profits) else 0.0,
+        'realized_pnl': round(float(profits.sum()), 4),
+        'unrealized_pnl': round(unrealized, 4),
+        'fees': round(fees, 4),
+        'net_pnl': round(float(profits.sum()) + unrealized - fees, 4),
+        'decision_ms': percentiles(decision_times),
+        'monitor_ms': percentiles(monitor_times),
+        'simulated_seconds': round(clock.now - (data.signals[0]['time'] if data.signals else data.start), 1),
+        'wall_seconds': round(wall_time, 3)
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay recorded signals and books through the trading engine")
+    parser.add_argument('data', help="Replay .npz file")
+    parser.add_argument('--band', action='append', default=[], help="min,max spread in %% (repeatable)")
+    parser.add_argument('--trade-amount', type=float, default=100.0)
+    parser.add_argument('--min-liquidity', type=float, default=10000)
+    parser.add_argument('--min-volume', type=float, default=50000)
+    parser.add_argument('--monitor-interval', type=float, default=5.0)
+    parser.add_argument('--fee-rate', type=float, default=0.001)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    data = ReplayData.load(args.data)
+    for band in args.band or ['2,3']:
+        min_spread, max_spread = (float(value) for value in band.split(','))
+        report = await run_replay(
+            data,
+            {
+                'min_spread': min_spread,
+                'max_spread': max_spread,
+                'trade_amount': args.trade_amount,
+                'min_liquidity': args.min_liquidity,
+                'min_volume_24h': args.min_volume
+            },
+            monitor_interval=args.monitor_interval,
+            fee_rate=args.fee_rate,
+            latency=args.latency_ms / 1000
+        )
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class RiskEngine:
+    """Pre-trade limits checked against in-memory exposure counters.
+
+    Every check is a handful of dict lookups. Counters change incrementally
+    when an entry is reserved, released or closed and when orders open or
+    finish, so the order path never touches the database. A limit of None
+    means unlimited.
+    """
+
+    def __init__(self, max_total_notional: Optional[float] = None, max_exchange_notional: Optional[float] = None,
+                 max_symbol_notional: Optional[float] = None, max_chain_notional: Optional[float] = None,
+                 max_open_orders: Optional[int] = None, max_rolling_loss: Optional[float] = None,
+                 loss_window: float = 86400.0, clock: Callable[[], float] = time.time):
+        self.max_total_notional = max_total_notional
+        self.max_exchange_notional = max_exchange_notional
+        self.max_symbol_notional = max_symbol_notional
+        self.max_chain_notional = max_chain_notional
+        self.max_open_orders = max_open_orders
+        self.max_rolling_loss = max_rolling_loss
+        self.loss_window = loss_window
+        self.clock = clock
+
+        self.total_notional = 0.0
+        self.exchange_notional: Dict[str, float] = {}
+        self.symbol_notional: Dict[Tuple[str, str], float] = {}
+        self.chain_notional: Dict[str, float] = {}
+        self.open_orders: Dict[str, int] = {}
+        # Reservation key (signal id) -> (exchange, symbol, chain, notional)
+        self.exposures: Dict[str, Tuple[str, str, str, float]] = {}
+
+        # Realized PnL inside the rolling window, with a running sum
+        self.pnl_events = deque()
+        self.rolling_pnl = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict, clock: Callable[[], float] = time.time) -> 'RiskEngine':
+        return cls(
+            max_total_notional=config.get('max_total_notional'),
+            max_exchange_notional=config.get('max_exchange_notional'),
+            max_symbol_notional=config.get('max_symbol_notional'),
+            max_chain_notional=config.get('max_chain_notional'),
+            max_open_orders=config.get('max_open_orders'),
+            max_rolling_loss=config.get('max_rolling_loss'),
+            loss_window=config.get('loss_window', 86400.0),
+            clock=clock
+        )
+
+    def check(self, exchange: str, symbol: str, chain: str, notional: float) -> Optional[str]:
+        """Reason the entry would breach a limit, or None if it may go out"""
+        if self.max_rolling_loss is not None and self._rolling_pnl() <= -self.max_rolling_loss:
+            return f"rolling loss {-self.rolling_pnl:.2f} reached limit {self.max_rolling_loss}"
+        if self.max_open_orders is not None and self.open_orders.get(exchange, 0) >= self.max_open_orders:
+            return f"{self.open_orders[exchange]} open orders on {exchange}"
+        if self.max_total_notional is not None and self.total_notional + notional > self.max_total_notional:
+            return f"total notional {self.total_notional:.2f} + {notional:.2f} over {self.max_total_notional}"
+        if self.max_exchange_notional is not None and \
+                self.exchange_notional.get(exchange, 0.0) + notional > self.max_exchange_notional:
+            return f"{exchange} notional over {self.max_exchange_notional}"
+        if self.max_symbol_notional is not None and \
+                self.symbol_notional.get((exchange, symbol), 0.0) + notional > self.max_symbol_notional:
+            return f"{symbol} notional on {exchange} over {self.max_symbol_notional}"
+        if self.max_chain_notional is not None and \
+                self.chain_notional.get(chain, 0.0) + notional > self.max_chain_notional:
+            return f"{chain} notional over {self.max_chain_notional}"
+        return None
+
+    def reserve(self, key: str, exchange: str, symbol: str, chain: str, notional: float):
+        """Count an entry's notional against every limit until it is released"""
+        if key in self.exposures:
+            return
+        self.exposures[key] = (exchange, symbol, chain, notional)
+        self._add(exchange, symbol, chain, notional)
+
+    def release(self, key: str):
+        """Drop an entry's notional, after its order failed or its position closed"""
+        exposure = self.exposures.pop(key, None)
+        if exposure is not None:
+            exchange, symbol, chain, notional = exposure
+            self._add(exchange, symbol, chain, -notional)
+
+    def _add(self, exchange: str, symbol: str, chain: str, notional: float):
+        self.total_notional += notional
+        self.exchange_notional[exchange] = self.exchange_notional.get(exchange, 0.0) + notional
+        self.symbol_notional[(exchange, symbol)] = self.symbol_notional.get((exchange, symbol), 0.0) + notional
+        self.chain_notional[chain] = self.chain_notional.get(chain, 0.0) + notional
+
+    def order_opened(self, exchange: str):
+        self.open_orders[exchange] = self.open_orders.get(exchange, 0) + 1
+
+    def order_finished(self, exchange: str):
+        self.open_orders[exchange] = max(self.open_orders.get(exchange, 0) - 1, 0)
+
+    def record_pnl(self, pnl: float):
+        """Add realized PnL (or a correction to it) to the rolling window"""
+        if pnl:
+            self.pnl_events.append((self.clock(), pnl))
+            self.rolling_pnl += pnl
+
+    def _rolling_pnl(self) -> float:
+        # Each event is evicted once, so this is amortized O(1)
+        cutoff = self.clock() - self.loss_window
+        while self.pnl_events and self.pnl_events[0][0] < cutoff:
+            self.rolling_pnl -= self.pnl_events.popleft()[1]
+        return self.rolling_pnl
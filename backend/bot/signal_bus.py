@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+class SignalBus:
+    """In-process queue of new signals, deduplicated by signal id across every source that feeds it"""
+
+    def __init__(self, max_seen: int = 10000):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.max_seen = max_seen
+        # Ids already published; bounded so a long-running process does not grow without limit
+        self._seen: OrderedDict = OrderedDict()
+
+    def publish(self, signal: Dict) -> bool:
+        """Queue a signal unless it was already published; returns whether it was queued"""
+        signal_id = signal.get('id')
+        if signal_id in self._seen:
+            return False
+
+        self._seen[signal_id] = True
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+
+        self.queue.put_nowait(signal)
+        return True
+
+    def forget(self, signal_id: str):
+        """Allow a signal to be published again, e.g. after processing it failed"""
+        self._seen.pop(signal_id, None)
+
+    async def get(self, max_items: int = 1) -> List[Dict]:
+        """Wait for the next signal, then take up to max_items that are already queued"""
+        signals = [await self.queue.get()]
+        while len(signals) < max_items and not self.queue.empty():
+            signals.append(self.queue.get_nowait())
+        return signals
+
+    async def watch(self, db):
+        """Publish pending signals inserted by other processes, via a MongoDB change stream"""
+        pipeline = [{'$match': {'operationType': 'insert', 'fullDocument.status': 'pending'}}]
+        try:
+            async with db.signals.watch(pipeline) as stream:
+                logger.info("Watching signals change stream")
+                async for change in stream:
+                    signal = change['fullDocument']
+                    signal.pop('_id', None)
+                    self.publish(signal)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Standalone servers have no change streams; the recovery poll still picks signals up
+            logger.warning(f"Signals change stream unavailable: {e}")
@@ -0,0 +1,96 @@
+import logging
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Optional
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Signals are hashed into a fixed number of buckets; instances own buckets by modulo
+SHARD_BUCKETS = 1024
+
+def shard_bucket(token_address: str) -> int:
+    """Stable bucket for a token address, identical in every process"""
+    return zlib.crc32((token_address or '').lower().encode()) % SHARD_BUCKETS
+
+class SignalLeases:
+    """Claims signals with find_one_and_update so each one is executed by a single engine instance.
+
+    A claim is a lease (owner and expiry). The holder renews the leases of the
+    signals it is still working on. Leases of a crashed instance expire, and
+    any instance can reclaim them.
+    """
+
+    def __init__(self, collection, owner: str, lease_seconds: float = 30.0,
+                 shard_count: int = 1, shard_index: int = 0, clock: Callable[[], float] = time.time):
+        self.collection = collection
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.shard_count = max(shard_count, 1)
+        self.shard_index = shard_index
+        self.clock = clock
+        # Ids of signals this instance holds a lease on
+        self.held: set = set()
+
+    def owns_shard(self, signal: Dict) -> bool:
+        if self.shard_count == 1:
+            return True
+        bucket = signal.get('shard_bucket')
+        if bucket is None:
+            bucket = shard_bucket(signal.get('token_address'))
+        return bucket % self.shard_count == self.shard_index
+
+    def shard_filter(self) -> Dict:
+        if self.shard_count == 1:
+            return {}
+        return {'shard_bucket': {'$mod': [self.shard_count, self.shard_index]}}
+
+    def claimable_filter(self) -> Dict:
+        """Pending signals in this shard with no live lease"""
+        return {
+            'status': 'pending',
+            '$or': [{'lease_expires': {'$exists': False}}, {'lease_expires': {'$lt': self.clock()}}],
+            **self.shard_filter()
+        }
+
+    async def claim(self, signal_id: str) -> Optional[Dict]:
+        """Atomically take the lease on a pending signal; None if another instance holds it"""
+        now = self.clock()
+        doc = await self.collection.find_one_and_update(
+            {
+                'id': signal_id,
+                'status': 'pending',
+                '$or': [
+                    {'lease_expires': {'$exists': False}},
+                    {'lease_expires': {'$lt': now}},
+                    {'lease_owner': self.owner}
+                ]
+            },
+            {'$set': {'lease_owner': self.owner, 'lease_expires': now + self.lease_seconds}},
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is not None:
+            self.held.add(signal_id)
+        return doc
+
+    async def renew(self):
+        """Extend the leases of every signal still held"""
+        if not self.held:
+            return
+        await self.collection.update_many(
+            {'id': {'$in': list(self.held)}, 'lease_owner': self.owner},
+            {'$set': {'lease_expires': self.clock() + self.lease_seconds}}
+        )
+
+    async def release(self, signal_id: str):
+        """Give up a lease early so the signal can be retried, by this or another instance"""
+        self.held.discard(signal_id)
+        await self.collection.update_one(
+            {'id': signal_id, 'lease_owner': self.owner},
+            {'$set': {'lease_expires': 0.0}}
+        )
+
+    def done(self, signal_ids: Iterable[str]):
+        """Stop renewing signals that reached a final status"""
+        self.held.difference_update(signal_ids)
@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import math
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+class SignalScheduler:
+    """Pending signals ordered by priority, with a TTL and a bounded backlog.
+
+    Priority is log liquidity plus the capped volume/liquidity ratio, minus
+    age as a fraction of the TTL. Every signal ages at the same rate, so the
+    age term only shifts keys by a constant. Each key is therefore computed
+    once from the signal's creation time and never needs updating.
+
+    Three heaps share the entries: best first (for pop), worst first (for
+    shedding) and soonest deadline first (for expiry). Removed entries are
+    skipped lazily, so every operation is O(log n).
+    """
+
+    def __init__(self, ttl: float = 300.0, max_pending: int = 1000, liquidity_weight: float = 1.0,
+                 ratio_weight: float = 1.0, age_weight: float = 1.0, max_ratio: float = 10.0,
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.liquidity_weight = liquidity_weight
+        self.ratio_weight = ratio_weight
+        self.age_weight = age_weight
+        self.max_ratio = max_ratio
+        self.clock = clock
+
+        # Signal id -> [key, signal, removed]
+        self.entries: Dict[str, List] = {}
+        self._best: List[Tuple] = []
+        self._worst: List[Tuple] = []
+        self._deadlines: List[Tuple] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def created_at(self, signal: Dict) -> float:
+        timestamp = signal.get('timestamp')
+        if isinstance(timestamp, str):
+            try:
+                return datetime.fromisoformat(timestamp).timestamp()
+            except ValueError:
+                pass
+        elif isinstance(timestamp, datetime):
+            return timestamp.timestamp()
+        return self.clock()
+
+    def score(self, signal: Dict, created_at: float) -> float:
+        liquidity = float(signal.get('liquidity') or 0)
+        volume = float(signal.get('volume_24h') or 0)
+        ratio = min(volume / liquidity, self.max_ratio) if liquidity > 0 else 0.0
+        # -age_weight * (now - created_at) / ttl, without the now term shared by every signal
+        return (self.liquidity_weight * math.log10(1 + liquidity) + self.ratio_weight * ratio
+                + self.age_weight * created_at / self.ttl)
+
+    def push(self, signal: Dict) -> Dict[str, List[Dict]]:
+        """Schedule a signal; returns the signals dropped instead, by reason ('expired' or 'shed'), possibly this one"""
+        dropped = {'expired': [], 'shed': []}
+        if signal['id'] in self.entries:
+            return dropped
+        created_at = self.created_at(signal)
+        if created_at + self.ttl <= self.clock():
+            dropped['expired'].append(signal)
+            return dropped
+
+        key = self.score(signal, created_at)
+        entry = [key, signal, False]
+        self.entries[signal['id']] = entry
+        seq = next(self._seq)
+        heapq.heappush(self._best, (-key, seq, entry))
+        heapq.heappush(self._worst, (key, seq, entry))
+        heapq.heappush(self._deadlines, (created_at + self.ttl, seq, entry))
+
+        # Over capacity: drop what already expired, then the lowest priority
+        if len(self.entries) > self.max_pending:
+            dropped['expired'] = self.expire()
+        while len(self.entries) > self.max_pending:
+            dropped['shed'].append(self._remove(self._pop_live(self._worst)))
+        self._compact()
+        return dropped
+
+    def pop(self, max_items: int) -> List[Dict]:
+        """Up to max_items signals, best first; call expire() first to leave out stale ones"""
+        signals = []
+        while len(signals) < max_items:
+            entry = self._pop_live(self._best)
+            if entry is None:
+                break
+            signals.append(self._remove(entry))
+        return signals
+
+    def expire(self) -> List[Dict]:
+        """Remove and return every signal past its TTL"""
+        now = self.clock()
+        expired = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            entry = heapq.heappop(self._deadlines)[2]
+            if not entry[2]:
+                expired.append(self._remove(entry))
+        return expired
+
+    def _pop_live(self, heap: List[Tuple]) -> Optional[List]:
+        while heap:
+            entry = heapq.heappop(heap)[2]
+            if not entry[2]:
+                return entry
+        return None
+
+    def _remove(self, entry: List) -> Dict:
+        entry[2] = True
+        self.entries.pop(entry[1]['id'], None)
+        return entry[1]
+
+    def _compact(self):
+        # Removed entries linger in the other heaps; rebuild once they dominate
+        live = len(self.entries)
+        for name in ('_best', '_worst', '_deadlines'):
+            heap = getattr(self, name)
+            if len(heap) > 2 * live + 64:
+                heap = [item for item in heap if not item[2][2]]
+                heapq.heapify(heap)
+                setattr(self, name, heap)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Shared bucket upper bounds in milliseconds, log-spaced from 0.05 ms to ~2 minutes (+inf last),
+# so histograms from different instances can be added bucket by bucket
+BUCKET_BOUNDS_MS: List[float] = [round(0.05 * 1.25 ** i, 4) for i in range(67)] + [float('inf')]
+
+class Histogram:
+    """Fixed-bucket latency histogram; recording is one bisect and a few additions"""
+
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKET_BOUNDS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: 'Histogram'):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile, capped at the observed max"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, n in zip(BUCKET_BOUNDS_MS, self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max_ms, 3)
+        }
+
+    def to_dict(self) -> Dict:
+        return {'counts': list(self.counts), 'count': self.count, 'total_ms': self.total_ms, 'max_ms': self.max_ms}
+
+    @classmethod
+    def from_dict(cls, doc: Dict) -> 'Histogram':
+        histogram = cls()
+        counts = doc.get('counts') or []
+        if len(counts) == len(histogram.counts):
+            histogram.counts = list(counts)
+        histogram.count = doc.get('count', 0)
+        histogram.total_ms = doc.get('total_ms', 0.0)
+        histogram.max_ms = doc.get('max_ms', 0.0)
+        return histogram
+
+class Trace:
+    """Monotonic timestamps of one signal's path from detection to order, carried on the signal as 'trace'"""
+
+    __slots__ = ('tracer', 'started', 'last')
+
+    def __init__(self, tracer: 'Tracer'):
+        self.tracer = tracer
+        self.started = self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        """Record the time since the previous mark as one stage"""
+        now = time.perf_counter()
+        self.tracer.record(stage, now - self.last)
+        self.last = now
+
+    def finish(self, stage: str = 'detect_to_order'):
+        """Mark the final stage and record the whole trace"""
+        self.mark(stage)
+        self.tracer.record('total', self.last - self.started)
+
+class Span:
+    __slots__ = ('tracer', 'stage', 'started')
+
+    def __init__(self, tracer: 'Tracer', stage: str):
+        self.tracer = tracer
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.stage, time.perf_counter() - self.started)
+        return False
+
+class Tracer:
+    """Per-stage latency histograms for this process, flushed to db.latency_stats for the API"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+
+    def start(self) -> Optional[Trace]:
+        return Trace(self) if self.enabled else None
+
+    def span(self, stage: str) -> Span:
+        return Span(self, stage)
+
+    def record(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.record(seconds)
+
+    def summary(self) -> Dict[str, Dict]:
+        return {stage: histogram.summary() for stage, histogram in sorted(self.histograms.items())}
+
+    async def flush(self, collection, instance_id: str):
+        """Replace this instance's stored histograms; counts are cumulative since process start"""
+        if not self.histograms:
+            return
+        updated_at = datetime.now(timezone.utc).isoformat()
+        await asyncio.gather(*(
+            collection.update_one(
+                {'instance_id': instance_id, 'stage': stage},
+                {'$set': {**histogram.to_dict(), 'updated_at': updated_at}},
+                upsert=True
+            )
+            for stage, histogram in list(self.histograms.items())
+        ))
+
+    async def run(self, collection, instance_id: str, interval: float = 30.0):
+        """Flush histograms every interval seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(collection, instance_id)
+            except Exception as e:
+                logger.error(f"Error flushing latency stats: {e}")
+
+def merge_stats(docs: List[Dict]) -> Dict[str, Dict]:
+    """Summaries per stage from stored histogram documents, added up across instances"""
+    merged: Dict[str, Histogram] = {}
+    for doc in docs:
+        histogram = merged.setdefault(doc['stage'], Histogram())
+        histogram.merge(Histogram.from_dict(doc))
+    return {stage: histogram.summary() for stage, histogram in sorted(merged.items())}
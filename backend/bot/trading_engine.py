@@ -1,22 +1,115 @@
 import logging
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import asyncio
-from datetime import datetime, timezone
+import contextlib
+import functools
+import os
+import socket
+import time
+import uuid
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from exchanges.orderbook import quote_books
+from .market_index import MarketIndex, round_step
+from .signal_bus import SignalBus
+from .position_book import ACTIVE_STATUSES, Position, PositionBook
+from . import order_state
+from .write_behind import WriteBehind
+from .signal_lease import SignalLeases
+from .risk import RiskEngine
+from .tracing import Tracer
+from .config_provider import ConfigProvider
+from .filter_rules import compile_rules, signal_columns, threshold_rules
+from .signal_scheduler import SignalScheduler
 
 logger = logging.getLogger(__name__)
 
 class TradingEngine:
     """Core trading engine for executing trades based on signals"""
     
-    def __init__(self, db, config: Dict):
+    def __init__(self, db, config: Dict, signal_bus: Optional[SignalBus] = None, tracer: Optional[Tracer] = None,
+                 clock: Callable[[], float] = time.time):
         self.db = db
-        self.config = config
+        # Epoch seconds for order times, TTLs and leases; the replay harness runs the engine on simulated time
+        self.clock = clock
+        # Settings changed from the dashboard apply without a restart
+        self.config_provider = ConfigProvider(db.bot_config, config, poll_interval=config.get('config_poll_interval', 5))
+        # Signal criteria compiled once per config version and applied to whole batches
+        self.signal_filter = self.compile_filter(config)
+        self.config_provider.subscribe(self.on_config_change)
+        self.signal_bus = signal_bus or SignalBus()
+        # Per-stage latency from detection to order; every exchange request is timed in with_slot
+        self.tracer = tracer or Tracer()
+        if config.get('claim_signals', False) and not config.get('instance_id'):
+            # Trades are owned by instance id; a per-process default would orphan them on restart
+            raise ValueError("claim_signals requires a stable instance_id (ENGINE_INSTANCE_ID)")
+        self.instance_id = config.get('instance_id') or f"{socket.gethostname()}-{os.getpid()}"
+        # With several engine instances, each signal is leased to one of them before it is evaluated
+        self.leases = SignalLeases(
+            db.signals,
+            self.instance_id,
+            lease_seconds=config.get('signal_lease_seconds', 30),
+            shard_count=config.get('shard_count', 1),
+            shard_index=config.get('shard_index', 0),
+            clock=clock
+        ) if config.get('claim_signals', False) else None
+        # Open positions live in memory; db.trades is written behind in batches
+        self.positions = PositionBook()
+        # Exposure limits checked in memory before every entry
+        self.risk = RiskEngine.from_config(config, clock=clock)
+        self.trade_writer = WriteBehind(db.trades, flush_interval=config.get('trade_flush_interval', 0.5))
+        # Signal status transitions are flushed together instead of one update per signal
+        self.signal_writer = WriteBehind(db.signals, flush_interval=config.get('signal_flush_interval', 0.5))
         self.exchanges = {}
         self.running = False
+        self.market_index = MarketIndex(self.exchanges, refresh_interval=config.get('markets_refresh_interval', 300))
+        self.tasks: List[asyncio.Task] = []
+        # Signal intake and the workers placing entries; stop() closes intake and lets workers finish first
+        self.intake_tasks: List[asyncio.Task] = []
+        self.workers: List[asyncio.Task] = []
+        self.stopping = False
+        # Caps concurrent requests per exchange across all signal workers
+        self.exchange_slots: Dict[str, asyncio.Semaphore] = {}
+        # Published signals wait here, best first, until a worker is free; stale and excess ones are dropped
+        self.scheduler = SignalScheduler(
+            ttl=config.get('signal_ttl', 300),
+            max_pending=config.get('max_pending_signals', 1000),
+            clock=clock
+        )
+        self.signals_ready = asyncio.Event()
+        # Tokens with a signal being evaluated or executed; one at a time per token
+        self.active_tokens: set = set()
+        # Normalized (exchange name, event) pairs from the private user-data streams
+        self.user_events: asyncio.Queue = asyncio.Queue()
+        # Batches being submitted per exchange; an update can arrive on the stream before the batch reply
+        self.submitting: Dict[str, int] = {}
+        # Updates for unknown orders on those exchanges, applied once the batch is recorded
+        self.held_events: Dict[str, List[Dict]] = {}
+        # Set while no batch is being submitted anywhere
+        self.submissions_idle = asyncio.Event()
+        self.submissions_idle.set()
+    
+    @property
+    def config(self) -> Dict:
+        """Current settings snapshot; replaced as a whole when the stored config changes"""
+        return self.config_provider.current
+    
+    def utcnow(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), timezone.utc)
+    
+    def compile_filter(self, config: Dict):
+        """Rules from config['signal_filter'], or the minimum liquidity and volume thresholds"""
+        return compile_rules(config.get('signal_filter') or threshold_rules(
+            config.get('min_liquidity', 10000), config.get('min_volume_24h', 50000)
+        ))
+    
+    def on_config_change(self, config: Dict):
+        self.signal_filter = self.compile_filter(config)
     
     def add_exchange(self, name: str, exchange_client):
         """Add exchange client to the engine"""
         self.exchanges[name] = exchange_client
+        self.exchange_slots[name] = asyncio.Semaphore(self.config.get('exchange_concurrency', 4))
         logger.info(f"Added exchange: {name}")
     
     async def start(self):
@@ -24,10 +117,51 @@ class TradingEngine:
         self.running = True
         logger.info("Starting trading engine...")
         
+        await self.config_provider.load()
+        self.tasks.append(asyncio.create_task(self.config_provider.run()))
+        
+        # Resolve signals against a local symbol index instead of the network
+        await self.market_index.load()
+        self.tasks.append(asyncio.create_task(self.market_index.run()))
+        
+        await self.positions.load(self.db.trades, self.owned_trades_filter())
+        for position in self.positions.open_positions():
+            self.risk.reserve(position.signal_id or position.id, position.exchange, position.symbol,
+                              position.chain or 'unknown', position.entry_price * position.amount)
+        for position, _ in self.positions.working_orders():
+            self.risk.order_opened(position.exchange)
+        self.tasks.append(asyncio.create_task(self.trade_writer.run()))
+        self.tasks.append(asyncio.create_task(self.signal_writer.run()))
+        
+        # Order and fill confirmations arrive over private streams instead of polling
+        for name, client in self.exchanges.items():
+            client.start_user_stream(functools.partial(self.on_user_event, name))
+        self.tasks.append(asyncio.create_task(self.process_user_events()))
+        # Streams can drop updates; working orders are also checked against the exchanges periodically
+        self.tasks.append(asyncio.create_task(self.reconcile_orders()))
+        
+        # New signals are handled as soon as they are published; the poll below only recovers missed ones
+        self.intake_tasks.append(asyncio.create_task(self.schedule_signals()))
+        for _ in range(self.config.get('signal_workers', 4)):
+            self.workers.append(asyncio.create_task(self.consume_signals()))
+        if self.leases is not None:
+            self.tasks.append(asyncio.create_task(self.renew_leases()))
+        if self.config.get('signal_change_stream', True):
+            self.intake_tasks.append(asyncio.create_task(self.signal_bus.watch(self.db)))
+        self.tasks.append(asyncio.create_task(
+            self.tracer.run(self.db.latency_stats, self.instance_id, self.config.get('latency_flush_interval', 30))
+        ))
+        
+        recovery_interval = self.config.get('signal_recovery_interval', 30)
+        last_recovery = 0.0
+        loop = asyncio.get_running_loop()
+        
         while self.running:
             try:
-                # Process pending signals
-                await self.process_signals()
+                # Re-publish pending signals that no intake path delivered
+                if loop.time() - last_recovery >= recovery_interval:
+                    last_recovery = loop.time()
+                    await self.process_signals()
                 
                 # Monitor open trades
                 await self.monitor_trades()
@@ -41,51 +175,282 @@ class TradingEngine:
     async def stop(self):
         """Stop the trading engine"""
         self.running = False
+        self.market_index.running = False
         logger.info("Stopping trading engine...")
+        
+        # Take no new signals, then let workers finish their current batch so accepted orders get recorded
+        for task in self.intake_tasks:
+            task.cancel()
+        self.stopping = True
+        self.signals_ready.set()
+        pending = [*self.workers, asyncio.create_task(self.submissions_idle.wait())]
+        _, unfinished = await asyncio.wait(pending, timeout=self.config.get('stop_timeout', 10))
+        if unfinished:
+            logger.warning(f"Stopping with {len(unfinished)} signal workers or order batches still running")
+        
+        for task in [*self.tasks, *self.workers, *pending]:
+            task.cancel()
+        self.tasks.clear()
+        self.intake_tasks.clear()
+        self.workers.clear()
+        
+        # Persist every buffered trade and signal change before exiting
+        await asyncio.gather(self.trade_writer.stop(), self.signal_writer.stop())
+        try:
+            await self.tracer.flush(self.db.latency_stats, self.instance_id)
+        except Exception as e:
+            logger.error(f"Error flushing latency stats: {e}")
+        
+        # Release pooled exchange connections
+        await asyncio.gather(
+            *(client.close() for client in self.exchanges.values()),
+            return_exceptions=True
+        )
     
     async def process_signals(self):
-        """Process pending signals and decide whether to trade"""
+        """Recovery poll: publish pending signals from the database onto the signal bus"""
         try:
-            # Get pending signals
-            signals = await self.db.signals.find({"status": "pending"}, {"_id": 0}).limit(10).to_list(10)
+            # Expire stale signals in bulk rather than recovering them
+            cutoff = (self.utcnow() - timedelta(seconds=self.scheduler.ttl)).isoformat()
+            await self.db.signals.update_many(
+                {"status": "pending", "timestamp": {"$lt": cutoff}},
+                {"$set": {"status": "expired"}}
+            )
             
+            limit = self.config.get('signal_recovery_batch', 100)
+            query = self.leases.claimable_filter() if self.leases is not None else {"status": "pending"}
+            signals = await self.db.signals.find(query, {"_id": 0}).sort("liquidity", -1).limit(limit).to_list(limit)
+            
+            # Recovered signals are traced from the moment they are found
             for signal in signals:
-                # Check if signal meets trading criteria
-                if await self.should_trade(signal):
-                    # Execute trade if auto_trading is enabled
-                    if self.config.get('auto_trading', False):
-                        await self.execute_trade(signal)
-                    else:
-                        # Just mark as notified
-                        await self.db.signals.update_one(
-                            {"id": signal['id']},
-                            {"$set": {"status": "notified"}}
-                        )
-                        logger.info(f"Signal notified (auto-trading disabled): {signal['id']}")
-                else:
-                    # Skip signal
-                    await self.db.signals.update_one(
-                        {"id": signal['id']},
-                        {"$set": {"status": "skipped"}}
-                    )
-                    
+                signal['trace'] = self.tracer.start()
+            recovered = sum(self.signal_bus.publish(signal) for signal in signals)
+            if recovered:
+                logger.info(f"Recovered {recovered} pending signals")
+                
         except Exception as e:
             logger.error(f"Error processing signals: {e}")
     
-    async def should_trade(self, signal: Dict) -> bool:
-        """Determine if a signal meets trading criteria"""
+    async def schedule_signals(self):
+        """Move signals from the bus into the priority scheduler as soon as they are published"""
+        intake = self.config.get('signal_intake_batch', 500)
+        while True:
+            await self.schedule_batch(await self.signal_bus.get(intake))
+    
+    async def schedule_batch(self, signals: List[Dict]):
+        """Push published signals into the scheduler and drop the ones it rejects"""
+        expired, shed = [], []
+        for signal in signals:
+            if self.leases is not None and not self.leases.owns_shard(signal):
+                self.signal_bus.forget(signal['id'])
+                continue
+            dropped = self.scheduler.push(signal)
+            expired += dropped['expired']
+            shed += dropped['shed']
+        if len(self.scheduler):
+            self.signals_ready.set()
+        await self.drop_signals(expired, "expired")
+        await self.drop_signals(shed, "shed")
+    
+    async def consume_signals(self):
+        """Handle the highest-priority scheduled signals first, so exchange request budget goes to them"""
+        batch_size = self.config.get('signal_batch_size', 10)
+        while True:
+            await self.signals_ready.wait()
+            if self.stopping:
+                # Signals still scheduled stay pending for the recovery poll
+                return
+            await self.handle_scheduled(batch_size)
+    
+    async def handle_scheduled(self, batch_size: int):
+        """Drop expired signals, then handle up to batch_size of the best scheduled ones"""
+        await self.drop_signals(self.scheduler.expire(), "expired")
+        signals = self.scheduler.pop(batch_size)
+        if not len(self.scheduler):
+            self.signals_ready.clear()
+        if signals:
+            await self.handle_signals(signals)
+    
+    async def drop_signals(self, signals: List[Dict], status: str):
+        """Give still-pending signals a final status in one update"""
+        if not signals:
+            return
+        logger.info(f"Dropping {len(signals)} {status} signals")
         try:
-            # Check liquidity threshold
-            if signal.get('liquidity', 0) < self.config.get('min_liquidity', 10000):
-                return False
+            await self.db.signals.update_many(
+                {"id": {"$in": [signal['id'] for signal in signals]}, "status": "pending"},
+                {"$set": {"status": status}}
+            )
+        except Exception as e:
+            logger.error(f"Error dropping {status} signals: {e}")
+    
+    def owned_trades_filter(self) -> Dict:
+        """Active trades this instance manages; unowned legacy trades go to shard 0"""
+        active = {"status": {"$in": list(ACTIVE_STATUSES)}}
+        if self.leases is None:
+            return active
+        owners = [{"owner": self.instance_id}]
+        if self.leases.shard_index == 0:
+            owners.append({"owner": {"$exists": False}})
+        return {**active, "$or": owners}
+    
+    async def renew_leases(self):
+        """Keep leases on in-flight signals alive; a crashed instance's leases simply expire"""
+        interval = self.leases.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.leases.renew()
+            except Exception as e:
+                logger.error(f"Error renewing signal leases: {e}")
+    
+    async def claim_signals(self, signals: List[Dict]) -> List[Dict]:
+        """Keep only the signals in this instance's shard that it wins the lease on"""
+        mine = []
+        for signal in signals:
+            if self.leases.owns_shard(signal):
+                mine.append(signal)
+            else:
+                self.signal_bus.forget(signal['id'])
+        
+        docs = await asyncio.gather(*(self.leases.claim(signal['id']) for signal in mine), return_exceptions=True)
+        
+        claimed = []
+        for signal, doc in zip(mine, docs):
+            if isinstance(doc, dict):
+                claimed.append(doc)
+                continue
+            if isinstance(doc, Exception):
+                logger.error(f"Error claiming signal {signal['id']}: {doc}")
+            # Held elsewhere; if that instance dies the recovery poll finds it once the lease expires
+            self.signal_bus.forget(signal['id'])
+        return claimed
+    
+    async def release_signal(self, signal_id: str):
+        """Leave a signal pending so the recovery poll, on any instance, can retry it"""
+        self.signal_bus.forget(signal_id)
+        if self.leases is not None:
+            await self.leases.release(signal_id)
+    
+    def set_signal_status(self, signal_id: str, status: str):
+        self.signal_writer.update(signal_id, {"status": status})
+        if self.leases is not None:
+            self.leases.done([signal_id])
+    
+    def token_key(self, signal: Dict) -> str:
+        """Identity of the traded token, used to serialize signals for the same asset"""
+        base = self.market_index.by_address.get((signal.get('token_address') or '').lower())
+        return base or (signal.get('token_symbol') or signal.get('token_address') or signal['id']).upper()
+    
+    async def handle_signals(self, signals: List[Dict]):
+        """Evaluate a batch of signals concurrently and place the resulting entries"""
+        # Claim each token once; a signal for a token already in flight waits for the recovery poll
+        claimed = []
+        for signal in signals:
+            trace = signal.get('trace')
+            if trace is not None:
+                trace.mark('queue')
+            else:
+                signal['trace'] = self.tracer.start()
+            key = self.token_key(signal)
+            if key in self.active_tokens:
+                self.signal_bus.forget(signal['id'])
+                continue
+            self.active_tokens.add(key)
+            claimed.append((key, signal))
+        
+        if self.leases is not None and claimed:
+            leased = {doc['id']: doc for doc in await self.claim_signals([signal for _, signal in claimed])}
+            for key, signal in claimed:
+                if signal['id'] not in leased:
+                    self.active_tokens.discard(key)
+            for _, signal in claimed:
+                if signal['id'] in leased:
+                    leased[signal['id']]['trace'] = signal['trace']
+            claimed = [(key, leased[signal['id']]) for key, signal in claimed if signal['id'] in leased]
+        
+        try:
+            # Trading criteria for the whole batch in one vectorized pass
+            eligible = self.signal_filter.mask(signal_columns([signal for _, signal in claimed], self.signal_filter.fields))
+            results = await asyncio.gather(
+                *(self.evaluate_signal(signal, bool(ok)) for (_, signal), ok in zip(claimed, eligible)),
+                return_exceptions=True
+            )
             
-            # Check volume threshold
-            if signal.get('volume_24h', 0) < self.config.get('min_volume_24h', 50000):
-                return False
+            plans = []
+            for (_, signal), result in zip(claimed, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error handling signal {signal['id']}: {result}")
+                    await self.release_signal(signal['id'])
+                elif result:
+                    plans.append(result)
             
-            # Check if we can find this token on any exchange
-            # This is a simplified check - in production, implement proper symbol mapping
-            return True
+            if plans:
+                await self.place_entries(plans)
+                    
+        except Exception as e:
+            logger.error(f"Error handling signals: {e}")
+            # Reservations stay only with the trades that were recorded
+            traded = {position.signal_id for position in self.positions.open_positions()}
+            for _, signal in claimed:
+                if signal['id'] not in traded:
+                    self.risk.release(signal['id'])
+            await asyncio.gather(
+                *(self.release_signal(signal['id']) for _, signal in claimed),
+                return_exceptions=True
+            )
+        finally:
+            for key, _ in claimed:
+                self.active_tokens.discard(key)
+    
+    async def evaluate_signal(self, signal: Dict, eligible: Optional[bool] = None) -> Optional[Dict]:
+        """Decide whether to trade a signal; returns an entry plan or None"""
+        # Check if signal meets trading criteria, unless the batch filter already did
+        if eligible is None:
+            eligible = await self.should_trade(signal)
+        if not eligible:
+            # Skip signal
+            self.set_signal_status(signal['id'], "skipped")
+            return None
+        
+        if not self.config.get('auto_trading', False):
+            # Just mark as notified
+            self.set_signal_status(signal['id'], "notified")
+            logger.info(f"Signal notified (auto-trading disabled): {signal['id']}")
+            return None
+        
+        # Plan a trade; orders go out in one batch per exchange
+        plan = await self.plan_trade(signal)
+        if not plan:
+            # Left pending: let the recovery poll re-evaluate it later
+            await self.release_signal(signal['id'])
+            return None
+        
+        # Never open a second position in the same market
+        if self.positions.open_in(plan['exchange'], plan['symbol']):
+            logger.info(f"Position already open in {plan['symbol']} on {plan['exchange']}, skipping signal {signal['id']}")
+            self.set_signal_status(signal['id'], "skipped")
+            return None
+        
+        # Pre-trade limits; the reservation is taken in the same step so concurrent workers see it
+        chain = signal.get('blockchain') or 'unknown'
+        notional = plan['entry_price'] * plan['amount']
+        reason = self.risk.check(plan['exchange'], plan['symbol'], chain, notional)
+        if reason:
+            logger.info(f"Risk limit, skipping signal {signal['id']}: {reason}")
+            self.set_signal_status(signal['id'], "skipped")
+            return None
+        self.risk.reserve(signal['id'], plan['exchange'], plan['symbol'], chain, notional)
+        
+        if signal.get('trace') is not None:
+            signal['trace'].mark('evaluate')
+        return plan
+    
+    async def should_trade(self, signal: Dict) -> bool:
+        """Determine if a signal meets trading criteria"""
+        try:
+            # Same compiled rules as the batch path, over a one-row batch
+            return bool(self.signal_filter.mask(signal_columns([signal], self.signal_filter.fields))[0])
             
         except Exception as e:
             logger.error(f"Error checking trade criteria: {e}")
@@ -94,135 +459,534 @@ class TradingEngine:
     async def execute_trade(self, signal: Dict):
         """Execute a trade based on a signal"""
         try:
-            # Find best exchange for this trade
+            plan = await self.plan_trade(signal)
+            if plan:
+                await self.place_entries([plan])
+        except Exception as e:
+            logger.error(f"Error executing trade: {e}")
+    
+    async def plan_trade(self, signal: Dict) -> Optional[Dict]:
+        """Pick a venue and size the entry order for a signal, or None if it should not be traded"""
+        # Find best exchange for this trade
+        with self.tracer.span('find_best_exchange'):
             best_exchange = await self.find_best_exchange(signal)
+        
+        if not best_exchange:
+            logger.warning(f"No suitable exchange found for signal {signal['id']}")
+            return None
+        
+        exchange_name = best_exchange['name']
+        if exchange_name not in self.exchanges:
+            logger.error(f"Exchange client not found: {exchange_name}")
+            return None
+        
+        # Calculate trade parameters
+        instrument = best_exchange['instrument']
+        
+        # Executable quote for the full trade size from the venue selection
+        quote = best_exchange['quote']
+        spread = round(quote['spread'], 4)
+        
+        # Check if spread is within acceptable range (2-3%)
+        min_spread = self.config.get('min_spread', 2.0)
+        max_spread = self.config.get('max_spread', 3.0)
+        
+        if spread < min_spread or spread > max_spread:
+            logger.info(f"Spread {spread}% outside target range {min_spread}-{max_spread}%")
+            return None
+        
+        entry_price = quote['buy_price']
+        quantity = round_step(quote['buy_quantity'], instrument['lot_size'])
+        if entry_price <= 0 or quantity <= 0:
+            return None
+        
+        return {
+            'signal': signal,
+            'exchange': exchange_name,
+            'symbol': best_exchange['symbol'],
+            'side': 'buy',
+            'amount': quantity,
+            # Limit at the deepest ask level the walk reached
+            'price': round_step(quote['buy_limit'], instrument['tick_size'], up=True),
+            'entry_price': entry_price,
+            'spread': spread,
+            'slippage': round(quote['buy_slippage'], 4)
+        }
+    
+    async def place_entries(self, plans: List[Dict]):
+        """Submit entry orders as one batch per exchange and record the resulting trades"""
+        by_exchange: Dict[str, List[Dict]] = {}
+        for plan in plans:
+            by_exchange.setdefault(plan['exchange'], []).append(plan)
+        
+        names = list(by_exchange)
+        async with self.holding_order_events(names):
+            results = await asyncio.gather(
+                *(self.with_slot(name, self.exchanges[name].create_orders, by_exchange[name]) for name in names),
+                return_exceptions=True
+            )
             
-            if not best_exchange:
-                logger.warning(f"No suitable exchange found for signal {signal['id']}")
-                return
-            
-            exchange_name = best_exchange['name']
-            exchange_client = self.exchanges.get(exchange_name)
-            
-            if not exchange_client:
-                logger.error(f"Exchange client not found: {exchange_name}")
-                return
-            
-            # Calculate trade parameters
-            symbol = best_exchange.get('symbol', 'BTC/USDT')  # Default symbol
-            amount = self.config.get('trade_amount', 100.0)
-            
-            # Get current price and calculate spread
-            orderbook = await exchange_client.get_orderbook(symbol)
-            spread = exchange_client.calculate_spread(orderbook)
-            
-            # Check if spread is within acceptable range (2-3%)
-            min_spread = self.config.get('min_spread', 2.0)
-            max_spread = self.config.get('max_spread', 3.0)
-            
-            if spread < min_spread or spread > max_spread:
-                logger.info(f"Spread {spread}% outside target range {min_spread}-{max_spread}%")
-                return
-            
-            # Create buy order
-            best_ask = float(orderbook['asks'][0][0]) if orderbook.get('asks') else 0
-            
-            if best_ask > 0:
-                # Place limit order
-                order = await exchange_client.create_order(
-                    symbol=symbol,
-                    side='buy',
-                    amount=amount / best_ask,
-                    price=best_ask
-                )
-                
-                if 'error' not in order:
-                    # Create trade record
-                    trade = {
-                        'id': str(datetime.now(timezone.utc).timestamp()),
-                        'signal_id': signal['id'],
-                        'exchange': exchange_name,
-                        'symbol': symbol,
-                        'side': 'buy',
-                        'entry_price': best_ask,
-                        'amount': amount / best_ask,
-                        'spread': spread,
-                        'status': 'open',
-                        'created_at': datetime.now(timezone.utc).isoformat()
-                    }
+            for name, orders in zip(names, results):
+                if isinstance(orders, Exception):
+                    orders = [{'error': str(orders)}] * len(by_exchange[name])
+                elif len(orders) != len(by_exchange[name]):
+                    # Results are matched by position; plans past the end got no answer and are given up
+                    logger.error(f"{name} returned {len(orders)} results for {len(by_exchange[name])} orders")
+                    missing = len(by_exchange[name]) - len(orders)
+                    orders = list(orders[:len(by_exchange[name])]) + [{'error': f"no result from {name}"}] * missing
+                for plan, order in zip(by_exchange[name], orders):
+                    if plan['signal'].get('trace') is not None:
+                        plan['signal']['trace'].finish('order')
+                    if 'error' in order:
+                        logger.error(f"Error creating order: {order.get('error')}")
+                        self.risk.release(plan['signal']['id'])
+                        await self.release_signal(plan['signal']['id'])
+                        continue
                     
-                    await self.db.trades.insert_one(trade)
-                    await self.db.signals.update_one(
-                        {"id": signal['id']},
-                        {"$set": {"status": "executed"}}
+                    # Create trade record; it stays pending until the exchange reports the entry's fills
+                    order_id = str(order['order_id']) if order.get('order_id') is not None else None
+                    position = Position(
+                        id=str(uuid.uuid4()),
+                        signal_id=plan['signal']['id'],
+                        exchange=name,
+                        symbol=plan['symbol'],
+                        side='buy',
+                        entry_price=plan['entry_price'],
+                        amount=plan['amount'],
+                        spread=plan['spread'],
+                        slippage=plan['slippage'],
+                        status='pending' if order_id else 'open',
+                        chain=plan['signal'].get('blockchain') or 'unknown',
+                        owner=self.instance_id,
+                        order_id=order_id,
+                        order_status=order_state.NEW,
+                        filled_amount=0.0,
+                        order_placed_at=self.clock(),
+                        created_at=self.utcnow().isoformat()
                     )
                     
-                    logger.info(f"Trade executed: {symbol} on {exchange_name}")
-                else:
-                    logger.error(f"Error creating order: {order.get('error')}")
-            
-        except Exception as e:
-            logger.error(f"Error executing trade: {e}")
+                    self.positions.add(position)
+                    if order_id:
+                        self.risk.order_opened(name)
+                    self.trade_writer.insert(position.to_dict())
+                    self.set_signal_status(plan['signal']['id'], "executed")
+                    
+                    logger.info(f"Trade executed: {plan['symbol']} on {name}")
     
     async def monitor_trades(self):
-        """Monitor open trades and close profitable ones"""
+        """Monitor held positions and submit exits for profitable ones"""
         try:
-            # Get open trades
-            trades = await self.db.trades.find({"status": "open"}, {"_id": 0}).limit(50).to_list(50)
+            # One order book per market, however many positions share it
+            groups = {key: positions for key, positions in self.positions.markets().items() if key[0] in self.exchanges}
+            if not groups:
+                return
+            
+            keys = list(groups)
+            books = await asyncio.gather(
+                *(self.with_slot(name, self.exchanges[name].get_orderbook, symbol) for name, symbol in keys),
+                return_exceptions=True
+            )
             
-            for trade in trades:
-                exchange_client = self.exchanges.get(trade['exchange'])
-                if not exchange_client:
+            exits: Dict[str, List[Dict]] = {}
+            for (name, symbol), orderbook in zip(keys, books):
+                if isinstance(orderbook, Exception):
+                    logger.error(f"Error fetching {symbol} on {name}: {orderbook}")
                     continue
+                for exit_order in self.evaluate_exits(name, groups[(name, symbol)], orderbook):
+                    exits.setdefault(name, []).append(exit_order)
+            
+            if exits:
+                await self.place_exits(exits)
                 
-                # Get current orderbook
-                orderbook = await exchange_client.get_orderbook(trade['symbol'])
-                current_spread = exchange_client.calculate_spread(orderbook)
-                
-                best_bid = float(orderbook['bids'][0][0]) if orderbook.get('bids') else 0
-                entry_price = trade['entry_price']
-                
-                # Calculate profit percentage
-                if best_bid > 0 and entry_price > 0:
-                    profit_pct = ((best_bid - entry_price) / entry_price) * 100
+        except Exception as e:
+            logger.error(f"Error monitoring trades: {e}")
+    
+    def evaluate_exits(self, exchange: str, positions: List[Position], orderbook) -> List[Dict]:
+        """Walk the bids for every position in one market at once and return exits that hit the target"""
+        amounts = np.array([position.amount for position in positions], dtype=np.float64)
+        entry_prices = np.array([position.entry_price for position in positions], dtype=np.float64)
+        exit_prices, fillable_qty, _, sell_limits = orderbook.walk_many('sell', amounts)
+        
+        # Close trades whose full size can be sold with profit within the target spread range
+        target_profit = self.config.get('min_spread', 2.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_pct = np.where(entry_prices > 0, (exit_prices - entry_prices) / entry_prices * 100, -np.inf)
+        hits = (exit_prices > 0) & (fillable_qty >= amounts) & (profit_pct >= target_profit)
+        
+        instrument = self.market_index.get_instrument(exchange, positions[0].symbol) or {}
+        return [
+            {
+                'position': positions[i],
+                'symbol': positions[i].symbol,
+                'side': 'sell',
+                'amount': positions[i].amount,
+                'price': round_step(float(sell_limits[i]), instrument.get('tick_size', 0)),
+                'exit_price': float(exit_prices[i])
+            }
+            for i in np.flatnonzero(hits)
+        ]
+    
+    async def place_exits(self, exits: Dict[str, List[Dict]]):
+        """Submit exit orders as one batch per exchange; trades close once the exits fill"""
+        if self.stopping:
+            # Shutting down; the positions stay open and are exited after the restart
+            return
+        names = list(exits)
+        async with self.holding_order_events(names):
+            results = await asyncio.gather(
+                *(self.with_slot(name, self.exchanges[name].create_orders, exits[name]) for name in names),
+                return_exceptions=True
+            )
+            
+            for name, orders in zip(names, results):
+                if isinstance(orders, Exception):
+                    # The positions stay open and the next monitor pass prices new exits
+                    logger.error(f"Error creating sell orders on {name}: {orders}")
+                    continue
+                for exit_order, sell_order in zip(exits[name], orders):
+                    if 'error' in sell_order:
+                        logger.error(f"Error creating sell order: {sell_order.get('error')}")
+                        continue
                     
-                    # Close trade if profit is within target spread range
-                    target_profit = self.config.get('min_spread', 2.0)
+                    position = exit_order['position']
+                    if sell_order.get('order_id') is None:
+                        # Nothing to follow up on; book the exit at the quoted price
+                        self.finish_exit(position, exit_order['exit_price'], position.amount)
+                        continue
                     
-                    if profit_pct >= target_profit:
-                        # Place sell order
-                        sell_order = await exchange_client.create_order(
-                            symbol=trade['symbol'],
-                            side='sell',
-                            amount=trade['amount'],
-                            price=best_bid
-                        )
-                        
-                        if 'error' not in sell_order:
-                            profit = (best_bid - entry_price) * trade['amount']
-                            
-                            await self.db.trades.update_one(
-                                {"id": trade['id']},
-                                {"$set": {
-                                    "status": "closed",
-                                    "exit_price": best_bid,
-                                    "profit": profit,
-                                    "closed_at": datetime.now(timezone.utc).isoformat()
-                                }}
-                            )
-                            
-                            logger.info(f"Trade closed with profit: ${profit:.2f}")
-                
+                    position.status = 'closing'
+                    position.exit_price = exit_order['exit_price']
+                    position.exit_order_id = str(sell_order['order_id'])
+                    position.exit_order_status = order_state.NEW
+                    position.exit_filled_amount = 0.0
+                    position.exit_placed_at = self.clock()
+                    
+                    self.positions.track_order(position, position.exit_order_id)
+                    self.risk.order_opened(name)
+                    self.trade_writer.update(position.id, {
+                        "status": position.status,
+                        "exit_price": position.exit_price,
+                        "exit_order_id": position.exit_order_id,
+                        "exit_order_status": position.exit_order_status,
+                        "exit_filled_amount": position.exit_filled_amount,
+                        "exit_placed_at": position.exit_placed_at
+                    })
+                    
+                    logger.info(f"Exit submitted for {position.symbol} on {name} at {position.exit_price}")
+    
+    @contextlib.asynccontextmanager
+    async def holding_order_events(self, names: List[str]):
+        """Hold updates for unknown orders on these exchanges until the batch's orders are recorded"""
+        for name in names:
+            self.submitting[name] = self.submitting.get(name, 0) + 1
+        self.submissions_idle.clear()
+        try:
+            yield
+        finally:
+            for name in names:
+                self.submitting[name] -= 1
+                if self.submitting[name] == 0:
+                    # Replayed in arrival order; updates still unmatched go to the database
+                    for event in self.held_events.pop(name, []):
+                        try:
+                            await self.apply_order_update(name, event)
+                        except Exception as e:
+                            logger.error(f"Error applying held order update: {e}")
+            if not any(self.submitting.values()):
+                self.submissions_idle.set()
+    
+    async def on_user_event(self, exchange: str, event: Dict):
+        """Callback for exchange user-data streams; queues the event for the engine"""
+        await self.user_events.put((exchange, event))
+    
+    async def process_user_events(self):
+        """Apply order updates from the private streams to the matching trades"""
+        while True:
+            exchange, event = await self.user_events.get()
+            await self.apply_user_event(exchange, event)
+    
+    async def apply_user_event(self, exchange: str, event: Dict):
+        try:
+            if event['type'] == 'order':
+                await self.apply_order_update(exchange, event)
+            elif event['type'] == 'fill':
+                logger.info(f"Fill on {exchange}: {event['side']} {event['quantity']} {event['symbol']} @ {event['price']}")
         except Exception as e:
-            logger.error(f"Error monitoring trades: {e}")
+            logger.error(f"Error applying user event: {e}")
+    
+    async def apply_order_update(self, exchange: str, event: Dict):
+        """Move an entry or exit order through its lifecycle from an exchange report"""
+        if not event.get('order_id'):
+            return
+        order_id = str(event['order_id'])
+        
+        position = self.positions.find_order(exchange, order_id)
+        if position is None:
+            if self.submitting.get(exchange):
+                # Possibly an order from the batch still being submitted; its trade is not recorded yet
+                self.held_events.setdefault(exchange, []).append(event)
+                return
+            # Orders from before this process started are only in the database
+            await self.apply_order_update_to_db(exchange, order_id, event)
+            return
+        
+        is_entry = position.order_id == order_id
+        current = self.order_status(position, order_id)
+        if order_state.is_terminal(current):
+            # Already final; nothing more will change, so stop following it
+            self.positions.release_order(exchange, order_id)
+            return
+        recorded = (position.filled_amount if is_entry else position.exit_filled_amount) or 0.0
+        status = order_state.transition(current, event['status'])
+        if status is None or event['filled'] < recorded:
+            # Stale or out-of-order report
+            return
+        
+        if is_entry:
+            update = self.apply_entry_update(position, status, event)
+        else:
+            update = self.apply_exit_update(position, status, event)
+        
+        if order_state.is_terminal(status):
+            self.positions.release_order(exchange, order_id)
+            self.risk.order_finished(exchange)
+            if is_entry:
+                update.update(self.finish_entry(position))
+            else:
+                update.update(self.finish_exit(position, position.exit_price, position.exit_filled_amount, persist=False))
+        self.trade_writer.update(position.id, update)
+    
+    def apply_entry_update(self, position: Position, status: str, event: Dict) -> Dict:
+        position.order_status = status
+        position.filled_amount = event['filled']
+        update = {"order_status": position.order_status, "filled_amount": position.filled_amount}
+        if event['filled'] > 0 and event['avg_price'] > 0:
+            position.entry_price = update["entry_price"] = event['avg_price']
+        return update
+    
+    def apply_exit_update(self, position: Position, status: str, event: Dict) -> Dict:
+        position.exit_order_status = status
+        position.exit_filled_amount = event['filled']
+        update = {"exit_order_status": position.exit_order_status, "exit_filled_amount": position.exit_filled_amount}
+        if event['filled'] > 0 and event['avg_price'] > 0:
+            position.exit_price = update["exit_price"] = event['avg_price']
+        return update
+    
+    def finish_entry(self, position: Position) -> Dict:
+        """Hold what the finished entry bought, or drop the trade if it bought nothing"""
+        key = position.signal_id or position.id
+        self.risk.release(key)
+        if position.filled_amount > 0:
+            position.status = 'open'
+            position.amount = position.filled_amount
+            self.risk.reserve(key, position.exchange, position.symbol, position.chain or 'unknown',
+                              position.entry_price * position.amount)
+            logger.info(f"Entry filled: {position.amount} {position.symbol} on {position.exchange} @ {position.entry_price}")
+            return {"status": position.status, "amount": position.amount}
+        
+        position.status = 'cancelled'
+        position.closed_at = self.utcnow().isoformat()
+        self.positions.close(position)
+        logger.info(f"Entry {position.order_id} for {position.symbol} on {position.exchange} ended unfilled")
+        return {"status": position.status, "closed_at": position.closed_at}
+    
+    def finish_exit(self, position: Position, exit_price: Optional[float], sold: Optional[float], persist: bool = True) -> Dict:
+        """Realize what a finished exit sold; close the trade, or hold the remainder for another exit"""
+        sold = min(sold or 0.0, position.amount)
+        remaining = position.amount - sold
+        if sold > 0 and exit_price:
+            pnl = (exit_price - position.entry_price) * sold
+            position.profit = (position.profit or 0.0) + pnl
+            self.risk.record_pnl(pnl)
+        
+        if remaining <= position.amount * 1e-9:
+            position.status = 'closed'
+            position.closed_at = self.utcnow().isoformat()
+            self.positions.close(position)
+            self.risk.release(position.signal_id or position.id)
+            update = {"status": position.status, "profit": position.profit or 0.0, "closed_at": position.closed_at}
+            logger.info(f"Trade closed with profit: ${position.profit or 0.0:.2f}")
+        else:
+            # Cancelled or partly filled exit: hold the rest so the monitor prices a new exit
+            self.positions.release_order(position.exchange, position.exit_order_id)
+            position.amount = remaining
+            position.status = 'open'
+            position.exit_order_id = None
+            update = {"status": position.status, "amount": position.amount, "exit_order_id": None}
+            if position.profit is not None:
+                update["profit"] = position.profit
+        
+        if persist:
+            update["exit_price"] = exit_price
+            self.trade_writer.update(position.id, update)
+        return update
+    
+    async def apply_order_update_to_db(self, exchange: str, order_id: str, event: Dict):
+        """Record an update for an order not in memory, unless its trade belongs to another instance or the order is final"""
+        owner = {"owner": self.instance_id} if self.leases is not None else {}
+        entry_update = {
+            "order_status": event['status'],
+            "filled_amount": event['filled']
+        }
+        if event['filled'] > 0 and event['avg_price'] > 0:
+            entry_update["entry_price"] = event['avg_price']
+        result = await self.db.trades.update_one(
+            {"exchange": exchange, "order_id": order_id, "order_status": {"$nin": list(order_state.TERMINAL)}, **owner},
+            {"$set": entry_update}
+        )
+        if result.matched_count:
+            return
+        
+        exit_update = {
+            "exit_order_status": event['status'],
+            "exit_filled_amount": event['filled']
+        }
+        if event['filled'] > 0 and event['avg_price'] > 0:
+            exit_update["exit_price"] = event['avg_price']
+        await self.db.trades.update_one(
+            {"exchange": exchange, "exit_order_id": order_id, "exit_order_status": {"$nin": list(order_state.TERMINAL)}, **owner},
+            {"$set": exit_update}
+        )
+    
+    async def reconcile_orders(self):
+        """Check working orders against the exchanges every reconcile_interval seconds"""
+        interval = self.config.get('reconcile_interval', 15)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile_pass()
+            except Exception as e:
+                logger.error(f"Error reconciling orders: {e}")
+    
+    async def reconcile_pass(self):
+        """Query working orders per exchange, apply any missed updates and cancel orders left too long"""
+        now = self.clock()
+        grace = self.config.get('reconcile_grace', 10)
+        by_exchange: Dict[str, List] = {}
+        for position, order_id in self.positions.working_orders():
+            placed_at = position.order_placed_at if order_id == position.order_id else position.exit_placed_at
+            # Fresh orders are left to the streams
+            if position.exchange in self.exchanges and now - (placed_at or 0) >= grace:
+                by_exchange.setdefault(position.exchange, []).append((position, order_id, placed_at or 0))
+        if not by_exchange:
+            return
+        
+        names = list(by_exchange)
+        results = await asyncio.gather(
+            *(self.query_orders(name, by_exchange[name]) for name in names),
+            return_exceptions=True
+        )
+        
+        timeout = self.config.get('order_timeout', 60)
+        stale: Dict[str, List] = {}
+        for name, states in zip(names, results):
+            if isinstance(states, Exception):
+                logger.error(f"Error querying orders on {name}: {states}")
+                continue
+            for (position, order_id, placed_at), state in zip(by_exchange[name], states):
+                # The stream may have finished the order since the snapshot; its state is then stale
+                if self.positions.find_order(name, order_id) is not position:
+                    continue
+                if isinstance(state, dict) and state.get('status'):
+                    await self.apply_order_update(name, {
+                        'type': 'order', 'order_id': order_id, 'symbol': position.symbol,
+                        'status': state['status'], 'filled': state.get('filled', 0.0), 'avg_price': state.get('avg_price', 0.0)
+                    })
+                # Limit orders that sat past the timeout are cancelled; exits are repriced by the next monitor pass
+                if self.positions.find_order(name, order_id) is position and now - placed_at >= timeout and \
+                        self.order_status(position, order_id) != order_state.CANCEL_PENDING:
+                    stale.setdefault(name, []).append((position, order_id))
+        
+        if stale:
+            await self.cancel_stale_orders(stale)
+    
+    async def query_orders(self, exchange: str, orders: List) -> List:
+        client = self.exchanges[exchange]
+        return await asyncio.gather(
+            *(self.with_slot(exchange, client.get_order, order_id, position.symbol) for position, order_id, _ in orders),
+            return_exceptions=True
+        )
+    
+    def order_status(self, position: Position, order_id: str) -> Optional[str]:
+        return position.order_status if order_id == position.order_id else position.exit_order_status
+    
+    async def cancel_stale_orders(self, stale: Dict[str, List]):
+        """Cancel stale orders in one batch per exchange and mark them cancel-pending until confirmed"""
+        names = list(stale)
+        results = await asyncio.gather(
+            *(self.with_slot(name, self.exchanges[name].cancel_orders,
+                             [{'order_id': order_id, 'symbol': position.symbol} for position, order_id in stale[name]])
+              for name in names),
+            return_exceptions=True
+        )
+        
+        for name, cancelled in zip(names, results):
+            if isinstance(cancelled, Exception):
+                logger.error(f"Error cancelling stale orders on {name}: {cancelled}")
+                continue
+            for (position, order_id), ok in zip(stale[name], cancelled):
+                if not ok or self.positions.find_order(name, order_id) is not position:
+                    continue
+                # The confirmation arrives on the stream or the next reconcile pass
+                if order_id == position.order_id:
+                    position.order_status = order_state.CANCEL_PENDING
+                    self.trade_writer.update(position.id, {"order_status": position.order_status})
+                else:
+                    position.exit_order_status = order_state.CANCEL_PENDING
+                    self.trade_writer.update(position.id, {"exit_order_status": position.exit_order_status})
+                logger.info(f"Cancelling stale order {order_id} for {position.symbol} on {name}")
+    
+    async def with_slot(self, exchange: str, request, *args):
+        """Run an exchange request while holding one of the exchange's concurrency slots"""
+        async with self.exchange_slots[exchange]:
+            with self.tracer.span(f"{request.__name__}.{exchange}"):
+                return await request(*args)
     
     async def find_best_exchange(self, signal: Dict) -> Optional[Dict]:
-        """Find the best exchange for trading a signal"""
-        # In production, implement logic to find which exchange has this token
-        # For now, return a default exchange if available
+        """Quote every venue listing the token concurrently and pick the best executable buy price"""
+        listings = self.market_index.resolve(signal)
+        candidates = [
+            (name, listings[name]) for name in self.config.get('active_exchanges', [])
+            if name in listings and name in self.exchanges
+        ]
+        if not candidates:
+            return None
+        
+        # Venues that miss the deadline are dropped rather than waited for
+        deadline = self.config.get('quote_deadline_ms', 300) / 1000
+        requests = {
+            asyncio.create_task(self.with_slot(name, self.exchanges[name].get_orderbook, instrument['symbol'])): (name, instrument)
+            for name, instrument in candidates
+        }
+        done, pending = await asyncio.wait(requests, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info(f"Dropped late quotes from: {', '.join(requests[task][0] for task in pending)}")
+        
+        responses = [(requests[task], task.result()) for task in done if task.exception() is None]
+        if not responses:
+            return None
+        
+        amount = self.config.get('trade_amount', 100.0)
+        quotes = quote_books([orderbook for _, orderbook in responses], amount)
+        
+        best = None
+        for i, ((name, instrument), orderbook) in enumerate(responses):
+            if not quotes['fillable'][i] or quotes['buy_price'][i] <= 0:
+                continue
+            if best is None or quotes['buy_price'][i] < quotes['buy_price'][best]:
+                best = i
         
-        for exchange_name in self.config.get('active_exchanges', []):
-            if exchange_name in self.exchanges:
-                return {'name': exchange_name, 'symbol': 'BTC/USDT'}
+        if best is None:
+            logger.info(f"No venue can fill ${amount} for signal {signal['id']}")
+            return None
         
-        return None
\ No newline at end of file
+        (name, instrument), orderbook = responses[best]
+        return {
+            'name': name,
+            'symbol': instrument['symbol'],
+            'instrument': instrument,
+            'orderbook': orderbook,
+            'quote': {key: (bool(values[best]) if key == 'fillable' else float(values[best])) for key, values in quotes.items()}
+        }
\ No newline at end of file
@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import logging
+from typing import Dict, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+class BufferedUpdate(UpdateOne):
+    """UpdateOne that keeps its filter, update and upsert flag as public attributes.
+
+    pymongo only stores them privately; collections other than Motor's, such as
+    the replay harness's in-memory one, read them from here.
+    """
+
+    def __init__(self, filter: Dict, update: Dict, upsert: bool = False):
+        super().__init__(filter, update, upsert=upsert)
+        self.filter = filter
+        self.update = update
+        self.upsert = upsert
+
+class WriteBehind:
+    """Buffers inserts and field updates for one collection and flushes them with bulk_write.
+
+    Updates to the same document are merged, and updates to a document whose
+    insert is still buffered are folded into the insert, so each flush sends
+    at most one operation per document and the batch can be unordered. Inserts
+    are written as upserts, which makes retrying a partially applied batch safe.
+    """
+
+    def __init__(self, collection, key: str = 'id', flush_interval: float = 0.5, max_batch: int = 500):
+        self.collection = collection
+        self.key = key
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.running = False
+        self._inserts: Dict[str, Dict] = {}
+        self._updates: Dict[str, Dict] = {}
+        self._lock = asyncio.Lock()
+        # Early flushes started by _kick; referenced until done so they are neither collected nor lost
+        self._tasks: set = set()
+
+    def __len__(self) -> int:
+        return len(self._inserts) + len(self._updates)
+
+    def insert(self, doc: Dict):
+        self._inserts[doc[self.key]] = dict(doc)
+        self._kick()
+
+    def update(self, doc_id: str, fields: Dict):
+        """Queue a $set of fields on the document with this key"""
+        if doc_id in self._inserts:
+            self._inserts[doc_id].update(fields)
+        else:
+            self._updates.setdefault(doc_id, {}).update(fields)
+        self._kick()
+
+    def _kick(self):
+        # Flush early rather than let a burst grow past one batch
+        if self.running and len(self) >= self.max_batch and not self._lock.locked():
+            _track(self._tasks, self.flush())
+
+    async def run(self):
+        """Flush buffered writes every flush_interval seconds"""
+        self.running = True
+        while self.running:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write everything buffered; failed batches are merged back and retried on the next flush"""
+        async with self._lock:
+            if not self._inserts and not self._updates:
+                return
+
+            inserts, self._inserts = self._inserts, {}
+            updates, self._updates = self._updates, {}
+            operations = [BufferedUpdate({self.key: doc_id}, {'$set': doc}, upsert=True) for doc_id, doc in inserts.items()]
+            operations += [BufferedUpdate({self.key: doc_id}, {'$set': fields}) for doc_id, fields in updates.items()]
+
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except asyncio.CancelledError:
+                # Interrupted mid-write; the upserts and $sets are safe to send again
+                self._requeue(inserts, updates)
+                raise
+            except Exception as e:
+                logger.error(f"Write-behind flush of {len(operations)} operations failed: {e}")
+                self._requeue(inserts, updates)
+
+    def _requeue(self, inserts: Dict[str, Dict], updates: Dict[str, Dict]):
+        # Anything queued since the failed flush is newer and wins
+        for doc_id, doc in inserts.items():
+            doc.update(self._updates.pop(doc_id, {}))
+            doc.update(self._inserts.get(doc_id, {}))
+            self._inserts[doc_id] = doc
+        for doc_id, fields in updates.items():
+            fields.update(self._updates.get(doc_id, {}))
+            self._updates[doc_id] = fields
+
+    async def stop(self):
+        """Stop the background loop and write whatever is still buffered"""
+        self.running = False
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+def _track(tasks: set, coro) -> asyncio.Task:
+    """Run coro as a task held in `tasks` until it finishes, logging any failure"""
+    task = asyncio.create_task(coro)
+    tasks.add(task)
+    task.add_done_callback(functools.partial(_finished, tasks))
+    return task
+
+def _finished(tasks: set, task: asyncio.Task):
+    tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background flush failed: {task.exception()}")
+
+class InsertBatcher:
+    """Groups inserts that arrive within a short linger window into one unordered insert_many"""
+
+    def __init__(self, collection, linger: float = 0.05, max_batch: int = 100):
+        self.collection = collection
+        self.linger = linger
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._tasks: set = set()
+
+    async def insert(self, doc: Dict):
+        """Insert a document, returning once the batch holding it has been written"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((doc, future))
+
+        if len(self._pending) >= self.max_batch:
+            _track(self._tasks, self.flush())
+        else:
+            self._arm()
+
+        await future
+
+    def _arm(self):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.linger, lambda: _track(self._tasks, self.flush()))
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        try:
+            await self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except asyncio.CancelledError:
+            # Put the batch back ahead of newer documents; its callers are still waiting
+            self._pending = batch + self._pending
+            self._arm()
+            raise
+        except BulkWriteError as e:
+            # Unordered, so every document without a write error was inserted, unless the write concern failed too
+            failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+            if not failed or e.details.get('writeConcernErrors'):
+                self._resolve(batch, e)
+            else:
+                for index, (_, future) in enumerate(batch):
+                    if index in failed and not future.done():
+                        future.set_exception(BulkWriteError({'writeErrors': [failed[index]]}))
+                self._resolve(batch)
+        except Exception as e:
+            self._resolve(batch, e)
+        else:
+            self._resolve(batch)
+
+    @staticmethod
+    def _resolve(batch, error: Optional[BaseException] = None):
+        for _, future in batch:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def stop(self):
+        """Wait for running flushes, then write whatever is still waiting"""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
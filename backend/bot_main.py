@@ -5,6 +5,7 @@ Monitors blockchains (ETH, BSC, Solana) and executes trades on multiple exchange
 """
 
 import asyncio
+import json
 import logging
 import os
 from pathlib import Path
@@ -15,6 +16,8 @@ from bot.blockchain_monitor import BlockchainMonitor
 from bot.trading_engine import TradingEngine
 from bot.telegram_notifier import TelegramNotifier
 from bot.dex_client import DEXClient
+from bot.signal_bus import SignalBus
+from bot.tracing import Tracer
 
 # Exchanges
 from exchanges.bybit_exchange import BybitExchange
@@ -38,6 +41,16 @@ logger = logging.getLogger(__name__)
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+def optional_float(name: str):
+    """Float from an environment variable, or None when it is unset"""
+    value = os.getenv(name)
+    return float(value) if value else None
+
+def optional_json(name: str):
+    """Parsed JSON from an environment variable, or None when it is unset"""
+    value = os.getenv(name)
+    return json.loads(value) if value else None
+
 class TradingBot:
     """Main trading bot orchestrator"""
     
@@ -50,10 +63,16 @@ class TradingBot:
         # Initialize components
         self.telegram = TelegramNotifier()
         self.dex_client = DEXClient()
+        self.signal_bus = SignalBus()
+        # One set of latency histograms covers detection through order placement
+        self.tracer = Tracer(enabled=os.getenv('LATENCY_TRACING', 'True').lower() == 'true')
         self.blockchain_monitor = BlockchainMonitor(
             self.db,
             dex_client=self.dex_client,
-            telegram=self.telegram
+            telegram=self.telegram,
+            signal_bus=self.signal_bus,
+            tracer=self.tracer,
+            filter_rules=optional_json('PAIR_FILTER_RULES')
         )
         
         # Get bot configuration
@@ -65,11 +84,26 @@ class TradingBot:
             'trade_amount': 100,
             'auto_trading': os.getenv('ALLOW_LIVE_TRADING', 'False').lower() == 'true',
             'active_blockchains': ['eth', 'bsc', 'solana'],
-            'active_exchanges': []
+            'active_exchanges': [],
+            # Optional rule spec replacing the min_liquidity/min_volume_24h checks (see bot/filter_rules.py)
+            'signal_filter': optional_json('SIGNAL_FILTER_RULES'),
+            # Several engine instances can share one database by leasing signals
+            'instance_id': os.getenv('ENGINE_INSTANCE_ID'),
+            'claim_signals': os.getenv('ENGINE_CLAIM_SIGNALS', 'False').lower() == 'true',
+            'shard_count': int(os.getenv('ENGINE_SHARD_COUNT', '1')),
+            'shard_index': int(os.getenv('ENGINE_SHARD_INDEX', '0')),
+            # Pre-trade risk limits (unset means unlimited)
+            'max_total_notional': optional_float('RISK_MAX_TOTAL_NOTIONAL'),
+            'max_exchange_notional': optional_float('RISK_MAX_EXCHANGE_NOTIONAL'),
+            'max_symbol_notional': optional_float('RISK_MAX_SYMBOL_NOTIONAL'),
+            'max_chain_notional': optional_float('RISK_MAX_CHAIN_NOTIONAL'),
+            'max_open_orders': optional_float('RISK_MAX_OPEN_ORDERS'),
+            'max_rolling_loss': optional_float('RISK_MAX_ROLLING_LOSS'),
+            'loss_window': float(os.getenv('RISK_LOSS_WINDOW', '86400'))
         }
         
         # Initialize trading engine
-        self.trading_engine = TradingEngine(self.db, self.config)
+        self.trading_engine = TradingEngine(self.db, self.config, signal_bus=self.signal_bus, tracer=self.tracer)
         
         # Initialize exchanges
         self.initialize_exchanges()
@@ -77,13 +111,22 @@ class TradingBot:
     def initialize_exchanges(self):
         """Initialize exchange connections based on available API keys"""
         
+        # Shared connection settings for every exchange client
+        client_settings = {
+            'timeout': float(os.getenv('EXCHANGE_HTTP_TIMEOUT', '10')),
+            'connect_timeout': float(os.getenv('EXCHANGE_CONNECT_TIMEOUT', '3')),
+            'max_connections_per_host': int(os.getenv('EXCHANGE_MAX_CONNECTIONS', '20')),
+            'use_websocket': os.getenv('EXCHANGE_USE_WEBSOCKET', 'True').lower() == 'true'
+        }
+        
         # Bybit
         if os.getenv('BYBIT_API_KEY') and os.getenv('BYBIT_API_SECRET'):
             try:
                 bybit = BybitExchange(
                     os.getenv('BYBIT_API_KEY'),
                     os.getenv('BYBIT_API_SECRET'),
-                    testnet=False
+                    testnet=False,
+                    **client_settings
                 )
                 self.trading_engine.add_exchange('bybit', bybit)
                 self.config['active_exchanges'].append('bybit')
@@ -96,7 +139,8 @@ class TradingBot:
             try:
                 bingx = BingXExchange(
                     os.getenv('BINGX_API_KEY'),
-                    os.getenv('BINGX_API_SECRET')
+                    os.getenv('BINGX_API_SECRET'),
+                    **client_settings
                 )
                 self.trading_engine.add_exchange('bingx', bingx)
                 self.config['active_exchanges'].append('bingx')
@@ -109,7 +153,8 @@ class TradingBot:
             try:
                 gate = GateExchange(
                     os.getenv('GATE_API_KEY'),
-                    os.getenv('GATE_API_SECRET')
+                    os.getenv('GATE_API_SECRET'),
+                    **client_settings
                 )
                 self.trading_engine.add_exchange('gate', gate)
                 self.config['active_exchanges'].append('gate')
@@ -123,7 +168,8 @@ class TradingBot:
                 okx = OKXExchange(
                     os.getenv('OKX_API_KEY'),
                     os.getenv('OKX_API_SECRET'),
-                    os.getenv('OKX_PASSPHRASE', '')
+                    os.getenv('OKX_PASSPHRASE', ''),
+                    **client_settings
                 )
                 self.trading_engine.add_exchange('okx', okx)
                 self.config['active_exchanges'].append('okx')
@@ -136,7 +182,8 @@ class TradingBot:
             try:
                 xt = XTExchange(
                     os.getenv('XT_API_KEY'),
-                    os.getenv('XT_API_SECRET')
+                    os.getenv('XT_API_SECRET'),
+                    **client_settings
                 )
                 self.trading_engine.add_exchange('xt', xt)
                 self.config['active_exchanges'].append('xt')
@@ -190,7 +237,7 @@ class TradingBot:
                 stats = {
                     'total_signals': await self.db.signals.count_documents({}),
                     'total_trades': await self.db.trades.count_documents({}),
-                    'open_trades': await self.db.trades.count_documents({'status': 'open'})
+                    'open_trades': await self.db.trades.count_documents({'status': {'$in': ['pending', 'open', 'closing']}})
                 }
                 
                 await self.telegram.send_status_update(stats)
@@ -1,16 +1,200 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
 import logging
+import time
+import aiohttp
+from .orderbook import OrderBook
+from .rate_limiter import TokenBucket
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, backoff_delay
 
 logger = logging.getLogger(__name__)
 
 class BaseExchange(ABC):
     """Base class for all exchange integrations"""
     
-    def __init__(self, api_key: str, api_secret: str):
+    # Request budget in weight units per second; subclasses override per venue
+    rate_limit = 10.0
+    rate_burst = 20.0
+    endpoint_weights: Dict[str, float] = {}
+    
+    # Reads are retried with jittered backoff and hedged once they run past the endpoint's p95
+    max_retries = 2
+    retry_base_delay = 0.1
+    retry_max_delay = 2.0
+    hedge_percentile = 0.95
+    min_hedge_delay = 0.05
+    breaker_failure_threshold = 5
+    breaker_reset_timeout = 30.0
+    
+    # Parallel single-order requests when a venue has no batch endpoint
+    batch_concurrency = 5
+    
+    def __init__(self, api_key: str, api_secret: str, timeout: float = 10.0, connect_timeout: float = 3.0,
+                 max_connections_per_host: int = 20, keepalive_timeout: float = 60.0, dns_cache_ttl: int = 300,
+                 use_websocket: bool = True, rate_limit: Optional[float] = None, rate_burst: Optional[float] = None):
         self.api_key = api_key
         self.api_secret = api_secret
         self.name = self.__class__.__name__
+        
+        # HTTP session settings (session itself is created lazily inside the running loop)
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Shared request budget and identical in-flight public requests
+        self.rate_limiter = TokenBucket(rate_limit or self.rate_limit, rate_burst or self.rate_burst)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        
+        # Streaming order books; subclasses attach their OrderBookStream when use_websocket is set
+        self.use_websocket = use_websocket
+        self.orderbook_stream = None
+        # Private order/fill/balance stream; subclasses attach their UserDataStream
+        self.user_stream = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared keep-alive session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+    
+    async def _http_request(self, method: str, url: str, params: Dict = None, headers: Dict = None,
+                            endpoint: str = '', signed: bool = False) -> Dict:
+        """Send a rate-limited request, sharing one response between identical public GETs"""
+        if method != 'GET' or signed:
+            return await self._resilient_request(method, url, params, headers, endpoint)
+        
+        key = (url, tuple(sorted((params or {}).items())))
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._resilient_request(method, url, params, headers, endpoint))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._request_done(key, f))
+        # Shielded so one cancelled caller does not cancel the shared request
+        return await asyncio.shield(future)
+    
+    def _request_done(self, key: tuple, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()
+    
+    async def _resilient_request(self, method: str, url: str, params: Dict = None, headers: Dict = None,
+                                 endpoint: str = '') -> Dict:
+        """Fail fast while the endpoint's breaker is open; retry and hedge idempotent reads"""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(self.breaker_failure_threshold, self.breaker_reset_timeout)
+        
+        # Orders are not idempotent, so only reads get retries and hedges
+        idempotent = method == 'GET'
+        attempts = self.max_retries + 1 if idempotent else 1
+        
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"{self.name} {endpoint} circuit open")
+            try:
+                if idempotent:
+                    result = await self._hedged_request(method, url, params, headers, endpoint)
+                else:
+                    result = await self._send_request(method, url, params, headers, endpoint)
+                breaker.record_success()
+                return result
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise
+                logger.warning(f"{self.name} {endpoint} attempt {attempt + 1} failed: {e!r}")
+                await asyncio.sleep(backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay))
+            except BaseException:
+                # Anything else, cancellation included, still ends a half-open trial
+                breaker.record_failure()
+                raise
+    
+    async def _hedged_request(self, method: str, url: str, params: Dict = None, headers: Dict = None,
+                              endpoint: str = '') -> Dict:
+        """Send a duplicate request if the first one outlives the endpoint's tail latency"""
+        tracker = self._latencies.get(endpoint)
+        if tracker is None:
+            tracker = self._latencies[endpoint] = LatencyTracker()
+        
+        threshold = tracker.percentile(self.hedge_percentile)
+        primary = asyncio.ensure_future(self._timed_request(tracker, method, url, params, headers, endpoint))
+        if threshold is None:
+            return await primary
+        
+        done, _ = await asyncio.wait({primary}, timeout=max(threshold, self.min_hedge_delay))
+        if done:
+            return primary.result()
+        
+        hedge = asyncio.ensure_future(self._timed_request(tracker, method, url, params, headers, endpoint))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _timed_request(self, tracker: LatencyTracker, method: str, url: str, params: Dict = None,
+                             headers: Dict = None, endpoint: str = '') -> Dict:
+        started = time.monotonic()
+        result = await self._send_request(method, url, params, headers, endpoint)
+        tracker.record(time.monotonic() - started)
+        return result
+    
+    async def _send_request(self, method: str, url: str, params: Dict = None, headers: Dict = None,
+                            endpoint: str = '') -> Dict:
+        """Wait for rate-limit budget, then send the request over the shared session"""
+        await self.rate_limiter.acquire(self.endpoint_weights.get(endpoint, 1.0))
+        
+        session = self._get_session()
+        if method in ('GET', 'DELETE'):
+            kwargs = {'params': params}
+        else:
+            kwargs = {'json': params}
+        
+        async with session.request(method, url, headers=headers, **kwargs) as resp:
+            if resp.status == 429:
+                retry_after = float(resp.headers.get('Retry-After', 1))
+                self.rate_limiter.pause(retry_after)
+                logger.warning(f"{self.name} rate limited on {endpoint}, pausing {retry_after}s")
+            if resp.status == 429 or resp.status >= 500:
+                resp.raise_for_status()
+            return await resp.json(content_type=None)
+    
+    def start_user_stream(self, on_event: Callable[[Dict], Awaitable]) -> bool:
+        """Start the private stream, delivering normalized events to on_event; False if unsupported"""
+        if self.user_stream is None:
+            return False
+        self.user_stream.on_event = on_event
+        self.user_stream.start()
+        return True
+    
+    async def close(self):
+        """Stop streams and close the shared HTTP session"""
+        if self.orderbook_stream is not None:
+            await self.orderbook_stream.stop()
+        if self.user_stream is not None:
+            await self.user_stream.stop()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     @abstractmethod
     async def get_balance(self) -> Dict[str, float]:
@@ -18,13 +202,22 @@ class BaseExchange(ABC):
         pass
     
     @abstractmethod
-    async def get_orderbook(self, symbol: str) -> Dict:
-        """Get orderbook for a symbol"""
+    async def fetch_orderbook(self, symbol: str) -> OrderBook:
+        """Fetch an orderbook snapshot over REST"""
         pass
     
+    async def get_orderbook(self, symbol: str) -> OrderBook:
+        """Get orderbook for a symbol, from the local stream book when it is in sync"""
+        if self.orderbook_stream is not None:
+            book = self.orderbook_stream.get(symbol)
+            if book is not None:
+                return book
+            await self.orderbook_stream.subscribe(symbol)
+        return await self.fetch_orderbook(symbol)
+    
     @abstractmethod
     async def create_order(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
-        """Create a new order"""
+        """Create a new order; returns the venue response with 'order_id', or {'error': ...}"""
         pass
     
     @abstractmethod
@@ -42,16 +235,48 @@ class BaseExchange(ABC):
         """Cancel an order"""
         pass
     
-    def calculate_spread(self, orderbook: Dict) -> float:
+    async def create_orders(self, orders: List[Dict]) -> List[Dict]:
+        """Create several orders (dicts with symbol, side, amount, optional price); results keep input order"""
+        return await self._fan_out(
+            lambda order: self.create_order(order['symbol'], order['side'], order['amount'], order.get('price')),
+            orders
+        )
+    
+    async def cancel_orders(self, orders: List[Dict]) -> List[bool]:
+        """Cancel several orders (dicts with order_id and symbol); results keep input order"""
+        return await self._fan_out(lambda order: self.cancel_order(order['order_id'], order['symbol']), orders)
+    
+    async def _fan_out(self, call, items: List[Dict]) -> List:
+        """Run call(item) for every item with at most batch_concurrency in flight"""
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        
+        async def run(item):
+            async with semaphore:
+                return await call(item)
+        
+        return list(await asyncio.gather(*(run(item) for item in items)))
+    
+    @staticmethod
+    def _chunks(items: List, size: int) -> List[List]:
+        return [items[i:i + size] for i in range(0, len(items), size)]
+    
+    @abstractmethod
+    async def get_markets(self) -> List[Dict]:
+        """Get tradable spot instruments as dicts with symbol, base, quote, tick_size, lot_size, min_notional"""
+        pass
+    
+    async def get_order(self, order_id: str, symbol: str) -> Dict:
+        """Current state of one order as order_id, status (UserDataStream values), filled, avg_price; {} if unknown"""
+        return {}
+    
+    async def get_token_addresses(self) -> Dict[str, str]:
+        """Map token contract addresses (lowercase) to base assets, where the venue publishes them"""
+        return {}
+    
+    def calculate_spread(self, orderbook: OrderBook) -> float:
         """Calculate spread from orderbook"""
         try:
-            best_bid = float(orderbook['bids'][0][0]) if orderbook.get('bids') else 0
-            best_ask = float(orderbook['asks'][0][0]) if orderbook.get('asks') else 0
-            
-            if best_bid > 0 and best_ask > 0:
-                spread = ((best_ask - best_bid) / best_bid) * 100
-                return round(spread, 4)
-            return 0
+            return round(orderbook.spread_pct(), 4)
         except Exception as e:
             logger.error(f"Error calculating spread: {e}")
             return 0
\ No newline at end of file
@@ -1,19 +1,153 @@
-import aiohttp
+import asyncio
 import time
 import hmac
 import hashlib
+import gzip
+import uuid
 from typing import Dict, List, Optional
 from .base_exchange import BaseExchange
+from .orderbook import OrderBook
+from .orderbook_stream import OrderBookStream
+from .user_stream import UserDataStream
 import logging
 
 logger = logging.getLogger(__name__)
 
+class BingXOrderBookStream(OrderBookStream):
+    """BingX depth stream; every push is a full snapshot, so no sequencing is needed"""
+    
+    ws_url = "wss://open-api-ws.bingx.com/market"
+    
+    def _subscribe_messages(self, symbols: List[str]) -> List:
+        return [{'id': uuid.uuid4().hex, 'reqType': 'sub', 'dataType': f"{symbol}@depth50"} for symbol in symbols]
+    
+    def _unsubscribe_messages(self, symbols: List[str]) -> List:
+        return [{'id': uuid.uuid4().hex, 'reqType': 'unsub', 'dataType': f"{symbol}@depth50"} for symbol in symbols]
+    
+    def _decode(self, raw) -> str:
+        # Frames are gzip-compressed
+        return gzip.decompress(raw).decode() if isinstance(raw, bytes) else raw
+    
+    async def _on_text(self, ws, text: str):
+        if text == 'Ping':
+            await ws.send_str('Pong')
+    
+    async def _on_message(self, data: Dict):
+        data_type = data.get('dataType', '')
+        if '@depth' not in data_type:
+            return
+        
+        book = self.books.get(data_type.split('@')[0])
+        if book is None:
+            return
+        
+        depth = data.get('data') or {}
+        book.load(depth.get('bids', []), depth.get('asks', []))
+
+class BingXUserDataStream(UserDataStream):
+    """BingX spot execution reports and account updates over a listen-key stream"""
+    
+    ws_url = "wss://open-api-ws.bingx.com/market"
+    listen_key_endpoint = '/openApi/user/auth/userDataStream'
+    # Listen keys expire after 60 minutes unless extended
+    extend_interval = 1800.0
+    status_map = {
+        'NEW': 'new',
+        'PENDING': 'new',
+        'PARTIALLY_FILLED': 'partially_filled',
+        'FILLED': 'filled',
+        'CANCELED': 'cancelled',
+        'FAILED': 'rejected'
+    }
+    
+    def __init__(self, exchange, **kwargs):
+        super().__init__(exchange, **kwargs)
+        self.listen_key = None
+        self._extender = None
+    
+    async def _connect_url(self) -> str:
+        result = await self.exchange._request('POST', self.listen_key_endpoint, signed=True)
+        self.listen_key = result.get('listenKey')
+        if not self.listen_key:
+            raise RuntimeError(f"no listen key: {result.get('msg')}")
+        return f"{self.ws_url}?listenKey={self.listen_key}"
+    
+    async def _on_connect(self, ws):
+        await self._send([
+            {'id': uuid.uuid4().hex, 'reqType': 'sub', 'dataType': 'spot.executionReport'},
+            {'id': uuid.uuid4().hex, 'reqType': 'sub', 'dataType': 'ACCOUNT_UPDATE'}
+        ])
+        self._extender = self._spawn(self._extend_listen_key())
+    
+    def _on_disconnect(self):
+        if self._extender is not None:
+            self._extender.cancel()
+            self._extender = None
+    
+    async def _extend_listen_key(self):
+        while True:
+            await asyncio.sleep(self.extend_interval)
+            try:
+                await self.exchange._request('PUT', self.listen_key_endpoint, {'listenKey': self.listen_key}, signed=True)
+            except Exception as e:
+                logger.error(f"BingX listen key extension error: {e}")
+    
+    def _decode(self, raw) -> str:
+        return gzip.decompress(raw).decode() if isinstance(raw, bytes) else raw
+    
+    async def _on_text(self, ws, text: str):
+        if text == 'Ping':
+            await ws.send_str('Pong')
+    
+    async def _on_message(self, data: Dict):
+        if data.get('dataType') == 'spot.executionReport':
+            item = data.get('data') or {}
+            filled = float(item.get('z') or 0)
+            await self._emit(
+                'order',
+                order_id=str(item.get('i')),
+                symbol=item.get('s'),
+                side=(item.get('S') or '').lower(),
+                status=self._status(item.get('X')),
+                quantity=float(item.get('q') or 0),
+                price=float(item.get('p') or 0),
+                filled=filled,
+                avg_price=float(item.get('Z') or 0) / filled if filled else 0.0
+            )
+            if float(item.get('l') or 0) > 0:
+                await self._emit(
+                    'fill',
+                    order_id=str(item.get('i')),
+                    symbol=item.get('s'),
+                    side=(item.get('S') or '').lower(),
+                    price=float(item.get('L') or 0),
+                    quantity=float(item.get('l') or 0),
+                    fee=abs(float(item.get('n') or 0)),
+                    trade_id=item.get('t')
+                )
+        elif data.get('e') == 'ACCOUNT_UPDATE':
+            for item in data.get('a', {}).get('B', []):
+                free = float(item.get('wb') or 0)
+                await self._emit(
+                    'balance',
+                    asset=item.get('a'),
+                    free=free,
+                    locked=max(float(item.get('cw') or free) - free, 0.0)
+                )
+
 class BingXExchange(BaseExchange):
     """BingX Exchange Integration"""
     
-    def __init__(self, api_key: str, api_secret: str):
-        super().__init__(api_key, api_secret)
+    rate_limit = 10.0
+    rate_burst = 20.0
+    
+    def __init__(self, api_key: str, api_secret: str, **kwargs):
+        super().__init__(api_key, api_secret, **kwargs)
         self.base_url = "https://open-api.bingx.com"
+        
+        if self.use_websocket:
+            self.orderbook_stream = BingXOrderBookStream(self)
+            self.user_stream = BingXUserDataStream(self)
     
     def _generate_signature(self, params: str) -> str:
         return hmac.new(self.api_secret.encode(), params.encode(), hashlib.sha256).hexdigest()
@@ -29,13 +163,7 @@ class BingXExchange(BaseExchange):
             param_str = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
             params['signature'] = self._generate_signature(param_str)
         
-        async with aiohttp.ClientSession() as session:
-            if method == 'GET':
-                async with session.get(url, params=params, headers=headers) as resp:
-                    return await resp.json()
-            elif method == 'POST':
-                async with session.post(url, json=params, headers=headers) as resp:
-                    return await resp.json()
+        return await self._http_request(method, url, params, headers, endpoint=endpoint, signed=signed)
     
     async def get_balance(self) -> Dict[str, float]:
         try:
@@ -45,13 +173,14 @@ class BingXExchange(BaseExchange):
             logger.error(f"BingX get_balance error: {e}")
             return {}
     
-    async def get_orderbook(self, symbol: str) -> Dict:
+    async def fetch_orderbook(self, symbol: str) -> OrderBook:
         try:
             result = await self._request('GET', '/openApi/spot/v1/market/depth', {'symbol': symbol, 'limit': 20})
-            return result.get('data', {'bids': [], 'asks': []})
+            data = result.get('data') or {}
+            return OrderBook.from_levels(symbol, data.get('bids', []), data.get('asks', []), seq=None)
         except Exception as e:
-            logger.error(f"BingX get_orderbook error: {e}")
-            return {'bids': [], 'asks': []}
+            logger.error(f"BingX fetch_orderbook error: {e}")
+            return OrderBook(symbol)
     
     async def create_order(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
         try:
@@ -65,7 +194,9 @@ class BingXExchange(BaseExchange):
                 params['price'] = price
             
             result = await self._request('POST', '/openApi/spot/v1/trade/order', params, signed=True)
-            return result
+            if result.get('code') != 0:
+                return {'error': result.get('msg')}
+            return {**result, 'order_id': str((result.get('data') or {}).get('orderId'))}
         except Exception as e:
             logger.error(f"BingX create_order error: {e}")
             return {'error': str(e)}
@@ -96,4 +227,42 @@ class BingXExchange(BaseExchange):
             return result.get('code') == 0
         except Exception as e:
             logger.error(f"BingX cancel_order error: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    async def get_order(self, order_id: str, symbol: str) -> Dict:
+        try:
+            result = await self._request('GET', '/openApi/spot/v1/trade/query', {'symbol': symbol, 'orderId': order_id}, signed=True)
+            item = result.get('data') or {}
+            if result.get('code') != 0 or not item:
+                return {}
+            filled = float(item.get('executedQty') or 0)
+            return {
+                'order_id': str(item.get('orderId')),
+                'status': BingXUserDataStream.status_map.get(item.get('status'), 'new'),
+                'filled': filled,
+                'avg_price': float(item.get('cummulativeQuoteQty') or 0) / filled if filled else 0.0
+            }
+        except Exception as e:
+            logger.error(f"BingX get_order error: {e}")
+            return {}
+    
+    async def get_markets(self) -> List[Dict]:
+        try:
+            result = await self._request('GET', '/openApi/spot/v1/common/symbols')
+            markets = []
+            for item in result.get('data', {}).get('symbols', []):
+                if item.get('status') != 1:
+                    continue
+                base, _, quote = item['symbol'].partition('-')
+                markets.append({
+                    'symbol': item['symbol'],
+                    'base': base.upper(),
+                    'quote': quote.upper(),
+                    'tick_size': float(item.get('tickSize', 0) or 0),
+                    'lot_size': float(item.get('stepSize', 0) or 0),
+                    'min_notional': float(item.get('minNotional', 0) or 0)
+                })
+            return markets
+        except Exception as e:
+            logger.error(f"BingX get_markets error: {e}")
+            return []
\ No newline at end of file
@@ -1,20 +1,130 @@
-import aiohttp
+import asyncio
 import time
 import hmac
 import hashlib
 import json
 from typing import Dict, List, Optional
 from .base_exchange import BaseExchange
+from .orderbook import OrderBook
+from .orderbook_stream import OrderBookStream
+from .user_stream import UserDataStream
 import logging
 
 logger = logging.getLogger(__name__)
 
+class BybitOrderBookStream(OrderBookStream):
+    """Bybit v5 spot orderbook.50 stream (snapshot + sequential deltas)"""
+    
+    ws_url = "wss://stream.bybit.com/v5/public/spot"
+    ping_message = '{"op": "ping"}'
+    
+    def _subscribe_messages(self, symbols: List[str]) -> List:
+        # Spot accepts at most 10 topics per request
+        topics = [f"orderbook.50.{symbol}" for symbol in symbols]
+        return [{'op': 'subscribe', 'args': topics[i:i + 10]} for i in range(0, len(topics), 10)]
+    
+    def _unsubscribe_messages(self, symbols: List[str]) -> List:
+        topics = [f"orderbook.50.{symbol}" for symbol in symbols]
+        return [{'op': 'unsubscribe', 'args': topics[i:i + 10]} for i in range(0, len(topics), 10)]
+    
+    async def _on_message(self, data: Dict):
+        if not data.get('topic', '').startswith('orderbook.'):
+            return
+        
+        book_data = data.get('data', {})
+        symbol = book_data.get('s')
+        book = self.books.get(symbol)
+        if book is None:
+            return
+        
+        update_id = book_data.get('u')
+        # u == 1 means the service restarted and the message is a full snapshot
+        if data.get('type') == 'snapshot' or update_id == 1:
+            book.load(book_data.get('b', []), book_data.get('a', []), update_id)
+        elif not book.synced:
+            return
+        elif update_id != book.seq + 1:
+            await self._resync(symbol)
+        else:
+            book.apply(book_data.get('b', []), book_data.get('a', []), update_id)
+
+class BybitUserDataStream(UserDataStream):
+    """Bybit v5 private stream: order, execution and wallet topics"""
+    
+    ws_url = "wss://stream.bybit.com/v5/private"
+    ping_message = '{"op": "ping"}'
+    status_map = {
+        'New': 'new',
+        'PartiallyFilled': 'partially_filled',
+        'Filled': 'filled',
+        'Cancelled': 'cancelled',
+        'PartiallyFilledCanceled': 'cancelled',
+        'Rejected': 'rejected'
+    }
+    
+    async def _on_connect(self, ws):
+        expires = int((time.time() + 10) * 1000)
+        signature = hmac.new(self.exchange.api_secret.encode(), f"GET/realtime{expires}".encode(), hashlib.sha256).hexdigest()
+        await self._send([{'op': 'auth', 'args': [self.exchange.api_key, expires, signature]}])
+    
+    async def _on_message(self, data: Dict):
+        if data.get('op') == 'auth':
+            if data.get('success'):
+                await self._send([{'op': 'subscribe', 'args': ['order', 'execution', 'wallet']}])
+            else:
+                logger.error(f"Bybit private stream auth failed: {data.get('ret_msg')}")
+            return
+        
+        topic = data.get('topic')
+        for item in data.get('data', []):
+            if topic == 'order' and item.get('category') == 'spot':
+                await self._emit(
+                    'order',
+                    order_id=item.get('orderId'),
+                    symbol=item.get('symbol'),
+                    side=item.get('side', '').lower(),
+                    status=self._status(item.get('orderStatus')),
+                    quantity=float(item.get('qty') or 0),
+                    price=float(item.get('price') or 0),
+                    filled=float(item.get('cumExecQty') or 0),
+                    avg_price=float(item.get('avgPrice') or 0)
+                )
+            elif topic == 'execution' and item.get('category') == 'spot':
+                await self._emit(
+                    'fill',
+                    order_id=item.get('orderId'),
+                    symbol=item.get('symbol'),
+                    side=item.get('side', '').lower(),
+                    price=float(item.get('execPrice') or 0),
+                    quantity=float(item.get('execQty') or 0),
+                    fee=float(item.get('execFee') or 0),
+                    trade_id=item.get('execId')
+                )
+            elif topic == 'wallet':
+                for coin in item.get('coin', []):
+                    total = float(coin.get('walletBalance') or 0)
+                    locked = float(coin.get('locked') or 0)
+                    await self._emit('balance', asset=coin.get('coin'), free=total - locked, locked=locked)
+
 class BybitExchange(BaseExchange):
     """Bybit Exchange Integration"""
     
-    def __init__(self, api_key: str, api_secret: str, testnet: bool = False):
-        super().__init__(api_key, api_secret)
+    # 600 requests / 5 s per IP; order endpoints are capped at 20/s per UID
+    rate_limit = 50.0
+    rate_burst = 100.0
+    endpoint_weights = {'/v5/order/create': 2.5, '/v5/order/cancel': 2.5}
+    
+    def __init__(self, api_key: str, api_secret: str, testnet: bool = False, **kwargs):
+        super().__init__(api_key, api_secret, **kwargs)
         self.base_url = "https://api-testnet.bybit.com" if testnet else "https://api.bybit.com"
+        
+        if self.use_websocket:
+            self.orderbook_stream = BybitOrderBookStream(self)
+            if testnet:
+                self.orderbook_stream.ws_url = "wss://stream-testnet.bybit.com/v5/public/spot"
+            self.user_stream = BybitUserDataStream(self)
+            if testnet:
+                self.user_stream.ws_url = "wss://stream-testnet.bybit.com/v5/private"
     
     def _generate_signature(self, params: Dict) -> str:
         """Generate HMAC SHA256 signature"""
@@ -33,13 +143,7 @@ class BybitExchange(BaseExchange):
             params['timestamp'] = timestamp
             params['sign'] = self._generate_signature(params)
         
-        async with aiohttp.ClientSession() as session:
-            if method == 'GET':
-                async with session.get(url, params=params, headers=headers) as resp:
-                    return await resp.json()
-            elif method == 'POST':
-                async with session.post(url, json=params, headers=headers) as resp:
-                    return await resp.json()
+        return await self._http_request(method, url, params, headers, endpoint=endpoint, signed=signed)
     
     async def get_balance(self) -> Dict[str, float]:
         try:
@@ -49,28 +153,34 @@ class BybitExchange(BaseExchange):
             logger.error(f"Bybit get_balance error: {e}")
             return {}
     
-    async def get_orderbook(self, symbol: str) -> Dict:
+    async def fetch_orderbook(self, symbol: str) -> OrderBook:
         try:
-            result = await self._request('GET', '/v5/market/orderbook', {'category': 'spot', 'symbol': symbol})
-            return result.get('result', {})
+            result = await self._request('GET', '/v5/market/orderbook', {'category': 'spot', 'symbol': symbol, 'limit': 50})
+            data = result.get('result', {})
+            return OrderBook.from_levels(symbol, data.get('b', []), data.get('a', []), seq=data.get('u'))
         except Exception as e:
-            logger.error(f"Bybit get_orderbook error: {e}")
-            return {'bids': [], 'asks': []}
+            logger.error(f"Bybit fetch_orderbook error: {e}")
+            return OrderBook(symbol)
+    
+    def _order_params(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
+        params = {
+            'category': 'spot',
+            'symbol': symbol,
+            'side': side.capitalize(),
+            'orderType': 'Market' if price is None else 'Limit',
+            'qty': str(amount)
+        }
+        if price:
+            params['price'] = str(price)
+        return params
     
     async def create_order(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
         try:
-            params = {
-                'category': 'spot',
-                'symbol': symbol,
-                'side': side.capitalize(),
-                'orderType': 'Market' if price is None else 'Limit',
-                'qty': str(amount)
-            }
-            if price:
-                params['price'] = str(price)
-            
+            params = self._order_params(symbol, side, amount, price)
             result = await self._request('POST', '/v5/order/create', params, signed=True)
-            return result
+            if result.get('retCode') != 0:
+                return {'error': result.get('retMsg')}
+            return {**result, 'order_id': result.get('result', {}).get('orderId')}
         except Exception as e:
             logger.error(f"Bybit create_order error: {e}")
             return {'error': str(e)}
@@ -101,4 +211,87 @@ class BybitExchange(BaseExchange):
             return result.get('retCode') == 0
         except Exception as e:
             logger.error(f"Bybit cancel_order error: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    async def create_orders(self, orders: List[Dict]) -> List[Dict]:
+        """Create orders through /v5/order/create-batch, 10 per request for spot"""
+        async def submit(chunk: List[Dict]) -> List[Dict]:
+            try:
+                requests = []
+                for o in chunk:
+                    order_params = self._order_params(o['symbol'], o['side'], o['amount'], o.get('price'))
+                    order_params.pop('category')
+                    requests.append(order_params)
+                result = await self._request('POST', '/v5/order/create-batch', {'category': 'spot', 'request': requests}, signed=True)
+                if result.get('retCode') != 0:
+                    return [{'error': result.get('retMsg')} for _ in chunk]
+                items = result.get('result', {}).get('list', [])
+                statuses = result.get('retExtInfo', {}).get('list', [])
+                return [
+                    {**item, 'order_id': item.get('orderId')} if status.get('code') == 0 else {'error': status.get('msg')}
+                    for item, status in zip(items, statuses)
+                ]
+            except Exception as e:
+                logger.error(f"Bybit create_orders error: {e}")
+                return [{'error': str(e)} for _ in chunk]
+        
+        results = await asyncio.gather(*(submit(chunk) for chunk in self._chunks(orders, 10)))
+        return [order for chunk in results for order in chunk]
+    
+    async def cancel_orders(self, orders: List[Dict]) -> List[bool]:
+        """Cancel orders through /v5/order/cancel-batch, 10 per request for spot"""
+        async def submit(chunk: List[Dict]) -> List[bool]:
+            try:
+                requests = [{'symbol': o['symbol'], 'orderId': o['order_id']} for o in chunk]
+                result = await self._request('POST', '/v5/order/cancel-batch', {'category': 'spot', 'request': requests}, signed=True)
+                if result.get('retCode') != 0:
+                    return [False for _ in chunk]
+                return [status.get('code') == 0 for status in result.get('retExtInfo', {}).get('list', [])]
+            except Exception as e:
+                logger.error(f"Bybit cancel_orders error: {e}")
+                return [False for _ in chunk]
+        
+        results = await asyncio.gather(*(submit(chunk) for chunk in self._chunks(orders, 10)))
+        return [ok for chunk in results for ok in chunk]
+    
+    async def get_order(self, order_id: str, symbol: str) -> Dict:
+        try:
+            # _request adds the key, timestamp and signature to the dict it is given, so each call gets a fresh copy
+            query = {'category': 'spot', 'symbol': symbol, 'orderId': order_id}
+            result = await self._request('GET', '/v5/order/realtime', dict(query), signed=True)
+            items = result.get('result', {}).get('list', [])
+            if not items:
+                # Finished orders drop out of the realtime view
+                result = await self._request('GET', '/v5/order/history', dict(query), signed=True)
+                items = result.get('result', {}).get('list', [])
+            if not items:
+                return {}
+            item = items[0]
+            return {
+                'order_id': item['orderId'],
+                'status': BybitUserDataStream.status_map.get(item.get('orderStatus'), 'new'),
+                'filled': float(item.get('cumExecQty') or 0),
+                'avg_price': float(item.get('avgPrice') or 0)
+            }
+        except Exception as e:
+            logger.error(f"Bybit get_order error: {e}")
+            return {}
+    
+    async def get_markets(self) -> List[Dict]:
+        try:
+            result = await self._request('GET', '/v5/market/instruments-info', {'category': 'spot'})
+            return [
+                {
+                    'symbol': item['symbol'],
+                    'base': item['baseCoin'].upper(),
+                    'quote': item['quoteCoin'].upper(),
+                    'tick_size': float(item.get('priceFilter', {}).get('tickSize', 0) or 0),
+                    'lot_size': float(item.get('lotSizeFilter', {}).get('basePrecision', 0) or 0),
+                    'min_notional': float(item.get('lotSizeFilter', {}).get('minOrderAmt', 0) or 0)
+                }
+                for item in result.get('result', {}).get('list', [])
+                if item.get('status') == 'Trading'
+            ]
+        except Exception as e:
+            logger.error(f"Bybit get_markets error: {e}")
+            return []
\ No newline at end of file
@@ -1,25 +1,138 @@
-import aiohttp
+import asyncio
 import time
 import hmac
 import hashlib
 from typing import Dict, List, Optional
 from .base_exchange import BaseExchange
+from .orderbook import OrderBook
+from .orderbook_stream import OrderBookStream
+from .user_stream import UserDataStream
 import logging
 
 logger = logging.getLogger(__name__)
 
+class GateOrderBookStream(OrderBookStream):
+    """Gate.io spot.order_book_update stream applied on top of a REST snapshot"""
+    
+    ws_url = "wss://api.gateio.ws/ws/v4/"
+    # Diffs are against the venue's full book; keeping twice the quoted depth rarely leaves it short
+    local_depth = 100
+    
+    def _subscribe_messages(self, symbols: List[str]) -> List:
+        return [
+            {'time': int(time.time()), 'channel': 'spot.order_book_update', 'event': 'subscribe', 'payload': [symbol, '100ms']}
+            for symbol in symbols
+        ]
+    
+    async def _on_message(self, data: Dict):
+        if data.get('channel') != 'spot.order_book_update' or data.get('event') != 'update':
+            return
+        
+        result = data.get('result', {})
+        await self._apply_ranged(result.get('s'), result.get('U'), result.get('u'), result.get('b', []), result.get('a', []))
+    
+    async def _resync(self, symbol: str):
+        self._start_snapshot(symbol)
+
+class GateUserDataStream(UserDataStream):
+    """Gate.io private spot.orders, spot.usertrades and spot.balances channels"""
+    
+    ws_url = "wss://api.gateio.ws/ws/v4/"
+    channels = ['spot.orders', 'spot.usertrades', 'spot.balances']
+    status_map = {
+        'open': 'new',
+        'filled': 'filled',
+        'cancelled': 'cancelled',
+        'ioc': 'cancelled',
+        'stp': 'cancelled'
+    }
+    
+    def _auth(self, channel: str, event: str, timestamp: int) -> Dict:
+        message = f"channel={channel}&event={event}&time={timestamp}"
+        sign = hmac.new(self.exchange.api_secret.encode(), message.encode(), hashlib.sha512).hexdigest()
+        return {'method': 'api_key', 'KEY': self.exchange.api_key, 'SIGN': sign}
+    
+    async def _on_connect(self, ws):
+        timestamp = int(time.time())
+        await self._send([
+            {
+                'time': timestamp,
+                'channel': channel,
+                'event': 'subscribe',
+                'payload': ['!all'] if channel != 'spot.balances' else [],
+                'auth': self._auth(channel, 'subscribe', timestamp)
+            }
+            for channel in self.channels
+        ])
+    
+    async def _on_message(self, data: Dict):
+        if data.get('event') != 'update':
+            return
+        
+        channel = data.get('channel')
+        for item in data.get('result') or []:
+            if channel == 'spot.orders':
+                amount = float(item.get('amount') or 0)
+                left = float(item.get('left') or 0)
+                filled = amount - left
+                status = item.get('finish_as') if item.get('event') == 'finish' else 'open'
+                status = self._status(status)
+                if status == 'new' and filled > 0:
+                    status = 'partially_filled'
+                await self._emit(
+                    'order',
+                    order_id=item.get('id'),
+                    symbol=item.get('currency_pair'),
+                    side=item.get('side'),
+                    status=status,
+                    quantity=amount,
+                    price=float(item.get('price') or 0),
+                    filled=filled,
+                    avg_price=float(item.get('avg_deal_price') or 0)
+                )
+            elif channel == 'spot.usertrades':
+                await self._emit(
+                    'fill',
+                    order_id=item.get('order_id'),
+                    symbol=item.get('currency_pair'),
+                    side=item.get('side'),
+                    price=float(item.get('price') or 0),
+                    quantity=float(item.get('amount') or 0),
+                    fee=float(item.get('fee') or 0),
+                    trade_id=item.get('id')
+                )
+            elif channel == 'spot.balances':
+                available = float(item.get('available') or 0)
+                await self._emit(
+                    'balance',
+                    asset=item.get('currency'),
+                    free=available,
+                    locked=max(float(item.get('total') or 0) - available, 0.0)
+                )
+
 class GateExchange(BaseExchange):
     """Gate.io Exchange Integration"""
     
-    def __init__(self, api_key: str, api_secret: str):
-        super().__init__(api_key, api_secret)
+    # Public endpoints allow 200 requests / 10 s; spot orders 10 / s
+    rate_limit = 20.0
+    rate_burst = 40.0
+    endpoint_weights = {'/spot/orders': 2.0}
+    
+    def __init__(self, api_key: str, api_secret: str, **kwargs):
+        super().__init__(api_key, api_secret, **kwargs)
         self.base_url = "https://api.gateio.ws/api/v4"
+        
+        if self.use_websocket:
+            self.orderbook_stream = GateOrderBookStream(self)
+            self.user_stream = GateUserDataStream(self)
     
     def _generate_signature(self, method: str, url: str, query_string: str, payload: str, timestamp: str) -> str:
         message = f"{method}\n{url}\n{query_string}\n{hashlib.sha512(payload.encode()).hexdigest()}\n{timestamp}"
         return hmac.new(self.api_secret.encode(), message.encode(), hashlib.sha512).hexdigest()
     
-    async def _request(self, method: str, endpoint: str, params: Dict = None, signed: bool = False) -> Dict:
+    async def _request(self, method: str, endpoint: str, params: Dict = None, signed: bool = False,
+                       route: Optional[str] = None) -> Dict:
+        # Breakers, latency and weights are tracked per route; paths holding an order id pass their template
         url = f"{self.base_url}{endpoint}"
         headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
         
@@ -38,13 +151,7 @@ class GateExchange(BaseExchange):
             headers['Timestamp'] = timestamp
             headers['SIGN'] = signature
         
-        async with aiohttp.ClientSession() as session:
-            if method == 'GET':
-                async with session.get(url, params=params, headers=headers) as resp:
-                    return await resp.json()
-            elif method == 'POST':
-                async with session.post(url, json=params, headers=headers) as resp:
-                    return await resp.json()
+        return await self._http_request(method, url, params, headers, endpoint=route or endpoint, signed=signed)
     
     async def get_balance(self) -> Dict[str, float]:
         try:
@@ -54,27 +161,32 @@ class GateExchange(BaseExchange):
             logger.error(f"Gate get_balance error: {e}")
             return {}
     
-    async def get_orderbook(self, symbol: str) -> Dict:
+    async def fetch_orderbook(self, symbol: str, depth: int = 50) -> OrderBook:
         try:
-            result = await self._request('GET', f'/spot/order_book', {'currency_pair': symbol, 'limit': 20})
-            return result
+            result = await self._request('GET', f'/spot/order_book', {'currency_pair': symbol, 'limit': depth, 'with_id': 'true'})
+            return OrderBook.from_levels(symbol, result.get('bids', []), result.get('asks', []), seq=result.get('id'), depth=depth)
         except Exception as e:
-            logger.error(f"Gate get_orderbook error: {e}")
-            return {'bids': [], 'asks': []}
+            logger.error(f"Gate fetch_orderbook error: {e}")
+            return OrderBook(symbol)
+    
+    def _order_params(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
+        params = {
+            'currency_pair': symbol,
+            'side': side,
+            'amount': str(amount),
+            'type': 'market' if price is None else 'limit'
+        }
+        if price:
+            params['price'] = str(price)
+        return params
     
     async def create_order(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
         try:
-            params = {
-                'currency_pair': symbol,
-                'side': side,
-                'amount': str(amount),
-                'type': 'market' if price is None else 'limit'
-            }
-            if price:
-                params['price'] = str(price)
-            
+            params = self._order_params(symbol, side, amount, price)
             result = await self._request('POST', '/spot/orders', params, signed=True)
-            return result
+            if 'id' not in result:
+                return {'error': result.get('message') or result.get('label')}
+            return {**result, 'order_id': result['id']}
         except Exception as e:
             logger.error(f"Gate create_order error: {e}")
             return {'error': str(e)}
@@ -100,8 +212,96 @@ class GateExchange(BaseExchange):
     
     async def cancel_order(self, order_id: str, symbol: str) -> bool:
         try:
-            result = await self._request('DELETE', f'/spot/orders/{order_id}', {'currency_pair': symbol}, signed=True)
+            result = await self._request('DELETE', f'/spot/orders/{order_id}', {'currency_pair': symbol}, signed=True,
+                                         route='/spot/orders/{order_id}')
             return 'id' in result
         except Exception as e:
             logger.error(f"Gate cancel_order error: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    async def create_orders(self, orders: List[Dict]) -> List[Dict]:
+        """Create orders through /spot/batch_orders, 10 per request"""
+        async def submit(chunk: List[Dict]) -> List[Dict]:
+            try:
+                params = [self._order_params(o['symbol'], o['side'], o['amount'], o.get('price')) for o in chunk]
+                result = await self._request('POST', '/spot/batch_orders', params, signed=True)
+                return [
+                    {**item, 'order_id': item.get('id')} if item.get('succeeded') else {'error': item.get('message') or item.get('label')}
+                    for item in result
+                ]
+            except Exception as e:
+                logger.error(f"Gate create_orders error: {e}")
+                return [{'error': str(e)} for _ in chunk]
+        
+        results = await asyncio.gather(*(submit(chunk) for chunk in self._chunks(orders, 10)))
+        return [order for chunk in results for order in chunk]
+    
+    async def cancel_orders(self, orders: List[Dict]) -> List[bool]:
+        """Cancel orders through /spot/cancel_batch_orders, 20 per request"""
+        async def submit(chunk: List[Dict]) -> List[bool]:
+            try:
+                params = [{'currency_pair': o['symbol'], 'id': o['order_id']} for o in chunk]
+                result = await self._request('POST', '/spot/cancel_batch_orders', params, signed=True)
+                return [bool(item.get('succeeded')) for item in result]
+            except Exception as e:
+                logger.error(f"Gate cancel_orders error: {e}")
+                return [False for _ in chunk]
+        
+        results = await asyncio.gather(*(submit(chunk) for chunk in self._chunks(orders, 20)))
+        return [ok for chunk in results for ok in chunk]
+    
+    async def get_order(self, order_id: str, symbol: str) -> Dict:
+        try:
+            item = await self._request('GET', f"/spot/orders/{order_id}", {'currency_pair': symbol}, signed=True,
+                                       route='/spot/orders/{order_id}')
+            if 'id' not in item:
+                return {}
+            filled = float(item.get('amount') or 0) - float(item.get('left') or 0)
+            if item.get('status') == 'closed':
+                status = 'filled'
+            elif item.get('status') == 'cancelled':
+                status = 'cancelled'
+            else:
+                status = 'partially_filled' if filled > 0 else 'new'
+            return {
+                'order_id': item['id'],
+                'status': status,
+                'filled': filled,
+                'avg_price': float(item.get('avg_deal_price') or 0)
+            }
+        except Exception as e:
+            logger.error(f"Gate get_order error: {e}")
+            return {}
+    
+    async def get_markets(self) -> List[Dict]:
+        try:
+            result = await self._request('GET', '/spot/currency_pairs')
+            return [
+                {
+                    'symbol': item['id'],
+                    'base': item['base'].upper(),
+                    'quote': item['quote'].upper(),
+                    'tick_size': 10 ** -int(item.get('precision', 8)),
+                    'lot_size': 10 ** -int(item.get('amount_precision', 8)),
+                    'min_notional': float(item.get('min_quote_amount', 0) or 0)
+                }
+                for item in result
+                if item.get('trade_status') == 'tradable'
+            ]
+        except Exception as e:
+            logger.error(f"Gate get_markets error: {e}")
+            return []
+    
+    async def get_token_addresses(self) -> Dict[str, str]:
+        try:
+            result = await self._request('GET', '/spot/currencies')
+            addresses = {}
+            for item in result:
+                base = item.get('currency', '').split('_')[0].upper()
+                for chain in item.get('chains', []):
+                    if chain.get('addr'):
+                        addresses[chain['addr'].lower()] = base
+            return addresses
+        except Exception as e:
+            logger.error(f"Gate get_token_addresses error: {e}")
+            return {}
\ No newline at end of file
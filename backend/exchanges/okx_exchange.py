@@ -1,23 +1,138 @@
-import aiohttp
+import asyncio
 import time
 import hmac
 import hashlib
 import base64
 from typing import Dict, List, Optional
+from urllib.parse import urlencode
 from .base_exchange import BaseExchange
+from .orderbook import OrderBook
+from .orderbook_stream import OrderBookStream
+from .user_stream import UserDataStream
 import logging
 import json
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+class OKXOrderBookStream(OrderBookStream):
+    """OKX books channel (snapshot + updates chained by prevSeqId)"""
+    
+    ws_url = "wss://ws.okx.com:8443/ws/v5/public"
+    ping_message = 'ping'
+    
+    def _subscribe_messages(self, symbols: List[str]) -> List:
+        return [{'op': 'subscribe', 'args': [{'channel': 'books', 'instId': symbol} for symbol in symbols]}]
+    
+    def _unsubscribe_messages(self, symbols: List[str]) -> List:
+        return [{'op': 'unsubscribe', 'args': [{'channel': 'books', 'instId': symbol} for symbol in symbols]}]
+    
+    async def _on_message(self, data: Dict):
+        arg = data.get('arg', {})
+        if arg.get('channel') != 'books' or 'data' not in data:
+            return
+        
+        symbol = arg.get('instId')
+        book = self.books.get(symbol)
+        if book is None:
+            return
+        
+        for entry in data['data']:
+            seq = entry.get('seqId')
+            if data.get('action') == 'snapshot':
+                book.load(entry.get('bids', []), entry.get('asks', []), seq)
+            elif not book.synced:
+                return
+            elif entry.get('prevSeqId') != book.seq:
+                await self._resync(symbol)
+                return
+            else:
+                book.apply(entry.get('bids', []), entry.get('asks', []), seq)
+
+class OKXUserDataStream(UserDataStream):
+    """OKX private stream: spot orders (including fills) and account balances"""
+    
+    ws_url = "wss://ws.okx.com:8443/ws/v5/private"
+    ping_message = 'ping'
+    status_map = {
+        'live': 'new',
+        'partially_filled': 'partially_filled',
+        'filled': 'filled',
+        'canceled': 'cancelled',
+        'mmp_canceled': 'cancelled'
+    }
+    
+    async def _on_connect(self, ws):
+        timestamp = str(int(time.time()))
+        sign = self.exchange._generate_signature(timestamp, 'GET', '/users/self/verify')
+        await self._send([{'op': 'login', 'args': [{
+            'apiKey': self.exchange.api_key,
+            'passphrase': self.exchange.passphrase,
+            'timestamp': timestamp,
+            'sign': sign
+        }]}])
+    
+    async def _on_message(self, data: Dict):
+        if data.get('event') == 'login':
+            if data.get('code') == '0':
+                await self._send([{'op': 'subscribe', 'args': [
+                    {'channel': 'orders', 'instType': 'SPOT'},
+                    {'channel': 'account'}
+                ]}])
+            else:
+                logger.error(f"OKX private stream login failed: {data.get('msg')}")
+            return
+        
+        channel = data.get('arg', {}).get('channel')
+        for item in data.get('data', []):
+            if channel == 'orders':
+                await self._emit(
+                    'order',
+                    order_id=item.get('ordId'),
+                    symbol=item.get('instId'),
+                    side=item.get('side'),
+                    status=self._status(item.get('state')),
+                    quantity=float(item.get('sz') or 0),
+                    price=float(item.get('px') or 0),
+                    filled=float(item.get('accFillSz') or 0),
+                    avg_price=float(item.get('avgPx') or 0)
+                )
+                if float(item.get('fillSz') or 0) > 0:
+                    await self._emit(
+                        'fill',
+                        order_id=item.get('ordId'),
+                        symbol=item.get('instId'),
+                        side=item.get('side'),
+                        price=float(item.get('fillPx') or 0),
+                        quantity=float(item.get('fillSz') or 0),
+                        fee=-float(item.get('fillFee') or 0),
+                        trade_id=item.get('tradeId')
+                    )
+            elif channel == 'account':
+                for detail in item.get('details', []):
+                    await self._emit(
+                        'balance',
+                        asset=detail.get('ccy'),
+                        free=float(detail.get('availBal') or 0),
+                        locked=float(detail.get('frozenBal') or 0)
+                    )
+
 class OKXExchange(BaseExchange):
     """OKX Exchange Integration"""
     
-    def __init__(self, api_key: str, api_secret: str, passphrase: str = ""):
-        super().__init__(api_key, api_secret)
+    # Most market endpoints allow 20 requests / 2 s per IP
+    rate_limit = 10.0
+    rate_burst = 20.0
+    endpoint_weights = {'/api/v5/account/balance': 2.0}
+    
+    def __init__(self, api_key: str, api_secret: str, passphrase: str = "", **kwargs):
+        super().__init__(api_key, api_secret, **kwargs)
         self.passphrase = passphrase
         self.base_url = "https://www.okx.com"
+        
+        if self.use_websocket:
+            self.orderbook_stream = OKXOrderBookStream(self)
+            self.user_stream = OKXUserDataStream(self)
     
     def _generate_signature(self, timestamp: str, method: str, request_path: str, body: str = '') -> str:
         message = timestamp + method + request_path + body
@@ -31,7 +146,8 @@ class OKXExchange(BaseExchange):
         if signed:
             timestamp = datetime.utcnow().isoformat()[:-3] + 'Z'
             body = json.dumps(params) if params and method == 'POST' else ''
-            request_path = endpoint
+            # GET parameters travel in the query string, which OKX signs as part of the path
+            request_path = f"{endpoint}?{urlencode(params)}" if params and method == 'GET' else endpoint
             
             signature = self._generate_signature(timestamp, method, request_path, body)
             headers['OK-ACCESS-KEY'] = self.api_key
@@ -39,13 +155,7 @@ class OKXExchange(BaseExchange):
             headers['OK-ACCESS-TIMESTAMP'] = timestamp
             headers['OK-ACCESS-PASSPHRASE'] = self.passphrase
         
-        async with aiohttp.ClientSession() as session:
-            if method == 'GET':
-                async with session.get(url, params=params, headers=headers) as resp:
-                    return await resp.json()
-            elif method == 'POST':
-                async with session.post(url, json=params, headers=headers) as resp:
-                    return await resp.json()
+        return await self._http_request(method, url, params, headers, endpoint=endpoint, signed=signed)
     
     async def get_balance(self) -> Dict[str, float]:
         try:
@@ -55,29 +165,35 @@ class OKXExchange(BaseExchange):
             logger.error(f"OKX get_balance error: {e}")
             return {}
     
-    async def get_orderbook(self, symbol: str) -> Dict:
+    async def fetch_orderbook(self, symbol: str) -> OrderBook:
         try:
             result = await self._request('GET', '/api/v5/market/books', {'instId': symbol, 'sz': '20'})
             data = result.get('data', [{}])[0]
-            return {'bids': data.get('bids', []), 'asks': data.get('asks', [])}
+            return OrderBook.from_levels(symbol, data.get('bids', []), data.get('asks', []), seq=None)
         except Exception as e:
-            logger.error(f"OKX get_orderbook error: {e}")
-            return {'bids': [], 'asks': []}
+            logger.error(f"OKX fetch_orderbook error: {e}")
+            return OrderBook(symbol)
+    
+    def _order_params(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
+        params = {
+            'instId': symbol,
+            'tdMode': 'cash',
+            'side': side,
+            'ordType': 'market' if price is None else 'limit',
+            'sz': str(amount)
+        }
+        if price:
+            params['px'] = str(price)
+        return params
     
     async def create_order(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
         try:
-            params = {
-                'instId': symbol,
-                'tdMode': 'cash',
-                'side': side,
-                'ordType': 'market' if price is None else 'limit',
-                'sz': str(amount)
-            }
-            if price:
-                params['px'] = str(price)
-            
+            params = self._order_params(symbol, side, amount, price)
             result = await self._request('POST', '/api/v5/trade/order', params, signed=True)
-            return result
+            data = (result.get('data') or [{}])[0]
+            if result.get('code') != '0':
+                return {'error': data.get('sMsg') or result.get('msg')}
+            return {**result, 'order_id': data.get('ordId')}
         except Exception as e:
             logger.error(f"OKX create_order error: {e}")
             return {'error': str(e)}
@@ -108,4 +224,73 @@ class OKXExchange(BaseExchange):
             return result.get('code') == '0'
         except Exception as e:
             logger.error(f"OKX cancel_order error: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    async def create_orders(self, orders: List[Dict]) -> List[Dict]:
+        """Create orders through /api/v5/trade/batch-orders, 20 per request"""
+        async def submit(chunk: List[Dict]) -> List[Dict]:
+            try:
+                params = [self._order_params(o['symbol'], o['side'], o['amount'], o.get('price')) for o in chunk]
+                result = await self._request('POST', '/api/v5/trade/batch-orders', params, signed=True)
+                data = result.get('data') or [{'sCode': result.get('code'), 'sMsg': result.get('msg')}] * len(chunk)
+                return [
+                    {**item, 'order_id': item.get('ordId')} if item.get('sCode') == '0' else {'error': item.get('sMsg')}
+                    for item in data
+                ]
+            except Exception as e:
+                logger.error(f"OKX create_orders error: {e}")
+                return [{'error': str(e)} for _ in chunk]
+        
+        results = await asyncio.gather(*(submit(chunk) for chunk in self._chunks(orders, 20)))
+        return [order for chunk in results for order in chunk]
+    
+    async def cancel_orders(self, orders: List[Dict]) -> List[bool]:
+        """Cancel orders through /api/v5/trade/cancel-batch-orders, 20 per request"""
+        async def submit(chunk: List[Dict]) -> List[bool]:
+            try:
+                params = [{'instId': o['symbol'], 'ordId': o['order_id']} for o in chunk]
+                result = await self._request('POST', '/api/v5/trade/cancel-batch-orders', params, signed=True)
+                data = result.get('data') or [{}] * len(chunk)
+                return [item.get('sCode') == '0' for item in data]
+            except Exception as e:
+                logger.error(f"OKX cancel_orders error: {e}")
+                return [False for _ in chunk]
+        
+        results = await asyncio.gather(*(submit(chunk) for chunk in self._chunks(orders, 20)))
+        return [ok for chunk in results for ok in chunk]
+    
+    async def get_order(self, order_id: str, symbol: str) -> Dict:
+        try:
+            result = await self._request('GET', '/api/v5/trade/order', {'instId': symbol, 'ordId': order_id}, signed=True)
+            items = result.get('data') or []
+            if result.get('code') != '0' or not items:
+                return {}
+            item = items[0]
+            return {
+                'order_id': item['ordId'],
+                'status': OKXUserDataStream.status_map.get(item.get('state'), 'new'),
+                'filled': float(item.get('accFillSz') or 0),
+                'avg_price': float(item.get('avgPx') or 0)
+            }
+        except Exception as e:
+            logger.error(f"OKX get_order error: {e}")
+            return {}
+    
+    async def get_markets(self) -> List[Dict]:
+        try:
+            result = await self._request('GET', '/api/v5/public/instruments', {'instType': 'SPOT'})
+            return [
+                {
+                    'symbol': item['instId'],
+                    'base': item['baseCcy'].upper(),
+                    'quote': item['quoteCcy'].upper(),
+                    'tick_size': float(item.get('tickSz', 0) or 0),
+                    'lot_size': float(item.get('lotSz', 0) or 0),
+                    'min_notional': 0.0
+                }
+                for item in result.get('data', [])
+                if item.get('state') == 'live'
+            ]
+        except Exception as e:
+            logger.error(f"OKX get_markets error: {e}")
+            return []
\ No newline at end of file
@@ -0,0 +1,235 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+class BookSide:
+    """One side of a book as contiguous price/size arrays, best level first"""
+
+    __slots__ = ('prices', 'sizes', 'count', 'descending', 'best')
+
+    def __init__(self, depth: int, descending: bool):
+        self.prices = np.zeros(depth, dtype=np.float64)
+        self.sizes = np.zeros(depth, dtype=np.float64)
+        self.count = 0
+        self.descending = descending
+        self.best = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _index(self, price: float) -> int:
+        """Position of price in the side, or where it would be inserted"""
+        n = self.count
+        if self.descending:
+            return n - int(np.searchsorted(self.prices[:n][::-1], price, side='right'))
+        return int(np.searchsorted(self.prices[:n], price))
+
+    def load(self, levels: np.ndarray):
+        """Replace all levels from an (n, 2) array of price/size"""
+        levels = levels[levels[:, 1] > 0]
+        order = np.argsort(-levels[:, 0] if self.descending else levels[:, 0], kind='stable')
+        levels = levels[order[:len(self.prices)]]
+
+        n = len(levels)
+        self.prices[:n] = levels[:, 0]
+        self.sizes[:n] = levels[:, 1]
+        self.count = n
+        self.best = float(self.prices[0]) if n else 0.0
+
+    def update(self, price: float, size: float):
+        """Insert, update or (size 0) delete a single level"""
+        n = self.count
+        i = self._index(price)
+
+        if i < n and self.prices[i] == price:
+            if size > 0:
+                self.sizes[i] = size
+                return
+            self.prices[i:n - 1] = self.prices[i + 1:n]
+            self.sizes[i:n - 1] = self.sizes[i + 1:n]
+            self.count = n - 1
+        elif size > 0 and i < len(self.prices):
+            # A full side drops its worst level to make room
+            if n == len(self.prices):
+                n -= 1
+            self.prices[i + 1:n + 1] = self.prices[i:n]
+            self.sizes[i + 1:n + 1] = self.sizes[i:n]
+            self.prices[i] = price
+            self.sizes[i] = size
+            self.count = n + 1
+        else:
+            return
+
+        if i == 0:
+            self.best = float(self.prices[0]) if self.count else 0.0
+
+    def levels(self, depth: Optional[int] = None) -> List[List[float]]:
+        n = self.count if depth is None else min(depth, self.count)
+        return np.column_stack((self.prices[:n], self.sizes[:n])).tolist()
+
+def depth_walk(prices: np.ndarray, sizes: np.ndarray, notional=None, quantity=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Fill a target notional (quote) or quantity (base) against levels, best first.
+
+    Works on one side of one book (1-D arrays) or many books at once
+    ((books, levels) arrays padded with zeros). Returns the average fill
+    price, filled quantity, filled notional and the worst price touched.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    level_notional = prices * sizes
+
+    if notional is not None:
+        target = np.asarray(notional, dtype=np.float64)[..., None] if prices.ndim > 1 else float(notional)
+        cumulative = np.cumsum(level_notional, axis=-1)
+        taken_notional = np.clip(target - (cumulative - level_notional), 0.0, level_notional)
+        taken_qty = np.divide(taken_notional, prices, out=np.zeros_like(prices), where=prices > 0)
+    else:
+        target = np.asarray(quantity, dtype=np.float64)[..., None] if prices.ndim > 1 else float(quantity)
+        cumulative = np.cumsum(sizes, axis=-1)
+        taken_qty = np.clip(target - (cumulative - sizes), 0.0, sizes)
+        taken_notional = taken_qty * prices
+
+    filled_qty = taken_qty.sum(axis=-1)
+    filled_notional = taken_notional.sum(axis=-1)
+    avg_price = np.divide(filled_notional, filled_qty, out=np.zeros_like(filled_qty), where=filled_qty > 0)
+    touched = (taken_qty > 0).sum(axis=-1)
+    worst_price = np.take_along_axis(prices, np.maximum(touched - 1, 0)[..., None], axis=-1)[..., 0] \
+        if prices.ndim > 1 else (prices[touched - 1] if touched else 0.0)
+    return avg_price, filled_qty, filled_notional, worst_price
+
+def _quote(best_bid, best_ask, buy, sell, notional) -> Dict:
+    """Turn depth walks on both sides into executable prices, slippage and spread (in %)"""
+    buy_price, buy_qty, buy_notional, buy_worst = buy
+    sell_price, sell_qty, sell_notional, sell_worst = sell
+    # A single book walks to Python floats; as arrays an empty side divides to inf/nan, which np.where then masks
+    best_bid, best_ask = np.asarray(best_bid, dtype=np.float64), np.asarray(best_ask, dtype=np.float64)
+    buy_price, sell_price = np.asarray(buy_price, dtype=np.float64), np.asarray(sell_price, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buy_slippage = np.where(best_ask > 0, (buy_price - best_ask) / best_ask * 100, 0.0)
+        sell_slippage = np.where(best_bid > 0, (best_bid - sell_price) / best_bid * 100, 0.0)
+        spread = np.where((buy_price > 0) & (sell_price > 0), (buy_price - sell_price) / sell_price * 100, 0.0)
+
+    return {
+        'buy_price': buy_price,
+        'buy_quantity': buy_qty,
+        'buy_limit': buy_worst,
+        'buy_slippage': buy_slippage,
+        'sell_price': sell_price,
+        'sell_quantity': sell_qty,
+        'sell_limit': sell_worst,
+        'sell_slippage': sell_slippage,
+        'spread': spread,
+        'fillable': (buy_notional >= notional * (1 - 1e-9)) & (sell_notional >= notional * (1 - 1e-9))
+    }
+
+def quote_books(books: Sequence['OrderBook'], notional: float) -> Dict[str, np.ndarray]:
+    """Executable quotes for the same notional across many books in one vectorized pass"""
+    depth = max([max(len(book.bids), len(book.asks)) for book in books] + [1])
+    shape = (len(books), depth)
+    bid_px, bid_sz = np.zeros(shape), np.zeros(shape)
+    ask_px, ask_sz = np.zeros(shape), np.zeros(shape)
+
+    for row, book in enumerate(books):
+        nb, na = book.bids.count, book.asks.count
+        bid_px[row, :nb] = book.bids.prices[:nb]
+        bid_sz[row, :nb] = book.bids.sizes[:nb]
+        ask_px[row, :na] = book.asks.prices[:na]
+        ask_sz[row, :na] = book.asks.sizes[:na]
+
+    return _quote(
+        bid_px[:, 0], ask_px[:, 0],
+        depth_walk(ask_px, ask_sz, notional=np.full(len(books), notional)),
+        depth_walk(bid_px, bid_sz, notional=np.full(len(books), notional)),
+        notional
+    )
+
+def _to_array(levels: List) -> np.ndarray:
+    """Parse exchange levels ([price, size, ...] as str or float) into an (n, 2) float array"""
+    if not levels:
+        return np.empty((0, 2), dtype=np.float64)
+    return np.array([level[:2] for level in levels], dtype=np.float64)
+
+class OrderBook:
+    """Bounded-depth L2 order book backed by float arrays with O(1) top of book"""
+
+    __slots__ = ('symbol', 'depth', 'bids', 'asks', 'seq')
+
+    def __init__(self, symbol: str = '', depth: int = 50):
+        self.symbol = symbol
+        self.depth = depth
+        self.bids = BookSide(depth, descending=True)
+        self.asks = BookSide(depth, descending=False)
+        self.seq = None
+
+    @classmethod
+    def from_levels(cls, symbol: str, bids: List, asks: List, seq=None, depth: int = 50) -> 'OrderBook':
+        """Build a book from raw exchange levels"""
+        book = cls(symbol, depth)
+        book.load(bids, asks, seq)
+        return book
+
+    @property
+    def best_bid(self) -> float:
+        return self.bids.best
+
+    @property
+    def best_ask(self) -> float:
+        return self.asks.best
+
+    def load(self, bids: List, asks: List, seq=None):
+        """Replace the book with a full snapshot"""
+        self.bids.load(_to_array(bids))
+        self.asks.load(_to_array(asks))
+        self.seq = seq
+
+    def apply(self, bids: List, asks: List, seq=None):
+        """Apply changed levels; a zero size removes the level"""
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            for level in levels:
+                side.update(float(level[0]), float(level[1]))
+        self.seq = seq
+
+    def update(self, side: str, price: float, size: float):
+        """Set a single level on the 'bids' or 'asks' side"""
+        (self.bids if side == 'bids' else self.asks).update(price, size)
+
+    def spread_pct(self) -> float:
+        """Top-of-book spread as a percentage of the best bid"""
+        if self.bids.best > 0 and self.asks.best > 0:
+            return (self.asks.best - self.bids.best) / self.bids.best * 100
+        return 0.0
+
+    def walk(self, side: str, notional: float = None, quantity: float = None) -> Tuple[float, float, float, float]:
+        """Average price, quantity, notional and worst price for a 'buy' (asks) or 'sell' (bids) fill"""
+        book_side = self.asks if side == 'buy' else self.bids
+        n = book_side.count
+        avg_price, qty, filled, worst = depth_walk(book_side.prices[:n], book_side.sizes[:n], notional, quantity)
+        return float(avg_price), float(qty), float(filled), float(worst)
+
+    def walk_many(self, side: str, quantities) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Independent quantity walks for many positions against one side, in one vectorized pass"""
+        quantities = np.asarray(quantities, dtype=np.float64)
+        book_side = self.asks if side == 'buy' else self.bids
+        n = book_side.count
+        if n == 0:
+            empty = np.zeros(len(quantities))
+            return empty, empty.copy(), empty.copy(), empty.copy()
+        shape = (len(quantities), n)
+        return depth_walk(
+            np.broadcast_to(book_side.prices[:n], shape),
+            np.broadcast_to(book_side.sizes[:n], shape),
+            quantity=quantities
+        )
+
+    def quote(self, notional: float) -> Dict:
+        """Executable buy/sell prices, slippage and spread for a notional on both sides"""
+        quote = _quote(
+            self.bids.best, self.asks.best,
+            self.walk('buy', notional=notional), self.walk('sell', notional=notional),
+            notional
+        )
+        return {key: (bool(value) if key == 'fillable' else float(value)) for key, value in quote.items()}
+
+    def to_dict(self, depth: Optional[int] = None) -> Dict:
+        """Return levels in the plain [[price, size], ...] format"""
+        return {'bids': self.bids.levels(depth), 'asks': self.asks.levels(depth), 'seq': self.seq}
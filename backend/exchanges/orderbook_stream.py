@@ -0,0 +1,158 @@
+import logging
+import time
+from abc import abstractmethod
+from typing import Dict, List, Optional
+from .orderbook import OrderBook
+from .ws_stream import WebSocketStream
+
+logger = logging.getLogger(__name__)
+
+class LocalOrderBook(OrderBook):
+    """Order book plus the stream's sync state"""
+
+    __slots__ = ('synced', 'loading', 'pending', 'updated_at', 'min_levels')
+
+    def __init__(self, symbol: str, depth: int):
+        super().__init__(symbol, depth)
+        self.synced = False
+        self.loading = False
+        self.pending: List = []
+        self.updated_at = 0.0
+        # Fewest levels per side before a ranged book is reloaded
+        self.min_levels = 0
+
+    def load(self, bids: List, asks: List, seq=None):
+        super().load(bids, asks, seq)
+        self.synced = True
+        self.updated_at = time.monotonic()
+
+    def apply(self, bids: List, asks: List, seq=None):
+        super().apply(bids, asks, seq)
+        self.updated_at = time.monotonic()
+
+class OrderBookStream(WebSocketStream):
+    """Keeps local order books in sync with an exchange's public depth WebSocket"""
+
+    # Levels kept locally by streams whose diffs apply to the venue's full book (None: the quoted depth)
+    local_depth: Optional[int] = None
+    # A book with no update for this many seconds is not quoted; callers fall back to REST
+    max_book_age = 10.0
+
+    def __init__(self, exchange, depth: int = 50, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        super().__init__(exchange, reconnect_delay, max_reconnect_delay)
+        self.depth = depth
+        self.books: Dict[str, LocalOrderBook] = {}
+
+    def _key(self, symbol: str) -> str:
+        """Normalize a symbol to the form used in stream messages"""
+        return symbol
+
+    @abstractmethod
+    def _subscribe_messages(self, symbols: List[str]) -> List:
+        """Build subscribe frames for the given symbols"""
+        pass
+
+    def _unsubscribe_messages(self, symbols: List[str]) -> List:
+        """Build unsubscribe frames for the given symbols"""
+        return []
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        """Return the live local book if it is in sync, otherwise None"""
+        book = self.books.get(self._key(symbol))
+        if book is None or not book.synced or time.monotonic() - book.updated_at > self.max_book_age:
+            return None
+        return book
+
+    async def subscribe(self, symbol: str):
+        """Start tracking a symbol; the stream is started on first use"""
+        key = self._key(symbol)
+        if key in self.books:
+            return
+
+        self.books[key] = LocalOrderBook(key, self.local_depth or self.depth)
+        if self._task is None:
+            self.start()
+        elif self._ws is not None and not self._ws.closed:
+            await self._send(self._subscribe_messages([key]))
+
+    async def _on_connect(self, ws):
+        if self.books:
+            await self._send(self._subscribe_messages(list(self.books)))
+
+    def _on_disconnect(self):
+        # Every book is suspect until the next snapshot after reconnect
+        for book in self.books.values():
+            book.synced = False
+            book.loading = False
+            book.pending = []
+
+    async def _resync(self, symbol: str):
+        """Re-subscribe so the venue pushes a fresh snapshot"""
+        book = self.books.get(symbol)
+        if book is None:
+            return
+
+        logger.warning(f"{self.exchange.name} orderbook sequence gap on {symbol}, resyncing")
+        book.synced = False
+        await self._send(self._unsubscribe_messages([symbol]))
+        await self._send(self._subscribe_messages([symbol]))
+
+    async def _apply_ranged(self, symbol: str, first_id: int, last_id: int, bids: List, asks: List):
+        """Apply a delta covering update ids first_id..last_id against a REST snapshot"""
+        book = self.books.get(symbol)
+        if book is None or first_id is None or last_id is None:
+            return
+
+        if book.loading:
+            book.pending.append((first_id, last_id, bids, asks))
+            return
+
+        if not book.synced:
+            book.pending.append((first_id, last_id, bids, asks))
+            self._start_snapshot(symbol)
+            return
+
+        if last_id <= book.seq:
+            return
+
+        if first_id > book.seq + 1:
+            logger.warning(f"{self.exchange.name} orderbook sequence gap on {symbol}, reloading snapshot")
+            book.synced = False
+            book.pending = [(first_id, last_id, bids, asks)]
+            self._start_snapshot(symbol)
+            return
+
+        book.apply(bids, asks, last_id)
+        if min(len(book.bids), len(book.asks)) < book.min_levels:
+            # Levels cut from the local book are never re-sent; reload once too few remain to quote
+            logger.info(f"{self.exchange.name} orderbook for {symbol} fell below {book.min_levels} levels, reloading snapshot")
+            book.synced = False
+            book.pending = []
+            self._start_snapshot(symbol)
+
+    def _start_snapshot(self, symbol: str):
+        book = self.books[symbol]
+        book.loading = True
+        self._spawn(self._load_snapshot(symbol))
+
+    async def _load_snapshot(self, symbol: str):
+        """Fetch a REST snapshot, then replay the deltas buffered meanwhile"""
+        book = self.books.get(symbol)
+        try:
+            snapshot = await self.exchange.fetch_orderbook(symbol, book.depth)
+            if snapshot.seq is None:
+                raise ValueError("snapshot has no sequence id")
+            levels = snapshot.to_dict()
+            book.load(levels['bids'], levels['asks'], int(snapshot.seq))
+            # Thin markets are only held to the depth they actually have
+            book.min_levels = min(self.depth, len(book.bids), len(book.asks))
+        except Exception as e:
+            logger.error(f"{self.exchange.name} orderbook snapshot error for {symbol}: {e}")
+            book.loading = False
+            book.pending = []
+            return
+
+        pending, book.pending = book.pending, []
+        book.loading = False
+        for first_id, last_id, bids, asks in pending:
+            await self._apply_ranged(symbol, first_id, last_id, bids, asks)
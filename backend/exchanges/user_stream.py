@@ -0,0 +1,33 @@
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+from .ws_stream import WebSocketStream
+
+logger = logging.getLogger(__name__)
+
+class UserDataStream(WebSocketStream):
+    """Authenticated private stream that turns order, fill and balance pushes into normalized events.
+
+    Events are dicts with a 'type' of:
+      order   - order_id, symbol, side, status, quantity, price, filled, avg_price
+      fill    - order_id, symbol, side, price, quantity, fee, trade_id
+      balance - asset, free, locked
+    where status is one of new, partially_filled, filled, cancelled, rejected.
+    """
+
+    # Venue status -> normalized status; subclasses fill this in
+    status_map: Dict[str, str] = {}
+
+    def __init__(self, exchange, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        super().__init__(exchange, reconnect_delay, max_reconnect_delay)
+        self.on_event: Optional[Callable[[Dict], Awaitable]] = None
+
+    def _status(self, venue_status: str) -> str:
+        return self.status_map.get(venue_status, 'new')
+
+    async def _emit(self, event_type: str, **fields):
+        if self.on_event is None:
+            return
+        try:
+            await self.on_event({'type': event_type, **fields})
+        except Exception as e:
+            logger.error(f"{self.stream_name} event handler error: {e}")
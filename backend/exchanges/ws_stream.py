@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+class WebSocketStream(ABC):
+    """Reconnecting WebSocket client over the exchange's shared HTTP session"""
+
+    ws_url = ''
+    ping_interval = 20.0
+    ping_message: Optional[str] = None  # Application-level ping text, for venues that require one
+
+    def __init__(self, exchange, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.exchange = exchange
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.running = False
+        self._ws = None
+        self._task = None
+        self._tasks = set()
+
+    @property
+    def stream_name(self) -> str:
+        return f"{self.exchange.name} {self.__class__.__name__}"
+
+    async def _connect_url(self) -> str:
+        """URL to connect to; venues with listen keys fetch one here"""
+        return self.ws_url
+
+    async def _on_connect(self, ws):
+        """Called after every (re)connect, e.g. to authenticate and subscribe"""
+        pass
+
+    def _on_disconnect(self):
+        """Called after the socket drops, before the reconnect delay"""
+        pass
+
+    @abstractmethod
+    async def _on_message(self, data: Dict):
+        """Handle a decoded JSON message"""
+        pass
+
+    async def _on_text(self, ws, text: str):
+        """Handle non-JSON frames such as ping/pong"""
+        pass
+
+    def _decode(self, raw) -> str:
+        """Turn a raw frame into text"""
+        return raw.decode() if isinstance(raw, bytes) else raw
+
+    def start(self):
+        """Run the stream in a background task"""
+        self.running = True
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the stream and close the socket"""
+        self.running = False
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+        for task in list(self._tasks) + ([self._task] if self._task else []):
+            task.cancel()
+        self._task = None
+        self._tasks.clear()
+
+    async def run(self):
+        """Connect and dispatch messages, reconnecting with exponential backoff"""
+        delay = self.reconnect_delay
+
+        while self.running:
+            try:
+                session = self.exchange._get_session()
+                url = await self._connect_url()
+                async with session.ws_connect(url, heartbeat=self.ping_interval) as ws:
+                    self._ws = ws
+                    delay = self.reconnect_delay
+                    logger.info(f"{self.stream_name} connected")
+
+                    await self._on_connect(ws)
+                    pinger = self._spawn(self._keepalive(ws)) if self.ping_message else None
+                    try:
+                        async for msg in ws:
+                            if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                                text = self._decode(msg.data)
+                                try:
+                                    data = json.loads(text)
+                                except ValueError:
+                                    await self._on_text(ws, text)
+                                    continue
+                                if isinstance(data, dict):
+                                    await self._on_message(data)
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                break
+                    finally:
+                        if pinger:
+                            pinger.cancel()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.stream_name} error: {e}")
+
+            self._ws = None
+            self._on_disconnect()
+
+            if self.running:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _send(self, messages: List):
+        ws = self._ws
+        if ws is None or ws.closed:
+            return
+        for message in messages:
+            if isinstance(message, str):
+                await ws.send_str(message)
+            else:
+                await ws.send_json(message)
+
+    async def _keepalive(self, ws):
+        while not ws.closed:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send_str(self.ping_message)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
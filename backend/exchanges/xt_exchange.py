@@ -1,25 +1,127 @@
-import aiohttp
 import time
 import hmac
 import hashlib
 from typing import Dict, List, Optional
 from .base_exchange import BaseExchange
+from .orderbook import OrderBook
+from .orderbook_stream import OrderBookStream
+from .user_stream import UserDataStream
 import logging
 
 logger = logging.getLogger(__name__)
 
+class XTOrderBookStream(OrderBookStream):
+    """XT.com depth_update stream applied on top of a REST snapshot"""
+    
+    ws_url = "wss://stream.xt.com/public"
+    # Diffs are against the venue's full book; keeping twice the quoted depth rarely leaves it short
+    local_depth = 100
+    ping_message = 'ping'
+    
+    def _key(self, symbol: str) -> str:
+        return symbol.lower()
+    
+    def _subscribe_messages(self, symbols: List[str]) -> List:
+        return [{'method': 'subscribe', 'params': [f"depth_update@{symbol}" for symbol in symbols], 'id': str(int(time.time() * 1000))}]
+    
+    async def _on_message(self, data: Dict):
+        if data.get('topic') != 'depth_update':
+            return
+        
+        update = data.get('data', {})
+        await self._apply_ranged(update.get('s'), update.get('fi'), update.get('i'), update.get('b', []), update.get('a', []))
+    
+    async def _resync(self, symbol: str):
+        self._start_snapshot(symbol)
+
+class XTUserDataStream(UserDataStream):
+    """XT.com private order, trade and balance topics, authorized with a listen token"""
+    
+    ws_url = "wss://stream.xt.com/private"
+    ping_message = 'ping'
+    status_map = {
+        'NEW': 'new',
+        'PARTIALLY_FILLED': 'partially_filled',
+        'FILLED': 'filled',
+        'CANCELED': 'cancelled',
+        'REJECTED': 'rejected',
+        'EXPIRED': 'cancelled'
+    }
+    
+    def __init__(self, exchange, **kwargs):
+        super().__init__(exchange, **kwargs)
+        self.listen_key = None
+    
+    async def _connect_url(self) -> str:
+        result = await self.exchange._request('POST', '/v4/ws-token', signed=True)
+        self.listen_key = (result.get('result') or {}).get('token')
+        if not self.listen_key:
+            raise RuntimeError(f"no listen token: {result.get('mc')}")
+        return self.ws_url
+    
+    async def _on_connect(self, ws):
+        await self._send([{
+            'method': 'subscribe',
+            'params': ['order', 'trade', 'balance'],
+            'listenKey': self.listen_key,
+            'id': str(int(time.time() * 1000))
+        }])
+    
+    async def _on_message(self, data: Dict):
+        topic = data.get('topic')
+        item = data.get('data') or {}
+        if topic == 'order':
+            await self._emit(
+                'order',
+                order_id=item.get('i'),
+                symbol=item.get('s'),
+                side=(item.get('sd') or '').lower(),
+                status=self._status(item.get('st')),
+                quantity=float(item.get('oq') or 0),
+                price=float(item.get('p') or 0),
+                filled=float(item.get('eq') or 0),
+                avg_price=float(item.get('ap') or 0)
+            )
+        elif topic == 'trade':
+            await self._emit(
+                'fill',
+                order_id=item.get('oi'),
+                symbol=item.get('s'),
+                side=(item.get('sd') or '').lower(),
+                price=float(item.get('p') or 0),
+                quantity=float(item.get('q') or 0),
+                fee=float(item.get('f') or 0),
+                trade_id=item.get('i')
+            )
+        elif topic == 'balance':
+            await self._emit(
+                'balance',
+                asset=(item.get('c') or '').upper(),
+                free=float(item.get('b') or 0) - float(item.get('f') or 0),
+                locked=float(item.get('f') or 0)
+            )
+
 class XTExchange(BaseExchange):
     """XT.com Exchange Integration"""
     
-    def __init__(self, api_key: str, api_secret: str):
-        super().__init__(api_key, api_secret)
+    rate_limit = 10.0
+    rate_burst = 20.0
+    
+    def __init__(self, api_key: str, api_secret: str, **kwargs):
+        super().__init__(api_key, api_secret, **kwargs)
         self.base_url = "https://sapi.xt.com"
+        
+        if self.use_websocket:
+            self.orderbook_stream = XTOrderBookStream(self)
+            self.user_stream = XTUserDataStream(self)
     
     def _generate_signature(self, params: Dict) -> str:
         param_str = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
         return hmac.new(self.api_secret.encode(), param_str.encode(), hashlib.sha256).hexdigest()
     
-    async def _request(self, method: str, endpoint: str, params: Dict = None, signed: bool = False) -> Dict:
+    async def _request(self, method: str, endpoint: str, params: Dict = None, signed: bool = False,
+                       route: Optional[str] = None) -> Dict:
+        # Breakers, latency and weights are tracked per route; paths holding an order id pass their template
         url = f"{self.base_url}{endpoint}"
         headers = {'Content-Type': 'application/json', 'X-XT-APIKEY': self.api_key}
         
@@ -29,13 +131,7 @@ class XTExchange(BaseExchange):
             params['timestamp'] = timestamp
             params['signature'] = self._generate_signature(params)
         
-        async with aiohttp.ClientSession() as session:
-            if method == 'GET':
-                async with session.get(url, params=params, headers=headers) as resp:
-                    return await resp.json()
-            elif method == 'POST':
-                async with session.post(url, json=params, headers=headers) as resp:
-                    return await resp.json()
+        return await self._http_request(method, url, params, headers, endpoint=route or endpoint, signed=signed)
     
     async def get_balance(self) -> Dict[str, float]:
         try:
@@ -45,13 +141,14 @@ class XTExchange(BaseExchange):
             logger.error(f"XT get_balance error: {e}")
             return {}
     
-    async def get_orderbook(self, symbol: str) -> Dict:
+    async def fetch_orderbook(self, symbol: str, depth: int = 50) -> OrderBook:
         try:
-            result = await self._request('GET', '/v4/public/depth', {'symbol': symbol, 'limit': 20})
-            return result.get('result', {'bids': [], 'asks': []})
+            result = await self._request('GET', '/v4/public/depth', {'symbol': symbol, 'limit': depth})
+            data = result.get('result') or {}
+            return OrderBook.from_levels(symbol, data.get('bids', []), data.get('asks', []), seq=data.get('lastUpdateId'), depth=depth)
         except Exception as e:
-            logger.error(f"XT get_orderbook error: {e}")
-            return {'bids': [], 'asks': []}
+            logger.error(f"XT fetch_orderbook error: {e}")
+            return OrderBook(symbol)
     
     async def create_order(self, symbol: str, side: str, amount: float, price: Optional[float] = None) -> Dict:
         try:
@@ -65,7 +162,9 @@ class XTExchange(BaseExchange):
                 params['price'] = price
             
             result = await self._request('POST', '/v4/order', params, signed=True)
-            return result
+            if result.get('rc') != 0:
+                return {'error': result.get('mc')}
+            return {**result, 'order_id': (result.get('result') or {}).get('orderId')}
         except Exception as e:
             logger.error(f"XT create_order error: {e}")
             return {'error': str(e)}
@@ -96,4 +195,41 @@ class XTExchange(BaseExchange):
             return result.get('rc') == 0
         except Exception as e:
             logger.error(f"XT cancel_order error: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    async def get_order(self, order_id: str, symbol: str) -> Dict:
+        try:
+            result = await self._request('GET', f"/v4/order/{order_id}", signed=True, route='/v4/order/{order_id}')
+            item = result.get('result') or {}
+            if result.get('rc') != 0 or not item:
+                return {}
+            return {
+                'order_id': str(item.get('orderId')),
+                'status': XTUserDataStream.status_map.get(item.get('state'), 'new'),
+                'filled': float(item.get('executedQty') or 0),
+                'avg_price': float(item.get('avgPrice') or 0)
+            }
+        except Exception as e:
+            logger.error(f"XT get_order error: {e}")
+            return {}
+    
+    async def get_markets(self) -> List[Dict]:
+        try:
+            result = await self._request('GET', '/v4/public/symbol')
+            markets = []
+            for item in result.get('result', {}).get('symbols', []):
+                if item.get('state') != 'ONLINE':
+                    continue
+                filters = {f.get('filter'): f for f in item.get('filters', [])}
+                markets.append({
+                    'symbol': item['symbol'],
+                    'base': item['baseCurrency'].upper(),
+                    'quote': item['quoteCurrency'].upper(),
+                    'tick_size': float(filters.get('PRICE', {}).get('tickSize') or 10 ** -int(item.get('pricePrecision', 8))),
+                    'lot_size': float(filters.get('QUANTITY', {}).get('tickSize') or 10 ** -int(item.get('quantityPrecision', 8))),
+                    'min_notional': float(filters.get('QUOTE_QTY', {}).get('min') or 0)
+                })
+            return markets
+        except Exception as e:
+            logger.error(f"XT get_markets error: {e}")
+            return []
\ No newline at end of file
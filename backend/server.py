@@ -2,6 +2,7 @@ from fastapi import FastAPI, APIRouter, HTTPException, WebSocket, WebSocketDisco
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
 import logging
 from pathlib import Path
@@ -11,6 +12,8 @@ import uuid
 from datetime import datetime, timezone
 import asyncio
 import json
+from bot.tracing import merge_stats
+from bot.signal_lease import shard_bucket
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -77,7 +80,7 @@ class Signal(BaseModel):
     volume_24h: Optional[float] = None
     spread: Optional[float] = None
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    status: str = "pending"  # pending, notified, executed, skipped
+    status: str = "pending"  # pending, notified, executed, skipped, expired, shed
 
 class Trade(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -92,7 +95,7 @@ class Trade(BaseModel):
     amount: float
     profit: Optional[float] = None
     spread: float
-    status: str = "open"  # open, closed, failed
+    status: str = "open"  # pending, open, closing, closed, cancelled
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     closed_at: Optional[datetime] = None
 
@@ -108,6 +111,8 @@ class BotConfig(BaseModel):
     auto_trading: bool = False
     active_blockchains: List[str] = ["eth", "bsc", "solana"]
     active_exchanges: List[str] = ["bybit", "binance", "gate", "okx", "xt"]
+    # Bumped on every update; running bots poll it to pick up changes
+    version: int = 0
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class Stats(BaseModel):
@@ -160,6 +165,8 @@ async def get_signals(limit: int = 100):
 async def create_signal(signal: Signal):
     doc = signal.model_dump()
     doc['timestamp'] = doc['timestamp'].isoformat()
+    # Same bucket the monitor assigns, so sharded engine instances can claim it
+    doc['shard_bucket'] = shard_bucket(doc['token_address'])
     await db.signals.insert_one(doc)
     
     # Broadcast to WebSocket clients
@@ -208,10 +215,17 @@ async def get_config():
 @api_router.put("/config", response_model=BotConfig)
 async def update_config(config: BotConfig):
     doc = config.model_dump()
+    doc.pop('version', None)
     doc['updated_at'] = datetime.now(timezone.utc).isoformat()
     
-    await db.bot_config.delete_many({})
-    await db.bot_config.insert_one(doc)
+    # Update the single config document in place so watchers see one change with a new version
+    doc = await db.bot_config.find_one_and_update(
+        {},
+        {"$set": doc, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
     
     doc['updated_at'] = datetime.fromisoformat(doc['updated_at'])
     return BotConfig(**doc)
@@ -221,7 +235,7 @@ async def update_config(config: BotConfig):
 async def get_stats():
     total_signals = await db.signals.count_documents({})
     total_trades = await db.trades.count_documents({})
-    open_trades = await db.trades.count_documents({"status": "open"})
+    open_trades = await db.trades.count_documents({"status": {"$in": ["pending", "open", "closing"]}})
     
     # Calculate profits
     closed_trades = await db.trades.find({"status": "closed"}, {"_id": 0}).to_list(1000)
@@ -248,6 +262,16 @@ async def get_stats():
         success_rate=success_rate
     )
 
+# Latency per pipeline stage, added up across engine instances
+@api_router.get("/latency")
+async def get_latency(instance_id: Optional[str] = None):
+    query = {"instance_id": instance_id} if instance_id else {}
+    docs = await db.latency_stats.find(query, {"_id": 0}).to_list(1000)
+    return {
+        "instances": sorted({doc['instance_id'] for doc in docs}),
+        "stages": merge_stats(docs)
+    }
+
 # WebSocket endpoint
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -0,0 +1,65 @@
+from bot.dex_logs import (
+    MINT_TOPIC, PAIR_CREATED_TOPIC, SWAP_TOPIC, decode_log, decode_string, event_topic, topic_address, words
+)
+
+TOKEN0 = '0x' + '11' * 20
+TOKEN1 = '0x' + '22' * 20
+PAIR = '0x' + '33' * 20
+
+
+def word(value: int) -> str:
+    return format(value, '064x')
+
+
+def address_topic(address: str) -> str:
+    return '0x' + '00' * 12 + address[2:]
+
+
+def test_event_topics():
+    assert PAIR_CREATED_TOPIC == '0x0d3648bd0f6ba80134a33ba9275ac585d9d315f0ad8355cddefde31afa28d0e9'
+    assert SWAP_TOPIC == event_topic('Swap(address,uint256,uint256,uint256,uint256,address)')
+
+
+def test_decode_pair_created():
+    log = {
+        'address': '0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f',
+        'topics': [PAIR_CREATED_TOPIC, address_topic(TOKEN0), address_topic(TOKEN1)],
+        'data': '0x' + word(int(PAIR, 16)) + word(7),
+        'blockNumber': 10
+    }
+    assert decode_log(log) == {
+        'event': 'PairCreated', 'factory': '0x5c69bee701ef814a2b6a3edd4b1652cb9cc5aa6f', 'block': 10,
+        'token0': TOKEN0, 'token1': TOKEN1, 'pair': PAIR
+    }
+
+
+def test_decode_mint_and_swap():
+    mint = decode_log({'address': PAIR, 'topics': [MINT_TOPIC, address_topic(TOKEN0)], 'data': '0x' + word(5) + word(6)})
+    assert (mint['event'], mint['pair'], mint['amount0'], mint['amount1']) == ('Mint', PAIR, 5, 6)
+
+    swap = decode_log({
+        'address': PAIR,
+        'topics': [bytes.fromhex(SWAP_TOPIC[2:]), address_topic(TOKEN0), address_topic(TOKEN1)],
+        'data': bytes.fromhex(word(1) + word(0) + word(0) + word(2))
+    })
+    assert swap['event'] == 'Swap'
+    assert (swap['amount0_in'], swap['amount1_in'], swap['amount0_out'], swap['amount1_out']) == (1, 0, 0, 2)
+
+
+def test_unknown_or_truncated_logs_are_skipped():
+    assert decode_log({'address': PAIR, 'topics': []}) is None
+    assert decode_log({'address': PAIR, 'topics': ['0x' + 'ab' * 32], 'data': '0x' + word(1)}) is None
+    assert decode_log({'address': PAIR, 'topics': [SWAP_TOPIC], 'data': '0x' + word(1)}) is None
+
+
+def test_words_and_addresses():
+    assert words('0x' + word(1) + word(2)) == [1, 2]
+    assert words(b'') == []
+    assert topic_address('0x' + '00' * 12 + 'AB' * 20) == '0x' + 'ab' * 20
+
+
+def test_decode_string_and_bytes32_symbols():
+    encoded = word(32) + word(4) + b'PEPE'.hex().ljust(64, '0')
+    assert decode_string('0x' + encoded) == 'PEPE'
+    assert decode_string(b'MKR'.ljust(32, b'\x00')) == 'MKR'
+    assert decode_string('0x' + word(32) + word(2) + 'fffe'.ljust(64, '0')) is None
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from bot.filter_rules import RuleError, compile_rules, pair_columns, parse_rule, signal_columns, threshold_rules
+
+
+SIGNALS = [
+    {'blockchain': 'ethereum', 'token_address': '0xAA', 'token_symbol': 'aaa', 'liquidity': 20000, 'volume_24h': 60000},
+    {'blockchain': 'solana', 'token_address': '0xbb', 'token_symbol': 'BBB', 'liquidity': 15000, 'volume_24h': 60000},
+    {'blockchain': 'bsc', 'token_address': '0xcc', 'token_symbol': 'CCC', 'liquidity': 5000, 'volume_24h': 60000},
+    {'blockchain': 'bsc', 'token_address': '0xdd', 'token_symbol': 'DDD', 'liquidity': 20000, 'volume_24h': None},
+]
+
+
+def mask(spec, rows=SIGNALS, **kwargs):
+    rules = compile_rules(spec)
+    return rules.mask(signal_columns(rows, rules.fields), **kwargs).tolist()
+
+
+def test_parse_rule():
+    assert parse_rule('volume_24h / liquidity <= 50') == (('volume_24h', 'liquidity'), '<=', 50.0)
+    assert parse_rule('liquidity >= 1e-3') == (('liquidity', None), '>=', 0.001)
+
+
+@pytest.mark.parametrize('rule', ['liquidity >=', 'holders > 5', 'liquidity ~ 5'])
+def test_invalid_rules_are_rejected(rule):
+    with pytest.raises(RuleError):
+        parse_rule(rule)
+
+
+def test_threshold_rules():
+    assert mask(threshold_rules(10000, 50000)) == [True, True, False, False]
+
+
+def test_chain_override_replaces_the_base_threshold():
+    spec = {'rules': ['liquidity >= 10000'], 'chains': {'Solana': ['liquidity >= 20000']}}
+    assert mask(spec) == [True, False, False, True]
+
+
+def test_chain_only_rule_applies_to_that_chain():
+    assert mask({'chains': {'bsc': ['liquidity >= 10000']}}) == [True, True, False, True]
+
+
+def test_ratio_rule():
+    assert mask({'rules': ['volume_24h / liquidity <= 3']}) == [True, False, False, True]
+
+
+def test_blacklist_is_case_insensitive():
+    spec = {'blacklist': {'token_address': ['0xaa'], 'token_symbol': ['bbb']}}
+    assert mask(spec) == [False, False, True, True]
+
+
+def test_exempt_rows_skip_rules_on_that_field():
+    exempt = {'volume_24h': np.array([False, False, False, True])}
+    assert mask(threshold_rules(10000, 50000), exempt=exempt) == [True, True, False, True]
+
+
+def test_empty_batch():
+    assert mask(threshold_rules(1, 1), rows=[]) == []
+
+
+def test_only_needed_fields_are_extracted():
+    rules = compile_rules(threshold_rules(1, 1))
+    assert rules.fields == {'liquidity', 'volume_24h'}
+    assert set(signal_columns(SIGNALS, rules.fields)) == {'size', 'liquidity', 'volume_24h'}
+
+
+def test_pair_columns_read_dexscreener_pairs():
+    pairs = [{'baseToken': {'address': '0xAB', 'symbol': 'ab'}, 'liquidity': {'usd': 1234}, 'volume': {'h24': '99'}}]
+    columns = pair_columns(pairs, chain='Ethereum')
+    assert columns['token_address'].tolist() == ['0xab']
+    assert columns['token_symbol'].tolist() == ['AB']
+    assert columns['liquidity'].tolist() == [1234.0]
+    assert columns['volume_24h'].tolist() == [99.0]
+    assert columns['chain'].tolist() == ['ethereum']
+
+
+def test_malformed_numbers_count_as_zero():
+    columns = signal_columns([{'liquidity': 'n/a'}, {'liquidity': '5'}], frozenset({'liquidity'}))
+    assert columns['liquidity'].tolist() == [0.0, 5.0]
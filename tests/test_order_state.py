@@ -0,0 +1,44 @@
+import pytest
+
+from bot import order_state
+from bot.order_state import CANCEL_PENDING, CANCELLED, FILLED, NEW, PARTIALLY_FILLED, REJECTED, transition
+
+
+@pytest.mark.parametrize('current, reported, expected', [
+    (NEW, PARTIALLY_FILLED, PARTIALLY_FILLED),
+    (NEW, FILLED, FILLED),
+    (NEW, REJECTED, REJECTED),
+    (PARTIALLY_FILLED, PARTIALLY_FILLED, PARTIALLY_FILLED),
+    (PARTIALLY_FILLED, CANCELLED, CANCELLED),
+    (CANCEL_PENDING, PARTIALLY_FILLED, CANCEL_PENDING),
+    (CANCEL_PENDING, NEW, CANCEL_PENDING),
+    (CANCEL_PENDING, FILLED, FILLED),
+    (CANCEL_PENDING, REJECTED, CANCELLED),
+])
+def test_transition(current, reported, expected):
+    assert transition(current, reported) == expected
+
+
+def test_unknown_current_status_is_treated_as_new():
+    assert transition(None, FILLED) == FILLED
+
+
+@pytest.mark.parametrize('current, reported', [
+    (PARTIALLY_FILLED, NEW),
+    (PARTIALLY_FILLED, REJECTED),
+    (NEW, 'expired'),
+])
+def test_stale_or_unknown_reports_are_ignored(current, reported):
+    assert transition(current, reported) is None
+
+
+@pytest.mark.parametrize('status', sorted(order_state.TERMINAL))
+def test_terminal_states_accept_no_reports(status):
+    assert order_state.is_terminal(status)
+    for reported in (NEW, PARTIALLY_FILLED, FILLED, CANCELLED, REJECTED):
+        assert transition(status, reported) is None
+
+
+def test_working_states_are_not_terminal():
+    for status in (None, NEW, PARTIALLY_FILLED, CANCEL_PENDING):
+        assert not order_state.is_terminal(status)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from exchanges.orderbook import OrderBook, depth_walk, quote_books
+
+
+def book(bids=(), asks=()):
+    return OrderBook.from_levels('TEST', [list(level) for level in bids], [list(level) for level in asks])
+
+
+def test_levels_are_sorted_best_first_and_zero_sizes_dropped():
+    ob = book(bids=[(99, 1), (100, 2), (98, 0)], asks=[(102, 1), (101, 3)])
+    assert ob.best_bid == 100 and ob.best_ask == 101
+    assert ob.to_dict()['bids'] == [[100, 2], [99, 1]]
+
+
+def test_apply_inserts_updates_and_deletes_levels():
+    ob = book(bids=[(100, 1), (99, 1)], asks=[(101, 1)])
+    ob.apply([['100.5', '2'], ['100', '0']], [['101', '5']])
+    assert ob.to_dict()['bids'] == [[100.5, 2], [99, 1]]
+    assert ob.to_dict()['asks'] == [[101, 5]]
+
+
+def test_full_side_drops_its_worst_level():
+    ob = OrderBook('TEST', depth=2)
+    ob.load([[100, 1], [99, 1]], [])
+    ob.update('bids', 100.5, 1)
+    assert ob.to_dict()['bids'] == [[100.5, 1], [100, 1]]
+
+
+def test_depth_walk_by_notional():
+    avg, qty, notional, worst = depth_walk(np.array([10.0, 11.0]), np.array([1.0, 5.0]), notional=21.0)
+    assert notional == pytest.approx(21.0)
+    assert qty == pytest.approx(1 + 11 / 11)
+    assert avg == pytest.approx(21.0 / 2)
+    assert worst == 11.0
+
+
+def test_depth_walk_by_quantity_stops_at_book_depth():
+    avg, qty, notional, worst = depth_walk(np.array([10.0, 11.0]), np.array([1.0, 1.0]), quantity=5.0)
+    assert qty == pytest.approx(2.0)
+    assert notional == pytest.approx(21.0)
+    assert worst == 11.0
+
+
+def test_depth_walk_on_an_empty_side():
+    avg, qty, notional, worst = depth_walk(np.array([]), np.array([]), notional=100.0)
+    assert (avg, qty, notional, worst) == (0.0, 0.0, 0.0, 0.0)
+
+
+def test_quote_spread_and_slippage():
+    quote = book(bids=[(100, 10)], asks=[(101, 0.5), (102, 10)]).quote(101.0)
+    assert quote['fillable']
+    assert quote['buy_limit'] == 102
+    assert quote['buy_slippage'] > 0
+    assert quote['spread'] == pytest.approx((quote['buy_price'] - quote['sell_price']) / quote['sell_price'] * 100)
+
+
+@pytest.mark.parametrize('bids, asks', [
+    ((), ()),
+    ([(100, 1)], ()),
+    ((), [(101, 1)]),
+])
+def test_quote_on_empty_or_one_sided_books_is_unfillable(bids, asks):
+    quote = book(bids, asks).quote(50.0)
+    assert not quote['fillable']
+    assert quote['spread'] == 0.0
+    assert all(np.isfinite(value) for key, value in quote.items() if key != 'fillable')
+
+
+def test_quote_books_matches_single_book_quotes():
+    books = [book([(100, 10)], [(101, 10)]), book((), [(101, 1)]), book([(99, 1), (98, 5)], [(100, 0.2), (103, 5)])]
+    quotes = quote_books(books, 150.0)
+    for i, ob in enumerate(books):
+        single = ob.quote(150.0)
+        for key, value in single.items():
+            assert quotes[key][i] == pytest.approx(value), key
+
+
+def test_walk_many_matches_individual_walks():
+    ob = book(bids=[(100, 1), (99, 2), (98, 3)])
+    avg, qty, _, worst = ob.walk_many('sell', [0.5, 2.0, 10.0])
+    for i, amount in enumerate((0.5, 2.0, 10.0)):
+        single = ob.walk('sell', quantity=amount)
+        assert (avg[i], qty[i], worst[i]) == pytest.approx((single[0], single[1], single[3]))
+
+
+def test_walk_many_on_an_empty_side():
+    avg, qty, notional, worst = book().walk_many('buy', [1.0, 2.0])
+    assert avg.tolist() == [0.0, 0.0] and qty.tolist() == [0.0, 0.0]
@@ -0,0 +1,82 @@
+import asyncio
+
+from bot import order_state
+from bot.position_book import Position, PositionBook
+
+
+def position(position_id, exchange='gate', symbol='PEPE_USDT', status='open', **fields):
+    return Position(id=position_id, exchange=exchange, symbol=symbol, status=status, amount=1.0, entry_price=1.0, **fields)
+
+
+def test_indexes_by_market_and_order():
+    book = PositionBook()
+    entry = position('p1', status='pending', order_id='o1', order_status=order_state.NEW)
+    held = position('p2', symbol='DOGE_USDT')
+    book.add(entry)
+    book.add(held)
+
+    assert len(book) == 2
+    assert book.find_order('gate', 'o1') is entry
+    assert book.open_in('gate', 'PEPE_USDT') and not book.open_in('mexc', 'PEPE_USDT')
+    # Only held positions without a working order are priced for exits
+    assert list(book.markets()) == [('gate', 'DOGE_USDT')]
+    assert book.working_orders() == [(entry, 'o1')]
+
+
+def test_orders_in_a_final_state_are_not_indexed():
+    book = PositionBook()
+    book.add(position('p1', order_id='o1', order_status=order_state.FILLED,
+                      exit_order_id='x1', exit_order_status=order_state.CANCEL_PENDING))
+    assert book.find_order('gate', 'o1') is None
+    assert book.find_order('gate', 'x1') is not None
+
+
+def test_track_release_and_close():
+    book = PositionBook()
+    p = position('p1')
+    book.add(p)
+    p.exit_order_id = 'x1'
+    book.track_order(p, 'x1')
+    assert book.find_order('gate', 'x1') is p
+
+    book.release_order('gate', 'x1')
+    assert book.find_order('gate', 'x1') is None
+
+    book.track_order(p, 'x1')
+    book.close(p)
+    assert len(book) == 0
+    assert not book.open_in('gate', 'PEPE_USDT')
+    assert book.working_orders() == []
+
+
+def test_to_dict_leaves_out_unset_fields():
+    doc = position('p1', order_id='o1').to_dict()
+    assert doc['order_id'] == 'o1'
+    assert 'exit_order_id' not in doc
+    assert Position.from_dict(doc).to_dict() == doc
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class Collection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return Cursor(self.docs)
+
+
+def test_load_uses_the_active_statuses_by_default():
+    collection = Collection([position('p1', order_id='o1', order_status=order_state.NEW).to_dict()])
+    book = PositionBook()
+    asyncio.run(book.load(collection))
+    assert collection.queries == [{'status': {'$in': ['pending', 'open', 'closing']}}]
+    assert book.find_order('gate', 'o1').id == 'p1'
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from exchanges import rate_limiter
+from exchanges.rate_limiter import TokenBucket
+
+
+class FakeTime:
+    """Monotonic clock that asyncio.sleep advances instantly"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', fake.monotonic)
+    monkeypatch.setattr(rate_limiter.asyncio, 'sleep', fake.sleep)
+    return fake
+
+
+def test_burst_up_to_capacity_does_not_wait(fake_time):
+    bucket = TokenBucket(rate=10, capacity=5)
+
+    async def run():
+        for _ in range(5):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert fake_time.sleeps == []
+    assert bucket.tokens == pytest.approx(0)
+
+
+def test_acquire_waits_for_refill(fake_time):
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    async def run():
+        await bucket.acquire(2)
+        await bucket.acquire(1)
+
+    asyncio.run(run())
+    assert sum(fake_time.sleeps) == pytest.approx(0.1)
+
+
+def test_weight_is_capped_at_capacity(fake_time):
+    bucket = TokenBucket(rate=1, capacity=3)
+    asyncio.run(bucket.acquire(10))
+    assert fake_time.sleeps == []
+
+
+def test_pause_blocks_callers_and_empties_the_bucket(fake_time):
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.pause(2.0)
+    asyncio.run(bucket.acquire())
+    assert fake_time.now == pytest.approx(2.1)
@@ -0,0 +1,93 @@
+import pytest
+
+from exchanges import resilience
+from exchanges.resilience import CircuitBreaker, LatencyTracker, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, 'monotonic', clock)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_trial_through_per_cool_down(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # The trial is still running
+    assert not breaker.allow()
+
+
+def test_half_open_trial_closes_or_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_lost_trial_does_not_hold_the_breaker_shut(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+
+    # The trial's outcome is never recorded; another cool-down admits a new one
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker(window=100, min_samples=5)
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        tracker.record(latency)
+    assert tracker.percentile(0.5) is None
+
+    tracker.record(0.5)
+    assert tracker.percentile(0.5) == 0.3
+    assert tracker.percentile(1.0) == 0.5
+
+
+def test_backoff_is_capped():
+    for attempt in range(20):
+        assert 0 <= backoff_delay(attempt, base=0.1, cap=2.0) <= 2.0
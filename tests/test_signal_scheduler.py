@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+from bot.signal_scheduler import SignalScheduler
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def signal(signal_id, liquidity=10000.0, volume=0.0, created_at=None):
+    doc = {'id': signal_id, 'liquidity': liquidity, 'volume_24h': volume}
+    if created_at is not None:
+        doc['timestamp'] = datetime.fromtimestamp(created_at, timezone.utc).isoformat()
+    return doc
+
+
+def test_pop_returns_best_first():
+    clock = Clock()
+    scheduler = SignalScheduler(clock=clock)
+    for signal_id, liquidity in (('low', 1e3), ('high', 1e6), ('mid', 1e4)):
+        scheduler.push(signal(signal_id, liquidity))
+    assert [s['id'] for s in scheduler.pop(3)] == ['high', 'mid', 'low']
+    assert len(scheduler) == 0
+
+
+def test_older_signals_lose_priority():
+    clock = Clock()
+    scheduler = SignalScheduler(ttl=100, age_weight=10.0, clock=clock)
+    scheduler.push(signal('old', 1e4, created_at=clock.now - 90))
+    scheduler.push(signal('new', 1e4, created_at=clock.now))
+    assert [s['id'] for s in scheduler.pop(2)] == ['new', 'old']
+
+
+def test_duplicates_are_ignored():
+    scheduler = SignalScheduler(clock=Clock())
+    scheduler.push(signal('a'))
+    scheduler.push(signal('a'))
+    assert len(scheduler) == 1
+
+
+def test_stale_signals_are_rejected_and_expired():
+    clock = Clock()
+    scheduler = SignalScheduler(ttl=60, clock=clock)
+    dropped = scheduler.push(signal('stale', created_at=clock.now - 61))
+    assert [s['id'] for s in dropped['expired']] == ['stale']
+
+    scheduler.push(signal('fresh', created_at=clock.now))
+    clock.now += 60
+    assert [s['id'] for s in scheduler.expire()] == ['fresh']
+    assert scheduler.pop(1) == []
+
+
+def test_over_capacity_sheds_the_lowest_priority():
+    scheduler = SignalScheduler(max_pending=2, clock=Clock())
+    scheduler.push(signal('a', 1e5))
+    scheduler.push(signal('b', 1e6))
+    dropped = scheduler.push(signal('c', 1e3))
+    assert [s['id'] for s in dropped['shed']] == ['c']
+    assert sorted(scheduler.entries) == ['a', 'b']
+
+
+def test_signals_without_a_timestamp_start_now():
+    clock = Clock()
+    scheduler = SignalScheduler(clock=clock)
+    assert scheduler.created_at({'id': 'x'}) == clock.now
+    assert scheduler.created_at({'id': 'x', 'timestamp': 'not a date'}) == clock.now